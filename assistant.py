@@ -1,17 +1,21 @@
+import asyncio
+import functools
 import inspect
 import json
 import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable
-from typing import Union
 import colorama
-from pydantic import BaseModel
 import litellm
-from utility import TOOLS
+from utility import TOOLS, RESULT_STORE
 import pickle
+import time
 from litellm.exceptions import RateLimitError
 
 from colorama import Fore, Style
 from rich.console import Console
+from rich.live import Live
 from rich.markdown import Markdown
 import config as conf
 
@@ -20,8 +24,13 @@ from prompt_toolkit.styles import Style as PromptToolkitStyle
 from prompt_toolkit.formatted_text import FormattedText
 from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
 
-from func_to_schema import function_to_json_schema
+from func_to_schema import ArgumentAdapter, SchemaCache
 from gem.command import InvalidCommand, CommandNotFound, CommandExecuter, cmd
+from gem.streaming import LiveMarkdown, StreamStats, collect_stream
+from gem.tool_executor import ToolExecutor, is_parallel_safe
+from gem.turn import TurnLimits, TurnReport
+from gem.context import ContextManager, litellm_summarizer
+from gem.cache import DiskCache, make_key
 import gem
 
 from dotenv import load_dotenv
@@ -38,23 +47,52 @@ class Assistant:
         name: str = "Assistant",
         tools: list[Callable] = [],
         system_instruction: str = "",
+        stream: bool = False,
+        limits: TurnLimits | None = None,
     ) -> None:
         self.model = model
         self.name = name
         self.system_instruction = system_instruction
+        self.stream = stream
+        self.limits = limits or TurnLimits(
+            max_steps=conf.MAX_STEPS_PER_TURN,
+            timeout=conf.TURN_TIMEOUT,
+            token_budget=conf.TURN_TOKEN_BUDGET,
+        )
+        self.last_turn_report: TurnReport | None = None
         self.messages = []
+        # timing of the last streamed completion, see `show_turn_report`
+        self.last_stream_stats: StreamStats | None = None
         self.available_functions = {func.__name__: func for func in tools}
-        self.tools = list(map(function_to_json_schema, tools))
+        schema_cache = SchemaCache(conf.SCHEMA_CACHE_PATH)
+        self.tools = list(map(schema_cache.function_to_json_schema, tools))
+        schema_cache.save()
+        self.argument_adapters = {func.__name__: ArgumentAdapter(func) for func in tools}
+        self.tool_executor = self.create_tool_executor()
+        self.context = None
+        if conf.CONTEXT_TOKEN_BUDGET:
+            self.context = ContextManager(
+                model,
+                conf.CONTEXT_TOKEN_BUDGET,
+                keep_recent_turns=conf.CONTEXT_KEEP_RECENT_TURNS,
+                summarize=litellm_summarizer(conf.CONTEXT_SUMMARY_MODEL or model) if conf.CONTEXT_SUMMARIZE_TOOL_OUTPUTS else None,
+            )
+        self.completion_cache = None
+        if conf.COMPLETION_CACHE:
+            self.completion_cache = DiskCache(conf.COMPLETION_CACHE_PATH, max_bytes=conf.COMPLETION_CACHE_MAX_BYTES)
 
         if system_instruction:
             self.messages.append({"role": "system", "content": system_instruction})
 
         self.console = Console()
 
+    def create_tool_executor(self) -> ToolExecutor | None:
+        """The executor running the tool calls of a turn."""
+        return ToolExecutor(max_workers=conf.MAX_PARALLEL_TOOL_CALLS)
+
     def send_message(self, message):
         self.messages.append({"role": "user", "content": message})
-        response = self.get_completion()
-        return self.__process_response(response)
+        return self.__run_turn()
 
     def print_ai(self, msg: str):
         print(f"{Fore.YELLOW}┌{'─' * 58}┐{Style.RESET_ALL}")
@@ -64,11 +102,11 @@ class Assistant:
         )
         print(f"{Fore.YELLOW}└{'─' * 58}┘{Style.RESET_ALL}")
 
-    def get_completion(self):
-        """Get a completion from the model with the current messages and tools."""
-        return litellm.completion(
+    def get_completion_params(self) -> dict:
+        """The litellm completion parameters for the current messages and tools."""
+        return dict(
             model=self.model,
-            messages=self.messages,
+            messages=self.context.build(self.messages) if self.context else self.messages,
             tools=self.tools,
             temperature=conf.TEMPERATURE,
             top_p=conf.TOP_P,
@@ -77,16 +115,110 @@ class Assistant:
             safety_settings=conf.SAFETY_SETTINGS
         )
 
+    def get_completion(self):
+        """Get a completion from the model with the current messages and tools."""
+        params = self.get_completion_params()
+        cache_key = self.completion_cache_key(params)
+        response = self.get_cached_completion(cache_key)
+        if response is not None:
+            if self.stream and response.choices[0].message.content:
+                self.print_ai(response.choices[0].message.content)
+            return response
+
+        if self.stream:
+            response = self.__stream_completion(params)
+        else:
+            response = litellm.completion(**params)
+        self.cache_completion(cache_key, response)
+        return response
+
+    def completion_cache_key(self, params: dict) -> str | None:
+        """The response cache key of a request, None if its response shouldn't be cached."""
+        if self.completion_cache is None or params.get("seed") is None:
+            return None
+        temperature = params.get("temperature")
+        if temperature is None or temperature > conf.COMPLETION_CACHE_MAX_TEMPERATURE:
+            return None
+        return make_key("completion", params)
+
+    def get_cached_completion(self, cache_key: str | None):
+        """The cached response of a request or None."""
+        if cache_key is None:
+            return None
+        cached = self.completion_cache.get(cache_key)
+        if cached is None:
+            return None
+        return litellm.ModelResponse(**json.loads(cached))
+
+    def cache_completion(self, cache_key: str | None, response) -> None:
+        if cache_key is not None:
+            self.completion_cache.set(cache_key, response.model_dump_json().encode())
+
+    def __stream_completion(self, params: dict):
+        """
+        Streams a completion while rendering its text as markdown, then rebuilds the chunks
+        (including tool call deltas) into a regular non-streamed response.
+        """
+        live = None
+        markdown = LiveMarkdown()
+
+        def on_content(content: str):
+            nonlocal live
+            markdown.text = content
+            # started lazily so responses that only contain tool calls don't print an empty box
+            if live is None:
+                print(f"{Fore.YELLOW}┌{'─' * 58}┐{Style.RESET_ALL}")
+                print(f"{Fore.YELLOW}│ {Fore.GREEN}{self.name}:{Style.RESET_ALL} ")
+                live = Live(
+                    markdown,
+                    console=self.console,
+                    refresh_per_second=conf.STREAM_REFRESH_PER_SECOND,
+                    vertical_overflow="visible",
+                )
+                live.start()
+
+        try:
+            chunks, stats = collect_stream(litellm.completion(**params, stream=True), on_content)
+        finally:
+            if live is not None:
+                live.stop()
+                print(f"{Fore.YELLOW}└{'─' * 58}┘{Style.RESET_ALL}")
+
+        response = litellm.stream_chunk_builder(chunks, messages=params["messages"])
+        if not stats.completion_tokens:
+            message = response.choices[0].message
+            text = (message.content or "") + "".join(
+                tool_call.function.arguments or "" for tool_call in message.tool_calls or []
+            )
+            stats.completion_tokens = litellm.token_counter(model=self.model, text=text) if text else 0
+
+        # most providers don't send usage when streaming
+        if not response.usage.completion_tokens:
+            response.usage.completion_tokens = stats.completion_tokens
+        if not response.usage.prompt_tokens:
+            response.usage.prompt_tokens = litellm.token_counter(model=self.model, messages=params["messages"])
+        response.usage.total_tokens = response.usage.prompt_tokens + response.usage.completion_tokens
+
+        self.last_stream_stats = stats
+        if conf.SHOW_STREAM_STATS:
+            print(f"{Style.DIM}{stats}{Style.RESET_ALL}")
+        return response
+
     def add_msg_assistant(self, msg: str):
         self.messages.append({"role": "assistant", "content": msg})
 
     def add_toolcall_output(self, tool_id, name, content):
+        content = str(content)
+        max_chars = conf.TOOL_RESULT_MAX_CHARS_PER_TOOL.get(name, conf.TOOL_RESULT_MAX_CHARS)
+        if max_chars is not None and len(content) > max_chars:
+            content = RESULT_STORE.spill(name, content, conf.TOOL_RESULT_PREVIEW_CHARS)
+
         self.messages.append(
             {
                 "tool_call_id": tool_id,
                 "role": "tool",
                 "name": name,
-                "content": str(content),
+                "content": content,
             }
         )
 
@@ -139,117 +271,243 @@ class Assistant:
         if self.system_instruction:
             self.messages.append({"role": "system", "content": self.system_instruction})
 
-    def convert_to_pydantic_model(self, annotation, arg_value):
+    def prepare_tool_call(self, tool_call) -> tuple[Callable, dict]:
         """
-        Attempts to convert a value to a Pydantic model.
+        Finds the function of a tool call and converts its json arguments to the types the function expects.
+
+        Raises:
+            ValueError: If there is no tool with that name.
+            ToolArgumentError: If the arguments don't match the function signature.
         """
-        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
-            try:
-                return annotation(**arg_value)
-            except (TypeError, ValueError):
-                return arg_value  # not a valid Pydantic model or data mismatch
-        elif hasattr(annotation, "__origin__"):
-            origin = annotation.__origin__
-            args = annotation.__args__
-
-            if origin is list:
-                return [
-                    self.convert_to_pydantic_model(args[0], item) for item in arg_value
-                ]
-            elif origin is dict:
-                return {
-                    key: self.convert_to_pydantic_model(args[1], value)
-                    for key, value in arg_value.items()
-                }
-            elif origin is Union:
-                for arg_type in args:
-                    try:
-                        return self.convert_to_pydantic_model(arg_type, arg_value)
-                    except (ValueError, TypeError):
-                        continue
-                raise ValueError(f"Could not convert {arg_value} to any type in {args}")
-            elif origin is tuple:
-                return tuple(
-                    self.convert_to_pydantic_model(args[i], arg_value[i])
-                    for i in range(len(args))
-                )
-            elif origin is set:
-                return {
-                    self.convert_to_pydantic_model(args[0], item) for item in arg_value
-                }
-        return arg_value
+        function_name = tool_call.function.name
 
-    def __process_response(self, response, print_response=True):
-        response_message = response.choices[0].message
-        tool_calls = response_message.tool_calls
+        function_to_call = self.available_functions.get(function_name, None)
+        if function_to_call is None:
+            raise ValueError(f"Function not found with name: {function_name}")
 
-        self.messages.append(response_message)
-        final_response = response_message
+        function_args = self.argument_adapters[function_name].validate_json(tool_call.function.arguments)
+        return function_to_call, function_args
+
+    def __execute_tool_call(self, tool_call):
+        """
+        Runs a single tool call and returns its output, errors are returned as the output so they get sent back to the AI.
+        Can be called from the tool executor threads.
+        """
+        try:
+            function_to_call, function_args = self.prepare_tool_call(tool_call)
+            return function_to_call(**function_args)
+        except Exception as e:
+            print(f"{Fore.RED}Error: {e}{Style.RESET_ALL}")
+            return str(e)
+
+    def __run_tool_calls(self, tool_calls):
+        """Runs all tool calls of a turn and adds their outputs in the original order."""
+        results = self.tool_executor.run(
+            tool_calls,
+            self.__execute_tool_call,
+            lambda tool_call: is_parallel_safe(self.available_functions.get(tool_call.function.name)),
+        )
+        for tool_call, result in zip(tool_calls, results):
+            self.add_toolcall_output(tool_call.id, tool_call.function.name, result)
+
+    def skip_tool_calls(self, tool_calls, reason: str):
+        """Adds an output for tool calls that won't run, every tool call needs one before the next completion."""
+        for tool_call in tool_calls:
+            self.add_toolcall_output(
+                tool_call.id, tool_call.function.name, f"Not executed, the turn was stopped: {reason}"
+            )
+
+    def __run_turn(self, print_response=True):
+        """
+        Keeps calling the model and running the tools it asks for until it answers without tool calls
+        or one of the turn limits is reached. The report of the turn is saved in `last_turn_report`.
+        """
+        report = TurnReport()
+        self.last_turn_report = report
 
         # Multi-turn parallel tool calling
-        # This will keep checking for tool calls and will call them
         # if any tools return an error it will be sent back to the AI
         try:
-            if tool_calls:
-                for tool_call in tool_calls:
-                    function_name = tool_call.function.name
-
-                    function_to_call = self.available_functions.get(function_name, None)
-                    if function_to_call is None:
-                        err_msg = f"Function not found with name: {function_name}"
-                        print(f"{Fore.RED}Error: {err_msg}{Style.RESET_ALL}")
-                        self.add_toolcall_output(tool_call.id, function_name, err_msg)
-                        continue
-
-                    function_args = json.loads(tool_call.function.arguments)
-
-                    sig = inspect.signature(function_to_call)
-
-                    for param_name, param in sig.parameters.items():
-                        if param_name in function_args:
-                            function_args[param_name] = self.convert_to_pydantic_model(
-                                param.annotation, function_args[param_name]
-                            )
-
-                    try:
-                        function_response = function_to_call(**function_args)
-                        if final_response.content:
-                            print(
-                                f"{Fore.YELLOW}│ {Fore.GREEN}{self.name}:{Style.RESET_ALL} {Style.DIM}{Fore.WHITE}{final_response.content.strip()}{Style.RESET_ALL}{Style.RESET_ALL}"
-                            )
-                        # response of tool
-                        self.add_toolcall_output(
-                            tool_call.id, function_name, function_response
-                        )
-                    except Exception as e:
-                        print(f"{Fore.RED}Error: {e}{Style.RESET_ALL}")
-                        self.add_toolcall_output(
-                            tool_call.id, tool_call.function.name, str(e)
-                        )
-                        continue
-
-                final_response = self.get_completion()
-
-                tool_calls = final_response.choices[0].message.tool_calls
-                # if no more tool calls end and return
+            while True:
+                start = time.perf_counter()
+                response = self.get_completion()
+                report.add_step(response, time.perf_counter() - start)
+
+                response_message = response.choices[0].message
+                tool_calls = response_message.tool_calls
+                self.messages.append(response_message)
+
                 if not tool_calls:
-                    response_message = final_response.choices[0].message
-                    self.messages.append(response_message)
-                    if print_response:
+                    if print_response and not self.stream:
                         self.print_ai(response_message.content)
                     return response_message
-            else:
-                if print_response:
-                    self.print_ai(response_message.content)
-                return response_message
-
-            # if there are more tool calls
-            return self.__process_response(
-                final_response, print_response=print_response
-            )
+
+                if response_message.content and not self.stream:
+                    print(
+                        f"{Fore.YELLOW}│ {Fore.GREEN}{self.name}:{Style.RESET_ALL} {Style.DIM}{Fore.WHITE}{response_message.content.strip()}{Style.RESET_ALL}{Style.RESET_ALL}"
+                    )
+
+                # checked before running the tools, their output is useless if the model can't be called again
+                stop_reason = report.exceeded(self.limits)
+                if stop_reason:
+                    report.stop_reason = stop_reason
+                    self.skip_tool_calls(tool_calls, stop_reason)
+                    print(f"{Fore.RED}Turn stopped, {stop_reason} limit reached ({report}){Style.RESET_ALL}")
+                    return response_message
+
+                start = time.perf_counter()
+                self.__run_tool_calls(tool_calls)
+                report.tool_time += time.perf_counter() - start
         except Exception as e:
+            report.stop_reason = "error"
             print(f"{Fore.RED}Error: {e}{Style.RESET_ALL}")
 
+    @cmd(["report"], "Shows what the last message cost (steps, time and tokens).")
+    def show_turn_report(self):
+        if self.last_turn_report is None:
+            print(f"{Fore.YELLOW}No messages sent yet{Style.RESET_ALL}")
+            return
+        print(f"{Fore.CYAN}{self.last_turn_report}{Style.RESET_ALL}")
+        if self.last_stream_stats is not None:
+            print(f"{Fore.CYAN}last streamed response: {self.last_stream_stats}{Style.RESET_ALL}")
+        if self.completion_cache is not None:
+            cache = self.completion_cache
+            print(f"{Fore.CYAN}response cache: {cache.hits} hits, {cache.misses} misses, {len(cache)} responses ({cache.size / 1024:.1f} KB){Style.RESET_ALL}")
+
+class AsyncAssistant(Assistant):
+    """
+    Asyncio counterpart of `Assistant` built on `litellm.acompletion`, lets a single process drive many sessions at once.
+
+    Coroutine tools are awaited directly, sync tools (like everything in `utility.TOOLS`) run in a thread pool
+    shared by all sessions. Requests to the same provider share a concurrency limit, see `ASYNC_PROVIDER_CONCURRENCY` in `config.py`.
+    Nothing is printed unless asked, errors are raised to the caller.
+
+    ```py
+    async def main():
+        sessions = [AsyncAssistant(conf.MODEL, tools=TOOLS) for _ in range(10)]
+        replies = await asyncio.gather(*(s.send_message("hi") for s in sessions))
+    ```
+    """
+
+    # per event loop since a semaphore is bound to the first loop that waits on it
+    _provider_semaphores: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]] = weakref.WeakKeyDictionary()
+    _tool_pool: ThreadPoolExecutor | None = None
+
+    def __init__(
+        self,
+        model: str,
+        name: str = "Assistant",
+        tools: list[Callable] = [],
+        system_instruction: str = "",
+        limits: TurnLimits | None = None,
+    ) -> None:
+        super().__init__(model, name=name, tools=tools, system_instruction=system_instruction, limits=limits)
+
+    @classmethod
+    def get_provider_semaphore(cls, model: str) -> asyncio.Semaphore:
+        """The semaphore shared by every session of the running event loop using the same provider as `model`."""
+        provider = model.split("/")[0] if "/" in model else "default"
+        semaphores = cls._provider_semaphores.setdefault(asyncio.get_running_loop(), {})
+        if provider not in semaphores:
+            limit = conf.ASYNC_PROVIDER_CONCURRENCY.get(provider, conf.ASYNC_PROVIDER_CONCURRENCY["default"])
+            semaphores[provider] = asyncio.Semaphore(limit)
+        return semaphores[provider]
+
+    def create_tool_executor(self) -> None:
+        # tools run on the pool shared by every session, see `get_tool_pool`
+        return None
+
+    @classmethod
+    def get_tool_pool(cls) -> ThreadPoolExecutor:
+        if cls._tool_pool is None:
+            cls._tool_pool = ThreadPoolExecutor(max_workers=conf.ASYNC_TOOL_WORKERS, thread_name_prefix="async-tool")
+        return cls._tool_pool
+
+    async def send_message(self, message, print_response: bool = False):
+        """Same turn loop and limits as `Assistant`, the report of the turn is saved in `last_turn_report`."""
+        self.messages.append({"role": "user", "content": message})
+        report = TurnReport()
+        self.last_turn_report = report
+
+        try:
+            while True:
+                start = time.perf_counter()
+                response = await self.get_completion()
+                report.add_step(response, time.perf_counter() - start)
+
+                response_message = response.choices[0].message
+                tool_calls = response_message.tool_calls
+                self.messages.append(response_message)
+
+                if not tool_calls:
+                    break
+
+                stop_reason = report.exceeded(self.limits)
+                if stop_reason:
+                    report.stop_reason = stop_reason
+                    self.skip_tool_calls(tool_calls, stop_reason)
+                    break
+
+                start = time.perf_counter()
+                await self.__run_tool_calls(tool_calls)
+                report.tool_time += time.perf_counter() - start
+        except Exception:
+            report.stop_reason = "error"
+            raise
+
+        if print_response:
+            self.print_ai(response_message.content)
+        return response_message
+
+    async def get_completion(self):
+        """Get a completion from the model with the current messages and tools."""
+        params = self.get_completion_params()
+        cache_key = None
+        if self.completion_cache is not None:
+            # the cache is a SQLite file, it's never read or written from the event loop
+            loop = asyncio.get_running_loop()
+            cache_key = await loop.run_in_executor(self.get_tool_pool(), self.completion_cache_key, params)
+            response = await loop.run_in_executor(self.get_tool_pool(), self.get_cached_completion, cache_key)
+            if response is not None:
+                return response
+
+        async with self.get_provider_semaphore(self.model):
+            response = await litellm.acompletion(**params)
+        if cache_key is not None:
+            await loop.run_in_executor(self.get_tool_pool(), self.cache_completion, cache_key, response)
+        return response
+
+    async def __execute_tool_call(self, tool_call):
+        try:
+            function_to_call, function_args = self.prepare_tool_call(tool_call)
+            if inspect.iscoroutinefunction(function_to_call):
+                return await function_to_call(**function_args)
+
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.get_tool_pool(), functools.partial(function_to_call, **function_args)
+            )
+        except Exception as e:
+            return str(e)
+
+    async def __run_tool_calls(self, tool_calls):
+        """
+        Same as `Assistant`, consecutive parallel safe calls run together and every other call runs alone.
+        """
+        results = []
+        batch = []
+        for tool_call in tool_calls:
+            if is_parallel_safe(self.available_functions.get(tool_call.function.name)):
+                batch.append(self.__execute_tool_call(tool_call))
+                continue
+            results += await asyncio.gather(*batch)
+            batch = []
+            results.append(await self.__execute_tool_call(tool_call))
+        results += await asyncio.gather(*batch)
+
+        for tool_call, result in zip(tool_calls, results):
+            self.add_toolcall_output(tool_call.id, tool_call.function.name, result)
+
 
 if __name__ == "__main__":
     colorama.init(autoreset=True)
@@ -266,12 +524,12 @@ if __name__ == "__main__":
     ).strip()
 
     assistant = Assistant(
-        model=conf.MODEL, system_instruction=sys_instruct, tools=TOOLS
+        model=conf.MODEL, system_instruction=sys_instruct, tools=TOOLS, stream=conf.STREAM
     )
 
     # handle commands
     command = gem.CommandExecuter.register_commands(
-        gem.builtin_commands.COMMANDS + [assistant.save_session, assistant.load_session, assistant.reset_session]
+        gem.builtin_commands.COMMANDS + [assistant.save_session, assistant.load_session, assistant.reset_session, assistant.show_turn_report]
     )
     COMMAND_PREFIX = "/"
     # set command prefix (default is /)
@@ -0,0 +1,56 @@
+"""
+Measures `get_multiple_directory_size` on a synthetic tree (see `bench_list_dir.py`), comparing the old
+serial `os.walk` + `isfile`/`getsize` per path with `DirectorySizer`, cold and with its per directory cache.
+The paths overlap (the whole tree and two of its subdirectories), like the model often asks.
+
+Usage: `uv run benchmarks/bench_directory_size.py [file count]`
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config as conf
+from bench_list_dir import make_tree
+from gem.fs import DirectorySizer
+
+
+def legacy_size(path: str) -> tuple[int, int]:
+    """What `get_directory_size` used to do."""
+    total_size = 0
+    file_count = 0
+    for dirpath, _, filenames in os.walk(path):
+        for f in filenames:
+            fp = os.path.join(dirpath, f)
+            if os.path.isfile(fp):
+                total_size += os.path.getsize(fp)
+                file_count += 1
+    return total_size, file_count
+
+
+def bench(name: str, func) -> None:
+    start = time.perf_counter()
+    func()
+    print(f"{name:<36} {time.perf_counter() - start:8.3f} s")
+
+
+if __name__ == "__main__":
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    root = tempfile.mkdtemp(prefix="bench_directory_size_")
+    try:
+        print(f"creating {file_count} files...")
+        make_tree(root, file_count)
+        paths = [root, os.path.join(root, "src"), os.path.join(root, "node_modules")]
+        legacy_size(root)  # warm up the os cache
+
+        bench("serial os.walk per path", lambda: [legacy_size(path) for path in paths])
+        sizer = DirectorySizer(conf.DIRECTORY_SIZE_WORKERS)
+        bench(f"DirectorySizer ({conf.DIRECTORY_SIZE_WORKERS} threads), cold", lambda: sizer.sizes(paths))
+        bench("DirectorySizer, cached", lambda: sizer.sizes(paths))
+        open(os.path.join(root, "src", "pkg0", "dir0", "new.txt"), "w").close()
+        bench("DirectorySizer, one directory changed", lambda: sizer.sizes(paths))
+    finally:
+        shutil.rmtree(root)
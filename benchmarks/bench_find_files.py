@@ -0,0 +1,57 @@
+"""
+Measures recursive `find_files` searches on a synthetic tree (see `bench_list_dir.py`), comparing `glob.glob`
+(what `find_files` used to do, it walks the whole tree every time) with `FileIndex`: building the index,
+searching it, and refreshing it after a change.
+
+Usage: `uv run benchmarks/bench_find_files.py [file count]`
+"""
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config as conf
+from bench_list_dir import make_tree
+from gem.file_index import FileIndex
+
+QUERIES = [
+    ("glob **/dir7/*", {"pattern": "**/dir7/*"}),
+    ("glob **/file19?.txt", {"pattern": "**/file19?.txt"}),
+    ("glob src/**/pkg3/**/file1.txt", {"pattern": "src/**/pkg3/**/file1.txt"}),
+    ("substring 'ile199'", {"pattern": "**", "name_contains": "ile199"}),
+    ("extension **/*.py", {"pattern": "**/*.py"}),
+]
+
+
+def bench(name: str, func) -> None:
+    start = time.perf_counter()
+    result = func()
+    count = f"{len(result)} paths" if isinstance(result, list) else ""
+    print(f"{name:<40} {time.perf_counter() - start:8.3f} s  {count}")
+
+
+if __name__ == "__main__":
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    root = tempfile.mkdtemp(prefix="bench_find_files_")
+    try:
+        print(f"creating {file_count} files...")
+        make_tree(root, file_count)
+        for d in range(0, 50, 5):
+            open(os.path.join(root, "src", "pkg0", f"dir{d}", "module.py"), "w").close()
+
+        bench("glob.glob **/file19?.txt", lambda: glob.glob(os.path.join(root, "**/file19?.txt"), recursive=True))
+
+        index = FileIndex(os.path.join(root, "files.sqlite"), conf.FILE_INDEX_WORKERS, refresh_interval=float("inf"))
+        bench(f"build index ({conf.FILE_INDEX_WORKERS} threads)", lambda: index.index(root))
+        for name, query in QUERIES:
+            bench(name, lambda: index.find(root, **query))
+
+        bench("refresh, nothing changed", lambda: index.refresh(root))
+        open(os.path.join(root, "src", "pkg0", "dir0", "new.py"), "w").close()
+        bench("refresh, one directory changed", lambda: index.refresh(root))
+    finally:
+        shutil.rmtree(root)
@@ -0,0 +1,50 @@
+"""
+Measures paging through a big file with `read_file_at_specific_line_range`, 200 lines at a time, comparing the
+old `readlines()` of the whole file per call with `LineIndex` (one pass to find the line offsets, then a seek per call).
+
+Usage: `uv run benchmarks/bench_line_ranges.py [line count] [pages]`
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gem.fs import LineIndex
+
+PAGE = 200
+
+
+def legacy_lines(path: str, start_line: int, end_line: int) -> str:
+    """What `read_file_at_specific_line_range` used to do."""
+    with open(path, "r", encoding="utf-8") as file:
+        lines = file.readlines()
+    return "\n".join(lines[start_line - 1:end_line]).strip()
+
+
+def bench(name: str, func, pages: list[int]) -> None:
+    start = time.perf_counter()
+    for first in pages:
+        func(first, first + PAGE - 1)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {elapsed:8.3f} s  ({elapsed / len(pages) * 1000:.2f} ms per page)")
+
+
+if __name__ == "__main__":
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    page_count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    with tempfile.NamedTemporaryFile("w", suffix=".log", delete=False) as f:
+        for i in range(line_count):
+            f.write(f"2025-01-01 12:00:{i % 60:02d} INFO request {i} handled in {i % 997} ms\n")
+        path = f.name
+    try:
+        # pages spread over the whole file, like the model paging through it
+        pages = [1 + (line_count - PAGE) * i // (page_count - 1) // PAGE * PAGE for i in range(page_count)]
+        print(f"{line_count} lines, {os.path.getsize(path) / 1e6:.1f} MB, {page_count} pages of {PAGE} lines")
+        bench("readlines per page", lambda first, last: legacy_lines(path, first, last), pages)
+        index = LineIndex()
+        bench("LineIndex (incl. indexing)", lambda first, last: index.read_lines(path, first, last), pages)
+        bench("LineIndex, indexed", lambda first, last: index.read_lines(path, first, last), pages)
+    finally:
+        os.remove(path)
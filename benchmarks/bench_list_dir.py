@@ -0,0 +1,80 @@
+"""
+Measures recursive `list_dir` on a synthetic tree, comparing the old `os.walk` + `isdir`/`isfile`/`getsize`
+listing with the `os.scandir` based `gem.fs.walk`, uncapped and with the default item cap.
+
+The tree is created once in a temp directory: 1000 directories of 200 empty files each, plus a `node_modules`
+directory of the same size that the new listing skips by default.
+
+Usage: `uv run benchmarks/bench_list_dir.py [file count]`
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config as conf
+from gem import format_size
+from gem.fs import walk
+
+
+def make_tree(root: str, file_count: int, files_per_dir: int = 200) -> None:
+    for base in ("src", "node_modules"):
+        for d in range(file_count // files_per_dir // 2):
+            directory = os.path.join(root, base, f"pkg{d // 50}", f"dir{d}")
+            os.makedirs(directory)
+            for f in range(files_per_dir):
+                open(os.path.join(directory, f"file{f}.txt"), "w").close()
+
+
+def legacy_list(path: str) -> list:
+    """The recursive listing `list_dir` used to do."""
+    items = []
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in dirnames + filenames:
+            item_path = os.path.join(dirpath, name)
+            items.append({
+                'name': os.path.basename(item_path),
+                'path': item_path,
+                'is_dir': os.path.isdir(item_path),
+                'size': format_size(os.path.getsize(item_path)) if os.path.isfile(item_path) else 'N/A'
+            })
+    return items
+
+
+def scandir_list(path: str, exclude=(), max_items=None) -> list:
+    items = []
+    for entry, _ in walk(path, exclude=exclude):
+        if len(items) == max_items:
+            break
+        is_dir = entry.is_dir()
+        items.append({
+            'name': entry.name,
+            'path': entry.path,
+            'is_dir': is_dir,
+            'size': format_size(entry.stat().st_size) if not is_dir else 'N/A'
+        })
+    return items
+
+
+def bench(name: str, func) -> None:
+    func()  # warm up the os cache
+    start = time.perf_counter()
+    items = func()
+    print(f"{name:<36} {time.perf_counter() - start:8.3f} s  {len(items):>8} items")
+
+
+if __name__ == "__main__":
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    root = tempfile.mkdtemp(prefix="bench_list_dir_")
+    try:
+        print(f"creating {file_count} files...")
+        make_tree(root, file_count)
+        bench("os.walk + isdir/isfile/getsize", lambda: legacy_list(root))
+        bench("scandir walk", lambda: scandir_list(root))
+        bench("scandir walk, default excludes", lambda: scandir_list(root, exclude=conf.LIST_DIR_EXCLUDE))
+        bench(f"scandir walk, first {conf.LIST_DIR_MAX_ITEMS} items", lambda: scandir_list(root, conf.LIST_DIR_EXCLUDE, conf.LIST_DIR_MAX_ITEMS))
+    finally:
+        shutil.rmtree(root)
@@ -0,0 +1,53 @@
+"""
+Compares generating the schemas of every tool in `utility.TOOLS` from scratch (cold start)
+with loading them from the on-disk `SchemaCache` (warm start).
+Every run is a fresh process, like a real startup.
+
+Usage: `uv run benchmarks/bench_schema_cache.py`
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPET = """
+import sys, time
+sys.path.insert(0, {root!r})
+from func_to_schema import SchemaCache
+from utility import TOOLS
+
+start = time.perf_counter()
+cache = SchemaCache({path!r})
+schemas = [cache.function_to_json_schema(func) for func in TOOLS]
+cache.save()
+print((time.perf_counter() - start) * 1000, cache.hits, cache.misses)
+"""
+
+
+def run(path: str) -> tuple[float, int, int]:
+    output = subprocess.run(
+        [sys.executable, "-c", SNIPPET.format(root=PROJECT_ROOT, path=path)],
+        capture_output=True, text=True, check=True,
+    ).stdout.strip().splitlines()[-1]
+    elapsed, hits, misses = output.split()
+    return float(elapsed), int(hits), int(misses)
+
+
+if __name__ == "__main__":
+    repeat = 5
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tool_schemas.json")
+        cold, warm = [], []
+        for _ in range(repeat):
+            if os.path.exists(path):
+                os.remove(path)
+            cold.append(run(path))
+            warm.append(run(path))
+
+    cold_ms = min(result[0] for result in cold)
+    warm_ms = min(result[0] for result in warm)
+    print(f"cold start: {cold_ms:6.2f} ms ({cold[0][2]} schemas generated)")
+    print(f"warm start: {warm_ms:6.2f} ms ({warm[0][1]} schemas loaded from cache)")
+    print(f"warm start is {cold_ms / warm_ms:.1f}x faster")
@@ -0,0 +1,78 @@
+"""
+Measures the overhead of turning a tool call's JSON arguments into function arguments,
+comparing the old per-call `inspect.signature` + recursive conversion with the precompiled `ArgumentAdapter`.
+
+Usage: `uv run benchmarks/bench_tool_dispatch.py [file count]`
+"""
+import inspect
+import json
+import os
+import sys
+import time
+from typing import Union
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import BaseModel
+from func_to_schema import ArgumentAdapter
+from utility import FileData, write_files
+
+
+def legacy_convert(annotation, arg_value):
+    """The conversion `Assistant` used to run on every tool call."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        try:
+            return annotation(**arg_value)
+        except (TypeError, ValueError):
+            return arg_value
+    elif hasattr(annotation, "__origin__"):
+        origin = annotation.__origin__
+        args = annotation.__args__
+        if origin is list:
+            return [legacy_convert(args[0], item) for item in arg_value]
+        elif origin is dict:
+            return {key: legacy_convert(args[1], value) for key, value in arg_value.items()}
+        elif origin is Union:
+            for arg_type in args:
+                try:
+                    return legacy_convert(arg_type, arg_value)
+                except (ValueError, TypeError):
+                    continue
+    return arg_value
+
+
+def legacy_dispatch(func, arguments: str) -> dict:
+    function_args = json.loads(arguments)
+    sig = inspect.signature(func)
+    for param_name, param in sig.parameters.items():
+        if param_name in function_args:
+            function_args[param_name] = legacy_convert(param.annotation, function_args[param_name])
+    return function_args
+
+
+def bench(name: str, dispatch, arguments: str, repeat: int) -> float:
+    dispatch(arguments)  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        dispatch(arguments)
+    per_call = (time.perf_counter() - start) / repeat
+    print(f"{name:<22} {per_call * 1000:8.3f} ms/call")
+    return per_call
+
+
+if __name__ == "__main__":
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeat = 200
+    arguments = json.dumps({
+        "files_data": [{"file_path": f"out/file_{i}.txt", "content": "x" * 200} for i in range(file_count)]
+    })
+    print(f"write_files with {file_count} FileData ({len(arguments) / 1024:.0f} KB of JSON), {repeat} calls")
+
+    start = time.perf_counter()
+    adapter = ArgumentAdapter(write_files)
+    print(f"{'adapter build (once)':<22} {(time.perf_counter() - start) * 1000:8.3f} ms")
+
+    legacy = bench("legacy", lambda args: legacy_dispatch(write_files, args), arguments, repeat)
+    adapted = bench("ArgumentAdapter", adapter.validate_json, arguments, repeat)
+    assert legacy_dispatch(write_files, arguments) == adapter.validate_json(arguments)
+    print(f"speedup: {legacy / adapted:.1f}x")
@@ -0,0 +1,63 @@
+"""
+Measures `write_files` on a batch of small files, comparing the old serial `open(..., "w")` per file with the
+atomic writes on a thread pool, for a first write and for rewriting the same content (skipped by hash).
+
+Usage: `uv run benchmarks/bench_write_files.py [file count]`
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config as conf
+from utility import FileData, write_files
+
+
+def legacy_write(files_data: list[FileData]) -> None:
+    """What `write_files` used to do."""
+    for file_data in files_data:
+        nested_dirs = os.path.dirname(file_data.file_path)
+        if nested_dirs:
+            os.makedirs(nested_dirs, exist_ok=True)
+        with open(file_data.file_path, "w", encoding="utf-8") as f:
+            f.write(file_data.content)
+
+
+def bench(name: str, func) -> None:
+    start = time.perf_counter()
+    func()
+    print(f"{name:<44} {time.perf_counter() - start:8.3f} s")
+
+
+if __name__ == "__main__":
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    root = tempfile.mkdtemp(prefix="bench_write_files_")
+    try:
+        def batch(directory: str) -> list[FileData]:
+            return [
+                FileData(file_path=os.path.join(root, directory, f"pkg{i % 20}", f"file{i}.py"), content=f"# file {i}\n" + "x = 1\n" * 500)
+                for i in range(file_count)
+            ]
+
+        print(f"{file_count} files of {len(batch('')[0].content) / 1024:.1f} KB")
+        bench("serial open(..., 'w')", lambda: legacy_write(batch("legacy")))
+        bench("serial open(..., 'w'), same content again", lambda: legacy_write(batch("legacy")))
+        # the tool prints a line per file, only the time of the writes is of interest here
+        with open(os.devnull, "w") as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                start = time.perf_counter()
+                write_files(batch("atomic"))
+                first = time.perf_counter() - start
+                start = time.perf_counter()
+                write_files(batch("atomic"))
+                again = time.perf_counter() - start
+            finally:
+                sys.stdout = stdout
+        print(f"{f'atomic + fsync ({conf.WRITE_FILES_WORKERS} threads)':<44} {first:8.3f} s")
+        print(f"{'atomic, same content again (skipped)':<44} {again:8.3f} s")
+    finally:
+        shutil.rmtree(root)
@@ -5,7 +5,12 @@ Needs restart if anything is changed here.
 """
 
 import datetime
+import json
+import os
 import platform
+import tempfile
+import threading
+import time
 import requests
 
 # Which model to use
@@ -29,9 +34,145 @@ SEED = None
 
 # Script parameters
 
+# Directory where caches are saved
+CACHE_DIR = "cache"
+
+# Where the generated tool schemas are cached so they are only regenerated when a tool changes, None disables it
+SCHEMA_CACHE_PATH = os.path.join(CACHE_DIR, "tool_schemas.json")
+
+# Your location is put in the system prompt, it is cached and refreshed in background when older than this (in seconds)
+LOCATION_CACHE_TTL = 24 * 60 * 60
+LOCATION_CACHE_PATH = os.path.join(CACHE_DIR, "location.json")
+# Seconds to wait for the location service
+LOCATION_TIMEOUT = 3
+
 # Whether to clear the console before starting
 CLEAR_BEFORE_START = True
 
+# Stream the response token by token instead of waiting for the full reply
+STREAM = True
+
+# How many times per second the streamed markdown gets re-rendered
+STREAM_REFRESH_PER_SECOND = 12
+
+# Print time to first token and tokens/sec after every streamed response
+SHOW_STREAM_STATS = False
+
+# FILE SYSTEM
+
+# Max amount of entries `list_dir` returns at once, the model asks for the next ones with the returned cursor
+LIST_DIR_MAX_ITEMS = 500
+# Names (glob patterns) `list_dir` skips unless asked otherwise, matching directories are not walked
+LIST_DIR_EXCLUDE = [".git", "node_modules"]
+# Amount of threads used to scan directories when computing directory sizes
+DIRECTORY_SIZE_WORKERS = 8
+# SQLite index of the paths of searched directories, recursive `find_files` searches (`**` patterns) use it
+# instead of walking the tree every time, None disables it
+FILE_INDEX_PATH: str | None = os.path.join(CACHE_DIR, "files.sqlite")
+# Seconds an indexed directory is trusted before a search checks it for changes (only changed directories are listed again),
+# 0 checks on every search (a stat per indexed directory) so files written by other programs are always found
+FILE_INDEX_REFRESH_INTERVAL = 0
+# Amount of threads used to scan directories when indexing them
+FILE_INDEX_WORKERS = 8
+# `search_file_contents`: default max amount of matching lines, lines of context around each match,
+# threads searching files, files bigger than this (bytes) are skipped, longer lines are cut
+SEARCH_MAX_MATCHES = 100
+SEARCH_CONTEXT_LINES = 2
+SEARCH_WORKERS = 8
+SEARCH_MAX_FILE_BYTES = 20 * 1024 * 1024
+SEARCH_MAX_LINE_LENGTH = 300
+# Max amount of bytes `read_file` returns at once, the rest of the file is read with its "tail"/"range" modes
+# (outputs longer than TOOL_RESULT_MAX_CHARS still go through the tool result store)
+READ_FILE_MAX_BYTES = 100 * 1024
+# Amount of files whose line offsets are kept so `read_file_at_specific_line_range` can seek straight to a line
+LINE_INDEX_MAX_FILES = 16
+# Amount of files `write_files` writes at the same time
+WRITE_FILES_WORKERS = 8
+
+# Max amount of tool calls from a single response that can run at the same time
+# only tools marked with `@parallel_safe` in `utility.py` run concurrently, 1 disables it
+MAX_PARALLEL_TOOL_CALLS = 4
+
+# Limits for a single message, the assistant keeps calling the model and running tools until it answers or one of these is reached (None means no limit)
+# Max amount of model calls
+MAX_STEPS_PER_TURN = 25
+# Max amount of seconds, checked between model calls
+TURN_TIMEOUT = 300
+# Max amount of tokens (prompt + completion of every model call combined)
+TURN_TOKEN_BUDGET = None
+
+# CONTEXT WINDOW
+
+# Max amount of tokens sent to the model with every request, once the conversation gets bigger than this
+# the outputs of older tool calls get cut short (or summarized, see below), None sends the whole conversation, e.g. 100_000
+CONTEXT_TOKEN_BUDGET = None
+# Amount of latest messages from you (and everything after them) that are always sent as they are
+CONTEXT_KEEP_RECENT_TURNS = 2
+# Whether to summarize old tool outputs in background (extra model calls, paid like any other), if False they are only cut short
+CONTEXT_SUMMARIZE_TOOL_OUTPUTS = False
+# Model used for the summaries, None means MODEL
+CONTEXT_SUMMARY_MODEL = None
+
+# TOOL OUTPUTS
+
+# Tool outputs longer than this many characters are not put in the conversation, the model gets a preview
+# and reads the rest with the `read_tool_result` tool when it needs to
+TOOL_RESULT_MAX_CHARS = 20_000
+# Per tool overrides of TOOL_RESULT_MAX_CHARS, None means never cut short
+TOOL_RESULT_MAX_CHARS_PER_TOOL = {
+    "read_tool_result": None,
+}
+# Amount of characters of the preview
+TOOL_RESULT_PREVIEW_CHARS = 2_000
+# Directory where the long outputs are saved, None keeps them in memory (lost when the assistant is closed)
+TOOL_RESULT_STORE_DIR = None
+
+# HTTP
+
+# Seconds to wait for a connection and between bytes received, used by every web tool
+HTTP_CONNECT_TIMEOUT = 5
+HTTP_READ_TIMEOUT = 30
+# How many times to retry a request that couldn't connect, was reset or got a 5xx response,
+# waiting HTTP_RETRY_BACKOFF * 2^n seconds between tries (POST requests are only retried when they failed to connect)
+HTTP_RETRIES = 3
+HTTP_RETRY_BACKOFF = 0.5
+# Max amount of connections kept alive per host
+HTTP_POOL_SIZE = 16
+# Max amount of pages `fetch_urls` downloads at the same time, in total and from the same host
+FETCH_URLS_MAX_CONCURRENCY = 8
+FETCH_URLS_PER_HOST = 2
+# Max amount of bytes of a response body the http tools read, the rest is dropped (binary bodies are never read)
+HTTP_MAX_RESPONSE_BYTES = 1024 * 1024
+
+# Where GET responses of the web tools are cached, following the Cache-Control, ETag and Last-Modified headers of the server, None disables it
+HTTP_CACHE_PATH = os.path.join(CACHE_DIR, "http.sqlite")
+# Max size of the cache in bytes, the least recently used responses are removed first
+HTTP_CACHE_MAX_BYTES = 100 * 1024 * 1024
+# Max seconds a response with Last-Modified but no Cache-Control/Expires is reused for without asking the server
+# (a tenth of the time since its last modification), 0 always revalidates them. Responses without any caching headers,
+# like most REST APIs, are never reused
+HTTP_CACHE_HEURISTIC_TTL = 0
+
+# RESPONSE CACHE
+
+# Saves model responses on disk and reuses them when the exact same request (model, parameters, messages and tools) is sent again,
+# useful for replaying scripted sessions. Only used when SEED is set and TEMPERATURE is at most COMPLETION_CACHE_MAX_TEMPERATURE
+# since otherwise the same request is expected to get a different response
+COMPLETION_CACHE = False
+COMPLETION_CACHE_MAX_TEMPERATURE = 0.3
+COMPLETION_CACHE_PATH = os.path.join(CACHE_DIR, "completions.sqlite")
+# Max size of the cache in bytes, the least recently used responses are removed first
+COMPLETION_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Max amount of requests `AsyncAssistant` sessions can have running at the same time per provider (the part before `/` in the model name)
+# shared by every session in the process, providers not listed use "default"
+ASYNC_PROVIDER_CONCURRENCY = {
+    "default": 8,
+}
+
+# Amount of threads `AsyncAssistant` uses to run sync tools
+ASYNC_TOOL_WORKERS = 16
+
 
 # Gemini safety settings
 SAFETY_SETTINGS = [
@@ -54,9 +195,9 @@ SAFETY_SETTINGS = [
 ]
 
 
-def get_location_info():
+def fetch_location_info():
     try:
-        response = requests.get("http://www.geoplugin.net/json.gp")
+        response = requests.get("http://www.geoplugin.net/json.gp", timeout=LOCATION_TIMEOUT)
         response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
         data = response.json()
 
@@ -71,13 +212,54 @@ def get_location_info():
         return location_info
     except requests.exceptions.RequestException as e:
         location_info = f"Location: Could not retrieve location information. Error: {e}"
-        print(e)
         return location_info
     except (ValueError, KeyError) as e:
         location_info = f"Location: Error parsing location data. Error: {e}"
-        print(e)
         return location_info
 
+def refresh_location_cache():
+    """Fetches the location and saves it to LOCATION_CACHE_PATH, failures are not cached."""
+    location_info = fetch_location_info()
+    if not location_info.startswith("Location: City:"):
+        return
+    try:
+        directory = os.path.dirname(os.path.abspath(LOCATION_CACHE_PATH))
+        os.makedirs(directory, exist_ok=True)
+        # a temp file of its own, two processes starting at the same time both refresh the cache
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"location_info": location_info, "fetched_at": time.time()}, f)
+        os.replace(tmp_path, LOCATION_CACHE_PATH)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+def get_location_info():
+    """
+    Returns the cached location right away and refreshes it in a background thread
+    if it is missing or older than LOCATION_CACHE_TTL, so a slow network never delays startup.
+    """
+    cached = None
+    try:
+        with open(LOCATION_CACHE_PATH, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        pass
+    if not isinstance(cached, dict):  # valid json but not a cache we wrote
+        cached = None
+
+    if cached is None or time.time() - cached.get("fetched_at", 0) > LOCATION_CACHE_TTL:
+        threading.Thread(target=refresh_location_cache, daemon=True).start()
+
+    if cached and cached.get("location_info"):
+        return cached["location_info"]
+    return "Location: Unknown"
+
 def get_system_prompt():
     # System instruction, tell it who it is or what it can do or will do, this is an example, you can modify it however you want
     return f"""
@@ -110,6 +292,24 @@ MAX_DUCKDUCKGO_SEARCH_RESULTS: int = 4
 # Timeout
 DUCKDUCKGO_TIMEOUT: int = 20
 
+# Max amount of searches `duckduckgo_search_many` runs at the same time
+DUCKDUCKGO_MAX_CONCURRENT_SEARCHES: int = 4
+
+# Seconds search results are reused for when the same query is searched again, None disables the cache
+DUCKDUCKGO_CACHE_TTL: int | None = 60 * 60
+DUCKDUCKGO_CACHE_PATH: str = os.path.join(CACHE_DIR, "search.sqlite")
+
+
+# WIKIPEDIA
+
+# Where wikipedia pages are cached, None disables it
+WIKIPEDIA_CACHE_PATH: str | None = os.path.join(CACHE_DIR, "wikipedia.sqlite")
+
+# Seconds a page name is trusted to point to the same page revision (and search results are reused) before checking again
+WIKIPEDIA_CACHE_TTL: int = 24 * 60 * 60
+
+# Max amount of pages `get_wikipedia_summaries` fetches at the same time
+WIKIPEDIA_MAX_CONCURRENT_REQUESTS: int = 4
 
 # REDDIT
 
@@ -118,3 +318,11 @@ MAX_REDDIT_SEARCH_RESULTS: int = 5
 
 # Maximum amount of reddit comments to load when looking into specific reddit posts, -1 for no limit
 MAX_REDDIT_POST_COMMENTS: int = -1
+
+# How many "load more comments" links are followed when loading the comments of a post, each one is another request, 0 only keeps the comments of the first request
+REDDIT_REPLACE_MORE_LIMIT: int = 4
+
+# Default filters of the comments tool (the model can override them), comments deeper than REDDIT_MAX_COMMENT_DEPTH (0 is top level comments)
+# or with a score lower than REDDIT_MIN_COMMENT_SCORE are skipped with their replies, None means no filter
+REDDIT_MAX_COMMENT_DEPTH: int | None = None
+REDDIT_MIN_COMMENT_SCORE: int | None = None
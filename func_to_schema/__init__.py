@@ -6,15 +6,24 @@ It leverages type hints, docstrings, and function signatures to automatically
 generate a JSON schema representing the function's parameters, descriptions, and
 other relevant information. This allows LLMs to understand the function's
 purpose and how to call it correctly.
+
+It also provides `ArgumentAdapter` to validate and convert the JSON arguments the LLM
+sends back into the types the function expects, and `SchemaCache` to keep the generated
+schemas on disk between runs.
 """
 
+import hashlib
 import inspect
+import json
+import os
 from types import UnionType
 from typing import Any, Dict, get_type_hints, get_origin, get_args, Literal, Callable
 import docstring_parser
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError
+from typing_extensions import NotRequired, Required, TypedDict
 import warnings
 import re
+import tempfile
 
 def function_to_json_schema(func: Callable) -> Dict[str, Any]:
     """
@@ -137,3 +146,161 @@ def type_hint_to_json_schema(type_hint) -> Dict[str, Any]:
     warnings.warn(f"Unsupported type hint: {type_hint}. Treating as Any.", UserWarning)
     return {}
 
+
+
+class ToolArgumentError(ValueError):
+    pass
+
+
+class ArgumentAdapter:
+    """
+    Validates and converts the JSON arguments of a function call in a single pass.
+
+    The signature is compiled once into a pydantic `TypeAdapter` over a `TypedDict` of the parameters,
+    so every call only parses the JSON, coerces the values (e.g. "5" to 5, 5 to "5", dicts to Pydantic models)
+    and reports every mismatch at once.
+
+    ```py
+    adapter = ArgumentAdapter(write_files)
+    write_files(**adapter.validate_json('{"files_data": [{"file_path": "a.txt", "content": "hi"}]}'))
+    ```
+    """
+
+    def __init__(self, func: Callable) -> None:
+        self.func_name = func.__name__
+        signature = inspect.signature(func)
+        type_hints = get_type_hints(func)
+
+        fields = {}
+        for param_name, param in signature.parameters.items():
+            if param.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+                continue
+            annotation = type_hints.get(param_name, Any)
+            # missing optional arguments are left out so the function's own defaults apply
+            fields[param_name] = Required[annotation] if param.default == inspect.Parameter.empty else NotRequired[annotation]
+
+        arguments_type = TypedDict(f"{func.__name__}_arguments", fields, total=False)
+        arguments_type.__pydantic_config__ = ConfigDict(arbitrary_types_allowed=True, extra="forbid", coerce_numbers_to_str=True)
+        self.type_adapter = TypeAdapter(arguments_type)
+
+    def validate_json(self, arguments: str | bytes | dict | None) -> Dict[str, Any]:
+        """
+        Args:
+            arguments: The JSON string of arguments (or an already parsed dict).
+
+        Returns:
+            The keyword arguments to call the function with.
+
+        Raises:
+            ToolArgumentError: If the arguments are not valid JSON or don't match the signature.
+        """
+        try:
+            if isinstance(arguments, dict):
+                return self.type_adapter.validate_python(arguments)
+            return self.type_adapter.validate_json(arguments or "{}")
+        except ValidationError as e:
+            errors = "; ".join(
+                f"{'.'.join(str(loc) for loc in error['loc']) or 'arguments'}: {error['msg']}"
+                for error in e.errors()
+            )
+            raise ToolArgumentError(f"Invalid arguments for {self.func_name}: {errors}") from None
+
+
+class SchemaCache:
+    """
+    Memoizes `function_to_json_schema` on disk.
+
+    Entries are keyed by the function's qualified name and a hash of its signature, its docstring,
+    the Pydantic models in its annotations and the source of this module, so a schema is only
+    regenerated when something it depends on changes.
+
+    ```py
+    cache = SchemaCache("cache/tool_schemas.json")
+    schemas = [cache.function_to_json_schema(func) for func in TOOLS]
+    cache.save()
+    ```
+
+    Args:
+        path: The JSON file the cache is saved to, None keeps it in memory only.
+    """
+
+    __module_hash: str | None = None
+
+    def __init__(self, path: str | None = None) -> None:
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.__entries: Dict[str, Dict[str, Any]] = {}
+        self.__dirty = False
+
+        if path and os.path.isfile(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.__entries = json.load(f)
+            except (OSError, ValueError):
+                self.__entries = {}  # corrupted cache, it gets rebuilt
+
+    def function_to_json_schema(self, func: Callable) -> Dict[str, Any]:
+        """Same as `function_to_json_schema` but returns the cached schema if the function didn't change."""
+        key = f"{func.__module__}.{func.__qualname__}"
+        func_hash = self.hash_function(func)
+
+        entry = self.__entries.get(key)
+        if entry and entry["hash"] == func_hash:
+            self.hits += 1
+            return entry["schema"]
+
+        self.misses += 1
+        # round trip through json so a fresh schema is identical to a cached one
+        schema = json.loads(json.dumps(function_to_json_schema(func)))
+        self.__entries[key] = {"hash": func_hash, "schema": schema}
+        self.__dirty = True
+        return schema
+
+    def save(self) -> None:
+        """Writes the cache to disk if anything changed."""
+        if not self.path or not self.__dirty:
+            return
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        # written to a temp file first so a crash never leaves a half written cache
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.__entries, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.__dirty = False
+
+    @classmethod
+    def hash_function(cls, func: Callable) -> str:
+        """
+        Hash of everything the schema depends on: the signature (parameter names, annotations and defaults),
+        the docstring, the fields of the Pydantic models it uses and this module's own source.
+        """
+        if cls.__module_hash is None:
+            with open(__file__, "rb") as f:
+                cls.__module_hash = hashlib.sha256(f.read()).hexdigest()
+
+        sha = hashlib.sha256(cls.__module_hash.encode())
+        sha.update(str(inspect.signature(func)).encode())
+        sha.update((func.__doc__ or "").encode())
+
+        for model in sorted(_find_models(func.__annotations__.values()), key=lambda m: m.__qualname__):
+            sha.update(f"{model.__qualname__}{model.__doc__}{model.model_fields}".encode())
+        return sha.hexdigest()
+
+
+def _find_models(annotations) -> set:
+    """Pydantic models used anywhere in the given annotations (e.g. inside list[Model] or as a field of another model)."""
+    models = set()
+    for annotation in annotations:
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            models.add(annotation)
+            models |= _find_models(field.annotation for field in annotation.model_fields.values())
+        else:
+            models |= _find_models(get_args(annotation))
+    return models
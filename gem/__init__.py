@@ -2,4 +2,15 @@ from .command import *
 from .builtin_commands import *
 from .utils import *
 from .inspection import *
-from .prompting import *
\ No newline at end of file
+from .prompting import *
+from .streaming import *
+from .tool_executor import *
+from .turn import *
+from .context import *
+from .result_store import *
+from .cache import *
+from .http_cache import *
+from .wiki_cache import *
+from .fs import *
+from .file_index import *
+from .content_search import *
\ No newline at end of file
@@ -0,0 +1,134 @@
+"""
+Persistent key/value cache backed by SQLite
+
+Used for anything that is worth keeping between runs (model responses, web pages...).
+Entries can expire after a TTL and the least recently used ones are evicted once the cache gets bigger than `max_bytes`.
+
+Example:
+    ```py
+    cache = DiskCache("cache/things.sqlite", max_bytes=50 * 1024 * 1024)
+    key = make_key("my-namespace", {"some": "params"})
+    value = cache.get(key)
+    if value is None:
+        value = compute().encode()
+        cache.set(key, value, ttl=3600)
+    ```
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+
+def _to_jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):  # pydantic models, litellm messages
+        return value.model_dump()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    return repr(value)
+
+
+def make_key(*parts: Any) -> str:
+    """A stable hash of JSON-like parts, dict key order doesn't matter."""
+    payload = json.dumps(parts, sort_keys=True, default=_to_jsonable, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class DiskCache:
+    """
+    Args:
+        path: The SQLite file, ":memory:" keeps the cache in memory.
+        max_bytes: The total size of the values after which the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 100 * 1024 * 1024) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.__db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.__db.execute("PRAGMA journal_mode=WAL")
+        self.__db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self.__db.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """The value of a key, None if it is missing or expired."""
+        now = time.time()
+        with self.__lock:
+            row = self.__db.execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self.misses += 1
+                if row is not None:
+                    self.__db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            self.hits += 1
+            self.__db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """
+        Args:
+            key: The key.
+            value: The value.
+            ttl: Seconds after which the entry expires, None never expires (it can still be evicted).
+        """
+        if len(value) > self.max_bytes:
+            return
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        with self.__lock:
+            self.__db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), expires_at, now),
+            )
+            self.__evict()
+
+    def delete(self, key: str) -> None:
+        with self.__lock:
+            self.__db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__db.execute("DELETE FROM entries")
+
+    @property
+    def size(self) -> int:
+        """Total size of the stored values in bytes."""
+        with self.__lock:
+            return self.__db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return self.__db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def __evict(self) -> None:
+        """Drops expired entries, then the least recently used ones until the cache fits in max_bytes."""
+        self.__db.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        total = self.__db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evict = []
+        for key, size in self.__db.execute("SELECT key, size FROM entries ORDER BY last_access ASC"):
+            if total <= self.max_bytes:
+                break
+            evict.append((key,))
+            total -= size
+        self.__db.executemany("DELETE FROM entries WHERE key = ?", evict)
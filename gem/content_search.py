@@ -0,0 +1,258 @@
+"""
+Search of the contents of the files of a tree, like a small `grep -r`
+
+Files are listed with the rules of the `.gitignore` (and `.ignore`) files found on the way, ignored directories are
+not walked at all. Each file is searched on a thread pool through `mmap`, so the regex runs on the file without it
+being read into a Python string first, and binary files (a NUL byte in their first 8 KB) are skipped.
+
+Matches come back in the order of the walk. Only a small window of files is searched ahead, once `max_matches`
+are found the remaining files are neither searched nor even listed.
+"""
+import mmap
+import os
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from .file_index import glob_to_regex
+
+IGNORE_FILES = (".gitignore", ".ignore")
+# never searched, even without an ignore file saying so
+ALWAYS_IGNORED = (".git",)
+BINARY_CHECK_BYTES = 8192
+
+
+@dataclass
+class IgnoreRule:
+    regex: re.Pattern
+    negate: bool
+    dir_only: bool
+
+
+def parse_ignore_file(text: str) -> list[IgnoreRule]:
+    """Rules of a `.gitignore`, matched against paths relative to its directory (`/` separated)."""
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate or line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        # a pattern with a slash (other than at the end) is relative to the directory, otherwise it matches at any depth
+        if "/" not in line:
+            line = "**/" + line
+        rules.append(IgnoreRule(glob_to_regex(line.lstrip("/")), negate, dir_only))
+    return rules
+
+
+@dataclass
+class _IgnoreFile:
+    base: str  # directory of the ignore file, relative to the searched directory ("" for itself)
+    rules: list[IgnoreRule] = field(default_factory=list)
+
+
+def _is_ignored(ignore_files: list[_IgnoreFile], relative: str, is_dir: bool) -> bool:
+    """Like git, the last matching rule wins, the rules of deeper ignore files come after the ones of their parents."""
+    ignored = False
+    for ignore_file in ignore_files:
+        path = relative[len(ignore_file.base) + 1:] if ignore_file.base else relative
+        for rule in ignore_file.rules:
+            if (is_dir or not rule.dir_only) and rule.regex.match(path):
+                ignored = not rule.negate
+    return ignored
+
+
+def _load_ignore_file(directory: str, base: str) -> Optional[_IgnoreFile]:
+    rules = []
+    for name in IGNORE_FILES:
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8", errors="replace") as f:
+                rules += parse_ignore_file(f.read())
+        except OSError:
+            continue
+    return _IgnoreFile(base, rules) if rules else None
+
+
+def iter_files(root: str, glob: Optional[str] = None, use_ignore_files: bool = True) -> Iterator[str]:
+    """
+    Yields the files of a tree that are not ignored, in a stable order: the files of a directory (sorted by name),
+    then the files of each of its subdirectories.
+
+    Args:
+        root: The directory to list.
+        glob: Only files matching this glob, matched against the name if it has no `/`, else against the path relative to `root`.
+        use_ignore_files: Whether to follow `.gitignore`/`.ignore` files.
+    """
+    matcher = None
+    if glob:
+        matcher = glob_to_regex(glob if "/" in glob.replace("\\", "/") else "**/" + glob)
+
+    # (directory, its path relative to root, ignore files that apply to it)
+    stack: list[tuple[str, str, list[_IgnoreFile]]] = [(root, "", [])]
+    while stack:
+        directory, relative_directory, ignore_files = stack.pop()
+        if use_ignore_files:
+            ignore_file = _load_ignore_file(directory, relative_directory)
+            if ignore_file:
+                ignore_files = ignore_files + [ignore_file]
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        subdirectories = []
+        for entry in entries:
+            if entry.name in ALWAYS_IGNORED:
+                continue
+            relative = f"{relative_directory}/{entry.name}" if relative_directory else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if not is_dir and not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            if ignore_files and _is_ignored(ignore_files, relative, is_dir):
+                continue
+            if is_dir:
+                subdirectories.append((entry.path, relative, ignore_files))
+            elif matcher is None or matcher.match(relative):
+                yield entry.path
+        stack.extend(reversed(subdirectories))
+
+
+def _line_bounds(data, position: int) -> tuple[int, int]:
+    """Start and end (without the newline) of the line containing `position`."""
+    start = data.rfind(b"\n", 0, position) + 1
+    end = data.find(b"\n", position)
+    return start, len(data) if end == -1 else end
+
+
+def _decode_line(line: bytes, max_length: int) -> str:
+    text = line.decode("utf-8", errors="replace").rstrip("\r")
+    return text if len(text) <= max_length else text[:max_length] + "..."
+
+
+def search_file(
+    path: str, regex: re.Pattern, max_matches: int, context_lines: int = 0, max_bytes: Optional[int] = None, max_line_length: int = 300
+) -> list[dict]:
+    """
+    Matching lines of a file, at most one per line and `max_matches` in total, as dicts with the keys
+    "line" (starting at 1), "text", "before" and "after" (the context lines).
+
+    Args:
+        path: The file.
+        regex: A bytes pattern.
+        max_matches: Stop after this many matching lines.
+        context_lines: Amount of lines before and after each match to include.
+        max_bytes: Files bigger than this are skipped.
+        max_line_length: Longer lines are cut.
+    """
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0 or (max_bytes is not None and size > max_bytes):
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data.find(b"\0", 0, BINARY_CHECK_BYTES) != -1:
+                    return []
+                return _search_data(data, regex, max_matches, context_lines, max_line_length)
+    except (OSError, ValueError):  # unreadable, or a special file that can't be mapped
+        return []
+
+
+def _search_data(data, regex: re.Pattern, max_matches: int, context_lines: int, max_line_length: int) -> list[dict]:
+    matches = []
+    line_number = 1
+    counted_until = 0  # newlines before this position are counted in line_number
+    position = 0
+    while len(matches) < max_matches:
+        match = regex.search(data, position)
+        if match is None:
+            break
+        start, end = _line_bounds(data, match.start())
+        line_number += data[counted_until:start].count(b"\n")
+        counted_until = start
+
+        before = []
+        line_start = start
+        for _ in range(context_lines):
+            if line_start == 0:
+                break
+            previous_start, previous_end = _line_bounds(data, line_start - 1)
+            before.insert(0, _decode_line(data[previous_start:previous_end], max_line_length))
+            line_start = previous_start
+        after = []
+        line_end = end
+        for _ in range(context_lines):
+            if line_end >= len(data) - 1:
+                break
+            next_start, next_end = _line_bounds(data, line_end + 1)
+            after.append(_decode_line(data[next_start:next_end], max_line_length))
+            line_end = next_end
+
+        matches.append({
+            "line": line_number,
+            "text": _decode_line(data[start:end], max_line_length),
+            "before": before,
+            "after": after,
+        })
+        # the next match is searched from the next line, a line is reported once
+        position = end + 1
+        if position > len(data):
+            break
+    return matches
+
+
+def search_files(
+    root: str,
+    regex: re.Pattern,
+    glob: Optional[str] = None,
+    max_matches: int = 100,
+    context_lines: int = 0,
+    max_workers: int = 8,
+    max_bytes: Optional[int] = None,
+    max_line_length: int = 300,
+    use_ignore_files: bool = True,
+) -> tuple[list[dict], int, bool]:
+    """
+    Searches the files of a tree (see `iter_files`) with `search_file` on a thread pool.
+
+    Returns:
+        The matches in walk order (each with its "path"), the amount of searched files, and whether the search
+        stopped because `max_matches` was reached.
+    """
+    files = iter_files(root, glob, use_ignore_files)
+    matches: list[dict] = []
+    searched = 0
+    window = max_workers * 4
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="content-search") as pool:
+        pending: deque = deque()  # futures in walk order, at most `window` of them
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < window:
+                path = next(files, None)
+                if path is None:
+                    exhausted = True
+                    break
+                pending.append((path, pool.submit(search_file, path, regex, max_matches, context_lines, max_bytes, max_line_length)))
+            if not pending:
+                break
+
+            path, future = pending.popleft()
+            searched += 1
+            for match in future.result():
+                matches.append({"path": path, **match})
+                if len(matches) >= max_matches:
+                    for _, other in pending:
+                        other.cancel()
+                    return matches, searched, True
+    return matches, searched, False
@@ -0,0 +1,139 @@
+"""
+Keeps the messages sent to the model under a token budget
+
+The stored history is never changed, `ContextManager.build` returns the list that gets sent instead.
+The system prompt and the most recent turns are always sent as they are, once the budget is crossed
+the outputs of older tool calls (the biggest part of a long session, whole web pages, files...) are
+replaced oldest first by a summary, or by a short preview while the summary is generated in background.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+SUMMARY_PROMPT = """Summarize the following output of the `{name}` tool so it can replace the original in a conversation.
+Keep every fact, name, number, path and url that might be needed later, drop everything else. Only reply with the summary.
+
+{content}"""
+
+
+def get_role(message) -> str:
+    return message["role"] if isinstance(message, dict) else message.role
+
+
+class ContextManager:
+    """
+    Args:
+        model: The model the messages are sent to, used for counting tokens.
+        token_budget: Max amount of tokens of the sent messages.
+        keep_recent_turns: Amount of latest user turns that are always sent verbatim.
+        preview_chars: How much of an elided tool output is kept while its summary isn't ready.
+        min_elide_tokens: Tool outputs smaller than this are never elided.
+        summarize: A function that takes a tool name and its output and returns a summary, None disables summaries.
+        token_counter: A function that takes a message and returns its token count, defaults to litellm's counter.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        token_budget: int,
+        keep_recent_turns: int = 2,
+        preview_chars: int = 500,
+        min_elide_tokens: int = 200,
+        summarize: Optional[Callable[[str, str], str]] = None,
+        token_counter: Optional[Callable[[object], int]] = None,
+    ) -> None:
+        self.model = model
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.preview_chars = preview_chars
+        self.min_elide_tokens = min_elide_tokens
+        self.summarize = summarize
+        self.token_counter = token_counter or self.__count_with_litellm
+
+        self.__token_counts: dict[int, tuple[object, str, int]] = {}
+        self.__summaries: dict[str, Future] = {}
+        self.__pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="context-summary") if summarize else None
+
+    def __count_with_litellm(self, message) -> int:
+        import litellm
+        return litellm.token_counter(model=self.model, messages=[message])
+
+    def count_tokens(self, message) -> int:
+        """Token count of a message, cached as long as the message and its content don't change."""
+        content = message.get("content") if isinstance(message, dict) else message.content
+        cached = self.__token_counts.get(id(message))
+        if cached and cached[0] is message and cached[1] is content:
+            return cached[2]
+        count = self.token_counter(message)
+        self.__token_counts[id(message)] = (message, content, count)
+        return count
+
+    def build(self, messages: list) -> list:
+        """
+        Returns the messages to send, with older tool outputs replaced if the budget is crossed.
+        """
+        counts = [self.count_tokens(message) for message in messages]
+        # drop cached counts of messages that are not in the history anymore (reset, load...)
+        alive = {id(message) for message in messages}
+        self.__token_counts = {key: value for key, value in self.__token_counts.items() if key in alive}
+
+        total = sum(counts)
+        if total <= self.token_budget:
+            return messages
+
+        built = list(messages)
+        for i in range(self.__recent_start(messages)):
+            if total <= self.token_budget:
+                break
+            message = messages[i]
+            if get_role(message) != "tool" or counts[i] < self.min_elide_tokens:
+                continue
+
+            replacement = {**message, "content": self.__replacement_content(message)}
+            total += self.count_tokens(replacement) - counts[i]
+            built[i] = replacement
+
+        return built
+
+    def __recent_start(self, messages: list) -> int:
+        """Index of the first message of the turns that are always kept."""
+        if self.keep_recent_turns <= 0:
+            return len(messages)
+        user_indexes = [i for i, message in enumerate(messages) if get_role(message) == "user"]
+        if len(user_indexes) < self.keep_recent_turns:
+            return 0
+        return user_indexes[-self.keep_recent_turns]
+
+    def __replacement_content(self, message: dict) -> str:
+        content = message["content"]
+        summary = self.__summary(message)
+        if summary is not None:
+            return f"[Summary of an earlier tool output]\n{summary}"
+
+        preview = content[:self.preview_chars]
+        return f"{preview}\n[... {len(content) - len(preview)} more characters of this earlier tool output were removed to save context ...]"
+
+    def __summary(self, message: dict) -> Optional[str]:
+        """The summary of a tool output if it is ready, otherwise starts generating it in background."""
+        if self.__pool is None:
+            return None
+
+        key = message.get("tool_call_id") or str(id(message))
+        future = self.__summaries.get(key)
+        if future is None:
+            self.__summaries[key] = self.__pool.submit(self.summarize, message.get("name", "unknown"), message["content"])
+            return None
+        if not future.done() or future.exception() is not None:
+            return None
+        return future.result()
+
+
+def litellm_summarizer(model: str) -> Callable[[str, str], str]:
+    """A `ContextManager` summarize function that asks `model` for the summary."""
+    def summarize(name: str, content: str) -> str:
+        import litellm
+        response = litellm.completion(
+            model=model,
+            messages=[{"role": "user", "content": SUMMARY_PROMPT.format(name=name, content=content)}],
+        )
+        return response.choices[0].message.content or ""
+    return summarize
@@ -0,0 +1,382 @@
+"""
+Persistent index of the paths under some directories, saved in SQLite
+
+`FileIndex.find` answers recursive glob (`**/*.py`) and substring searches from the index instead of walking
+the tree. A directory is indexed on its first search with directories scanned on a thread pool, after that
+`refresh` keeps the searched part of it up to date by comparing the mtime of every indexed directory under the
+searched one with the saved one and only rescanning the directories that changed (a file added, removed or renamed in them).
+
+Searches are turned into SQL conditions that can use an index: `*.ext` uses the extension column and other names
+are matched against the table of distinct names (much smaller than the table of paths, many files share a name),
+then the exact glob is checked on the selected paths only.
+
+inotify is not used since no file watching library is a dependency, the mtime comparison works everywhere and
+only costs a stat per directory. Tools that change files also call `mark_dirty`, a change made in the same mtime
+tick as the last scan would otherwise go unnoticed. Like with `DirectorySizer` a file rewritten in place keeps its old size and
+mtime in the index until something else changes in its directory, which doesn't affect which paths match.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots (path TEXT PRIMARY KEY, refreshed_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS names (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    name_id INTEGER NOT NULL REFERENCES names (id),
+    ext TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_parent ON entries (parent);
+CREATE INDEX IF NOT EXISTS entries_name ON entries (name_id);
+CREATE INDEX IF NOT EXISTS entries_ext ON entries (ext, path);
+"""
+
+
+def _extension(name: str) -> str:
+    """What follows the last `.` of a name, lowercased."""
+    return name.rsplit(".", 1)[1].lower() if "." in name else ""
+
+
+def _class_end(segment: str, start: int) -> int:
+    """Index of the `]` closing the character class opened at `start`, -1 if it's not closed (a literal `[`)."""
+    i = start + 1
+    if segment[i:i + 1] == "!":
+        i += 1
+    if segment[i:i + 1] == "]":  # a leading ] is part of the class
+        i += 1
+    return segment.find("]", i)
+
+
+def _segment_to_regex(segment: str) -> str:
+    """A glob segment (no `/`) to a regex where wildcards don't match `/`."""
+    regex = ""
+    i = 0
+    while i < len(segment):
+        char = segment[i]
+        end = _class_end(segment, i) if char == "[" else -1
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif end != -1:
+            content = segment[i + 1:end]
+            if content.startswith("!"):
+                content = "^" + content[1:]
+            regex += "[" + content.replace("\\", "\\\\") + "]"
+            i = end
+        else:
+            regex += re.escape(char)
+        i += 1
+    return regex
+
+
+def glob_to_regex(pattern: str) -> re.Pattern:
+    """
+    Compiles a glob pattern relative to a directory (`/` separated) into a regex matching relative paths,
+    with `**` as a whole segment matching any amount of directories like `glob.glob(..., recursive=True)`.
+    """
+    parts = []
+    segments = [segment for segment in pattern.replace("\\", "/").split("/") if segment not in ("", ".")]
+    for index, segment in enumerate(segments):
+        last = index == len(segments) - 1
+        if segment == "**":
+            parts.append("(?:[^/]+/)*[^/]+" if last else "(?:[^/]+/)*")
+        else:
+            parts.append(_segment_to_regex(segment) + ("" if last else "/"))
+    return re.compile("".join(parts) + r"\Z", re.DOTALL)
+
+
+def _glob_to_sql(pattern: str) -> str:
+    """
+    A SQLite GLOB pattern matching at least every path the glob matches (`*` matches `/` in SQLite),
+    used to let SQLite skip most rows before the exact regex match.
+    """
+    sql = re.sub(r"(\*\*/)+", "*", pattern.replace("\\", "/"))
+    return re.sub(r"\*+", "*", sql).replace("[!", "[^")
+
+
+class FileIndex:
+    """
+    Args:
+        path: The SQLite file, ":memory:" keeps the index in memory.
+        max_workers: Amount of threads scanning directories.
+        refresh_interval: Seconds after a refresh during which searches use the index as it is.
+    """
+
+    def __init__(self, path: str, max_workers: int = 8, refresh_interval: float = 0) -> None:
+        self.path = path
+        self.max_workers = max_workers
+        self.refresh_interval = refresh_interval
+        self.__lock = threading.RLock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.__db = sqlite3.connect(path, check_same_thread=False)
+        self.__db.executescript(_SCHEMA)
+        self.__db.execute("PRAGMA journal_mode=WAL")
+        self.__db.execute("PRAGMA synchronous=NORMAL")
+        # the path indexes of a big tree are much bigger than the default 2 MB page cache
+        self.__db.execute("PRAGMA cache_size=-65536")
+        self.__name_ids = dict(self.__db.execute("SELECT name, id FROM names"))
+
+    def find(
+        self,
+        directory: str,
+        pattern: str = "**",
+        include_hidden: bool = False,
+        name_contains: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> list[str]:
+        """
+        Paths under `directory` matching a recursive glob pattern (relative to `directory`), sorted.
+        Indexes `directory` first if it's not indexed and refreshes it if the last refresh is too old.
+
+        Args:
+            directory: The directory to search in, paths are returned joined to it as given.
+            pattern: The glob pattern, `**` matches any amount of directories.
+            include_hidden: Whether to match names starting with `.` (unless the pattern itself has them).
+            name_contains: Only paths whose name contains this (case insensitive).
+            limit: Max amount of paths to return.
+        """
+        root = os.path.abspath(directory)
+        with self.__lock:
+            indexed_root = self.__indexed_root(root)
+            if indexed_root is None:
+                self.index(root)
+            else:
+                refreshed_at = self.__db.execute("SELECT refreshed_at FROM roots WHERE path = ?", (indexed_root,)).fetchone()[0]
+                if time.time() - refreshed_at >= self.refresh_interval:
+                    # only the searched part, a search in a small subdirectory of a big tree stays cheap
+                    self.refresh(root)
+
+            conditions = self.__conditions(root, pattern, name_contains)
+            candidates = [row[0] for row in self.__db.execute(
+                "SELECT path FROM entries WHERE " + " AND ".join(condition for condition, _ in conditions),
+                [param for _, params in conditions for param in params],
+            )]
+
+        prefix = _subtree_bounds(root)[0]
+        regex = glob_to_regex(pattern)
+        check_hidden = not include_hidden and not any(segment.startswith(".") for segment in pattern.replace("\\", "/").split("/"))
+        matches = []
+        for path in sorted(candidates):
+            relative = path[len(prefix):].replace(os.sep, "/")
+            if not regex.match(relative):
+                continue
+            if check_hidden and (relative.startswith(".") or "/." in relative):
+                continue
+            matches.append(os.path.join(directory, relative.replace("/", os.sep)))
+            if limit is not None and len(matches) >= limit:
+                break
+        return matches
+
+    def index(self, root: str) -> None:
+        """Indexes a directory from scratch."""
+        root = os.path.abspath(root)
+        with self.__lock:
+            self.__delete_tree(root, include_root=True)
+            # roots inside this one are now part of it
+            self.__db.execute("DELETE FROM roots WHERE path > ? AND path < ?", _subtree_bounds(root))
+            self.__scan_trees([root])
+            self.__db.execute("INSERT OR REPLACE INTO roots (path, refreshed_at) VALUES (?, ?)", (root, time.time()))
+            self.__db.commit()
+
+    def refresh(self, root: str) -> int:
+        """
+        Rescans the directories of an indexed tree, or of a directory inside one, whose mtime changed. For a directory
+        inside an indexed tree the directories leading to it are checked too, it may be new in one of them.
+
+        Returns:
+            The amount of rescanned directories.
+        """
+        root = os.path.abspath(root)
+        with self.__lock:
+            indexed_root = self.__indexed_root(root) or root
+            ancestors = []
+            directory = root
+            while directory != indexed_root and os.path.dirname(directory) != directory:
+                directory = os.path.dirname(directory)
+                ancestors.append(directory)
+
+            saved = dict(self.__db.execute(
+                "SELECT path, mtime_ns FROM dirs WHERE path = ? OR (path > ? AND path < ?)", (root, *_subtree_bounds(root))
+            ))
+            saved.update(self.__db.execute(
+                f"SELECT path, mtime_ns FROM dirs WHERE path IN ({', '.join('?' * len(ancestors))})", ancestors
+            ))
+
+            def current_mtime(directory: str) -> Optional[int]:
+                try:
+                    return os.stat(directory).st_mtime_ns
+                except OSError:
+                    return None
+
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="file-index") as pool:
+                mtimes = dict(zip(saved, pool.map(current_mtime, saved)))
+
+            changed = []
+            for directory, mtime in mtimes.items():
+                if mtime is None:
+                    self.__delete_tree(directory, include_root=True)
+                elif mtime != saved[directory]:
+                    changed.append(directory)
+            # a changed directory is only listed again, its subdirectories were checked on their own
+            self.__scan_trees(changed, recursive=False)
+            if root == indexed_root:
+                self.__db.execute("INSERT OR REPLACE INTO roots (path, refreshed_at) VALUES (?, ?)", (root, time.time()))
+            self.__db.commit()
+            return len(changed)
+
+    def mark_dirty(self, paths: list[str], recursive: bool = False) -> None:
+        """
+        Makes the next refresh rescan the indexed directory containing each path (its nearest indexed ancestor
+        if the path is in new directories), for changes made in the same mtime tick as the last scan.
+
+        Args:
+            paths: Paths that were created, changed or removed.
+            recursive: Also rescan every indexed directory under the paths (like after extracting an archive over them).
+        """
+        with self.__lock:
+            for path in paths:
+                path = os.path.abspath(path)
+                if recursive:
+                    self.__db.execute(
+                        "UPDATE dirs SET mtime_ns = -1 WHERE path = ? OR (path > ? AND path < ?)", (path, *_subtree_bounds(path))
+                    )
+                directory = os.path.dirname(path)
+                while not self.__db.execute("UPDATE dirs SET mtime_ns = -1 WHERE path = ?", (directory,)).rowcount:
+                    parent = os.path.dirname(directory)
+                    if parent == directory:
+                        break
+                    directory = parent
+            self.__db.commit()
+
+    def __conditions(self, root: str, pattern: str, name_contains: Optional[str]) -> list[tuple[str, tuple]]:
+        """
+        SQL conditions (with their parameters) selecting at least the entries matching a search, `find` checks the
+        exact glob on what they select. They are picked so SQLite can use an index instead of reading the whole tree.
+        """
+        lower, upper = _subtree_bounds(root)
+        conditions = [("path > ? AND path < ?", (lower, upper))]
+        segments = [segment for segment in pattern.replace("\\", "/").split("/") if segment not in ("", ".")] or ["**"]
+
+        if re.fullmatch(r"\*\.[^*?\[\].]+", segments[-1]):  # *.ext
+            conditions.insert(0, ("ext = ?", (segments[-1][2:].lower(),)))
+        elif _has_literal(segments[-1]):
+            # names are matched once per distinct name, not once per path
+            conditions.append(("name_id IN (SELECT id FROM names WHERE name GLOB ?)", (_glob_to_sql(segments[-1]),)))
+        elif len(segments) > 1 and segments[-2] != "**" and _has_literal(segments[-2]):  # like dir/* or **/dir/*
+            conditions.append((
+                "parent IN (SELECT path FROM entries WHERE is_dir AND path > ? AND path < ?"
+                " AND name_id IN (SELECT id FROM names WHERE name GLOB ?))",
+                (lower, upper, _glob_to_sql(segments[-2])),
+            ))
+
+        sql_pattern = _glob_to_sql(pattern)
+        if sql_pattern not in ("*", ""):
+            conditions.append(("path GLOB ?", (_escape_glob(lower) + sql_pattern.replace("/", os.sep),)))
+        if name_contains:
+            conditions.append(("name_id IN (SELECT id FROM names WHERE instr(lower(name), ?) > 0)", (name_contains.lower(),)))
+        return conditions
+
+    def __name_id(self, name: str) -> int:
+        name_id = self.__name_ids.get(name)
+        if name_id is None:
+            name_id = self.__db.execute("INSERT INTO names (name) VALUES (?)", (name,)).lastrowid
+            self.__name_ids[name] = name_id
+        return name_id
+
+    def __indexed_root(self, root: str) -> Optional[str]:
+        """The indexed root containing `root`, None if it is not indexed."""
+        for (indexed,) in self.__db.execute("SELECT path FROM roots"):
+            if root == indexed or root.startswith(indexed.rstrip(os.sep) + os.sep):
+                return indexed
+        return None
+
+    def __delete_tree(self, directory: str, include_root: bool) -> None:
+        bounds = _subtree_bounds(directory)
+        self.__db.execute("DELETE FROM entries WHERE path > ? AND path < ?", bounds)
+        self.__db.execute("DELETE FROM dirs WHERE path > ? AND path < ?", bounds)
+        if include_root:
+            self.__db.execute("DELETE FROM entries WHERE path = ?", (directory,))
+            self.__db.execute("DELETE FROM dirs WHERE path = ?", (directory,))
+
+    def __scan_trees(self, directories: list[str], recursive: bool = True) -> None:
+        """
+        Lists directories on the thread pool and saves their entries, only the scanning runs in the threads,
+        everything is written from this one. New subdirectories are always scanned, known ones only if `recursive`.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="file-index") as pool:
+            pending = {pool.submit(_scan_directory, directory) for directory in directories}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    directory, mtime, rows = future.result()
+                    new_subdirectories = self.__save_directory(directory, mtime, rows)
+                    subdirectories = [row[0] for row in rows if row[2]] if recursive else new_subdirectories
+                    pending |= {pool.submit(_scan_directory, subdirectory) for subdirectory in subdirectories}
+
+    def __save_directory(self, directory: str, mtime: Optional[int], rows: list[tuple]) -> list[str]:
+        """Replaces the saved entries of a directory, returns the subdirectories that were not indexed."""
+        old = dict(self.__db.execute("SELECT path, is_dir FROM entries WHERE parent = ?", (directory,)))
+        if mtime is None:  # removed or unreadable
+            self.__delete_tree(directory, include_root=False)
+            return []
+
+        current = {row[0] for row in rows}
+        for path, is_dir in old.items():
+            if path not in current:
+                self.__db.execute("DELETE FROM entries WHERE path = ?", (path,))
+                if is_dir:
+                    self.__delete_tree(path, include_root=True)
+
+        self.__db.executemany(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(path, directory, self.__name_id(name), _extension(name), is_dir, size, mtime) for path, name, is_dir, size, mtime in rows],
+        )
+        self.__db.execute("INSERT OR REPLACE INTO dirs (path, mtime_ns) VALUES (?, ?)", (directory, mtime))
+        return [row[0] for row in rows if row[2] and row[0] not in old]
+
+
+def _subtree_bounds(directory: str) -> tuple[str, str]:
+    """Paths strictly between these two are the ones inside `directory`."""
+    prefix = directory.rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+def _has_literal(segment: str) -> bool:
+    """Whether a glob segment restricts the names it matches (it's not only `*`)."""
+    return segment.strip("*") != ""
+
+
+def _escape_glob(text: str) -> str:
+    """Escapes the SQLite GLOB special characters of a literal."""
+    return re.sub(r"([*?\[])", r"[\1]", text)
+
+
+def _scan_directory(directory: str) -> tuple[str, Optional[int], list[tuple[str, str, bool, int, float]]]:
+    """Lists a directory, returns its mtime (None if it can't be read) and its entries as (path, name, is_dir, size, mtime)."""
+    rows = []
+    try:
+        mtime = os.stat(directory).st_mtime_ns
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    # like os.walk symlinks to directories are not followed
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                rows.append((entry.path, entry.name, is_dir, stat.st_size, stat.st_mtime))
+    except OSError:
+        return directory, None, []
+    return directory, mtime, rows
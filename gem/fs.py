@@ -0,0 +1,473 @@
+"""
+File system helpers for the file tools
+
+`walk` lists a tree with `os.scandir`, the `DirEntry` objects it yields already know whether they are a
+file or a directory and cache their `stat()`, so listing a tree costs one syscall per directory (plus one
+per file whose size is needed) instead of several per entry.
+
+`DirectorySizer` sums the sizes of trees on a thread pool and caches what it found per directory.
+
+`read_window` reads part of a file (its start, its end or a byte range) without reading the rest of it,
+detecting binary files and the encoding of text ones. `LineIndex` does the same for ranges of lines.
+
+`write_atomic` replaces a file in one step (temporary file + rename), skipping the write when nothing changed.
+"""
+import codecs
+import fnmatch
+import hashlib
+import mmap
+import os
+import re
+import stat
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+
+def compile_globs(patterns: Iterable[str]) -> Optional[re.Pattern]:
+    """A single regex matching any of the glob patterns, None if there are none."""
+    patterns = list(patterns)
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns))
+
+
+def walk(
+    path: str,
+    max_depth: Optional[int] = None,
+    exclude: Iterable[str] = (),
+    files: bool = True,
+    dirs: bool = True,
+    after: Optional[str] = None,
+) -> Iterator[tuple[os.DirEntry, int]]:
+    """
+    Yields the entries of a tree with their depth (0 for the entries of `path`), in the same order as `os.walk`:
+    the directories then the files of a directory (sorted by name), then the contents of each of its subdirectories.
+
+    It's lazy, stop iterating and the rest of the tree is never read. Unreadable directories are skipped.
+
+    Args:
+        path: The directory to list.
+        max_depth: Entries deeper than this are not listed, None means no limit.
+        exclude: Glob patterns matched against entry names, matching entries are skipped (directories with their contents).
+        files: Whether to yield files.
+        dirs: Whether to yield directories (they are walked either way).
+        after: Only yield the entries that come after this one, given as its `walk_key`. Directories whose
+            entries all come before it are not read, and it doesn't need to exist anymore.
+    """
+    excluded = compile_globs(exclude)
+    after_parent, after_entry = None, None
+    if after is not None:
+        *after_parent, name = after.rstrip("/").split("/")
+        after_parent, after_entry = tuple(after_parent), (not after.endswith("/"), name)
+
+    # (directory, depth, names of the directories leading to it)
+    stack = [(path, 0, ())]
+    while stack:
+        directory, depth, parents = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(
+                    (entry for entry in it if excluded is None or not excluded.match(entry.name)), key=lambda entry: entry.name
+                )
+        except OSError:
+            continue
+
+        subdirectories = []
+        listed_files = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            if is_dir:
+                subdirectories.append(entry)
+            else:
+                listed_files.append(entry)
+
+        # directories are walked in the order of their name tuples, so whatever is in one that sorts before
+        # the parent of `after` was already yielded, and in its parent only what sorts after `after` is new
+        if after_parent is None or parents > after_parent:
+            yielded_dirs, yielded_files = subdirectories, listed_files
+        elif parents == after_parent:
+            yielded_dirs = [entry for entry in subdirectories if (False, entry.name) > after_entry]
+            yielded_files = [entry for entry in listed_files if (True, entry.name) > after_entry]
+        else:
+            yielded_dirs, yielded_files = [], []
+        if dirs:
+            for entry in yielded_dirs:
+                yield entry, depth
+        if files:
+            for entry in yielded_files:
+                yield entry, depth
+
+        if max_depth is None or depth < max_depth:
+            # like os.walk symlinks to directories are listed but not followed
+            stack.extend(
+                (entry.path, depth + 1, parents + (entry.name,)) for entry in reversed(subdirectories)
+                if not entry.is_symlink() and (after_parent is None or parents + (entry.name,) >= after_parent[:len(parents) + 1])
+            )
+
+
+def walk_key(relative_path: str, is_dir: bool) -> str:
+    """The position of an entry for `walk(after=...)`: its `/` separated path relative to the walked directory, `/` ended for directories."""
+    relative_path = relative_path.replace(os.sep, "/")
+    return relative_path + "/" if is_dir else relative_path
+
+
+class DirectorySizer:
+    """
+    Computes the total size and file count of directory trees, scanning directories on a thread pool.
+
+    The totals of the files directly inside each directory are cached with the directory's mtime, a repeated query
+    only lists directories that changed since (a file added, removed or renamed) and just stats the others.
+    A file rewritten in place doesn't change its directory's mtime, so its new size is only seen once something
+    else in that directory changes.
+
+    Args:
+        max_workers: Amount of threads scanning directories.
+    """
+
+    def __init__(self, max_workers: int = 8) -> None:
+        self.max_workers = max_workers
+        self.hits = 0
+        self.misses = 0
+        self.__cache: dict[str, tuple[int, int, int, list[str]]] = {}  # directory -> (mtime_ns, size, file count, subdirectories)
+        self.__lock = threading.Lock()
+
+    def sizes(self, paths: Iterable[str]) -> dict[str, tuple[int, int]]:
+        """
+        Returns:
+            The total size in bytes and file count of each path (keyed as given), 0 for paths that can't be read.
+            Paths inside other given paths are not walked again.
+        """
+        paths = list(paths)
+        roots = {path: os.path.abspath(path) for path in paths}
+        walk_roots = []
+        for root in sorted(set(roots.values())):
+            if not any(_is_inside(root, walk_root) for walk_root in walk_roots):
+                walk_roots.append(root)
+
+        own_totals: dict[str, tuple[int, int]] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="directory-size") as pool:
+            pending = {pool.submit(self.__scan, root) for root in walk_roots}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    directory, size, count, subdirectories = future.result()
+                    own_totals[directory] = (size, count)
+                    pending |= {pool.submit(self.__scan, subdirectory) for subdirectory in subdirectories}
+
+        totals = {}
+        for path, root in roots.items():
+            inside = [total for directory, total in own_totals.items() if _is_inside(directory, root)]
+            totals[path] = (sum(size for size, _ in inside), sum(count for _, count in inside))
+        return totals
+
+    def __scan(self, directory: str) -> tuple[str, int, int, list[str]]:
+        """Size and count of the files directly inside a directory and its subdirectories."""
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return directory, 0, 0, []
+
+        with self.__lock:
+            cached = self.__cache.get(directory)
+            if cached and cached[0] == mtime:
+                self.hits += 1
+                return directory, *cached[1:]
+            self.misses += 1
+
+        size = count = 0
+        subdirectories = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        # like os.walk symlinks to directories are not followed, symlinks to files are counted
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirectories.append(entry.path)
+                        elif entry.is_file():
+                            size += entry.stat().st_size
+                            count += 1
+                    except OSError:
+                        continue
+        except OSError:
+            return directory, 0, 0, []
+
+        with self.__lock:
+            self.__cache[directory] = (mtime, size, count, subdirectories)
+        return directory, size, count, subdirectories
+
+
+def _is_inside(path: str, directory: str) -> bool:
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+# checked in this order, the UTF-32 LE BOM starts with the UTF-16 LE one
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+# bytes from the start of a file used to tell whether it's binary and guess its encoding
+ENCODING_SAMPLE_BYTES = 64 * 1024
+# files at least this big are read through mmap, only the pages of the read part are loaded
+MMAP_MIN_SIZE = 1024 * 1024
+
+
+def detect_encoding(sample: bytes) -> tuple[Optional[str], int]:
+    """
+    Guesses the encoding of a file from its first bytes.
+
+    Returns:
+        The encoding (None if the file looks binary) and the length of its BOM (0 if it has none).
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding, len(bom)
+    if b"\0" in sample:
+        return None, 0
+    try:
+        sample.decode("utf-8")
+        return "utf-8", 0
+    except UnicodeDecodeError as e:
+        if e.reason == "unexpected end of data":  # the sample ends in the middle of a character
+            return "utf-8", 0
+
+    from charset_normalizer import from_bytes
+    best = from_bytes(sample).best()
+    return (best.encoding, 0) if best is not None else (None, 0)
+
+
+@dataclass
+class FileWindow:
+    text: str
+    start: int  # byte offset of the first read byte
+    end: int  # byte offset after the last read byte
+    size: int  # size of the whole file
+    encoding: Optional[str]  # None for binary files, `text` is then empty
+
+    @property
+    def truncated(self) -> bool:
+        return self.start > 0 or self.end < self.size
+
+
+def read_window(
+    path: str, mode: str = "head", start: Optional[int] = None, end: Optional[int] = None, max_bytes: Optional[int] = None
+) -> FileWindow:
+    """
+    Reads part of a file as text, at most `max_bytes` of it.
+
+    Args:
+        path: The file.
+        mode: "head" reads from the start, "tail" reads the end, "range" reads the bytes from `start` to `end`.
+        start: First byte for "range" (default 0).
+        end: Byte after the last one for "range" (default the end of the file).
+        max_bytes: Max amount of bytes to read, None means no limit.
+    """
+    if mode not in ("head", "tail", "range"):
+        raise ValueError(f"Unknown mode '{mode}', expected 'head', 'tail' or 'range'")
+    if max_bytes is not None and max_bytes <= 0:
+        raise ValueError(f"max_bytes must be more than 0, got {max_bytes}")
+    if (start is not None and start < 0) or (end is not None and end < 0):
+        raise ValueError(f"start and end must be byte offsets (0 or more), got start={start}, end={end}")
+    if start is not None and end is not None and end < start:
+        raise ValueError(f"end ({end}) must not be before start ({start})")
+
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size >= MMAP_MIN_SIZE else None
+        try:
+            def read(begin: int, stop: int) -> bytes:
+                if data is not None:
+                    return data[begin:stop]
+                f.seek(begin)
+                return f.read(stop - begin)
+
+            encoding, bom_length = detect_encoding(read(0, min(size, ENCODING_SAMPLE_BYTES)))
+            if encoding is None:
+                return FileWindow("", 0, 0, size, None)
+
+            limit = size if max_bytes is None else max_bytes
+            if mode == "head":
+                begin, stop = 0, min(size, limit)
+            elif mode == "tail":
+                begin, stop = max(0, size - limit), size
+            else:
+                begin = min(max(start or 0, 0), size)
+                stop = min(max(end if end is not None else size, begin), size, begin + limit)
+            begin = max(begin, bom_length)
+            stop = max(stop, begin)
+
+            # don't start in the middle of a character
+            unit = 4 if encoding.startswith("utf-32") else 2 if encoding.startswith("utf-16") else 1
+            begin += (unit - (begin - bom_length) % unit) % unit
+            if encoding == "utf-8":
+                while begin < stop and read(begin, begin + 1)[0] & 0xC0 == 0x80:  # continuation byte
+                    begin += 1
+            stop = max(stop, begin)
+
+            # an incremental decoder leaves out a character cut at the end instead of failing on it
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+            text = decoder.decode(read(begin, stop), final=stop == size)
+            return FileWindow(text, 0 if begin == bom_length else begin, stop, size, encoding)
+        finally:
+            if data is not None:
+                data.close()
+
+
+def _line_offsets(f, newline: bytes = b"\n", start: int = 0, chunk_size: int = 1024 * 1024) -> array:
+    """
+    Byte offset of the start of every line of a binary file, read once in chunks from `start` (after the BOM).
+    `newline` is the encoded line break, in utf-16/32 only the ones at a character boundary count.
+    """
+    unit = len(newline)
+    chunk_size -= chunk_size % unit  # so every chunk starts at a character boundary and no line break is split
+    offsets = array("Q", [start])
+    position = start
+    f.seek(start)
+    while chunk := f.read(chunk_size):
+        index = chunk.find(newline)
+        while index != -1:
+            if index % unit == 0:
+                offsets.append(position + index + unit)
+                index = chunk.find(newline, index + unit)
+            else:
+                index = chunk.find(newline, index + 1)
+        position += len(chunk)
+    return offsets
+
+
+def _encoded_newline(encoding: str) -> bytes:
+    newline = "\n".encode(encoding)
+    for bom, _ in _BOMS:  # "utf-16" and "utf-32" start with a BOM
+        if len(newline) > len(bom) and newline.startswith(bom):
+            return newline[len(bom):]
+    return newline
+
+
+class LineIndex:
+    """
+    Reads ranges of lines of files by seeking straight to them.
+
+    The byte offsets of the lines of a file are found in one pass over it and cached (8 bytes per line) with the
+    file's mtime, size and encoding (guessed from its first bytes like `read_window` does), reading another range
+    of the same file only reads that range. A changed file is indexed again.
+
+    Args:
+        max_files: Amount of files whose offsets are kept, the least recently read ones are dropped first.
+    """
+
+    def __init__(self, max_files: int = 16) -> None:
+        self.max_files = max_files
+        self.hits = 0
+        self.misses = 0
+        # path -> (mtime_ns, size, encoding, offsets)
+        self.__cache: OrderedDict[str, tuple[int, int, str, array]] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def read_lines(self, path: str, start_line: int, end_line: int) -> tuple[str, int]:
+        """
+        Returns:
+            The lines from `start_line` to `end_line` (starting at 1, inclusive) without the last line break, and the
+            amount of lines of the file. Lines outside of the file are left out.
+        """
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            key = os.path.abspath(path)
+            with self.__lock:
+                cached = self.__cache.get(key)
+                if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                    self.hits += 1
+                    self.__cache.move_to_end(key)
+                    encoding, offsets = cached[2:]
+                else:
+                    offsets = None
+                    self.misses += 1
+            if offsets is None:
+                encoding, bom_length = detect_encoding(f.read(ENCODING_SAMPLE_BYTES))
+                # binary files are read as utf-8, like before their encoding was guessed
+                encoding = encoding or "utf-8"
+                offsets = _line_offsets(f, _encoded_newline(encoding), bom_length)
+                with self.__lock:
+                    self.__cache[key] = (stat.st_mtime_ns, stat.st_size, encoding, offsets)
+                    self.__cache.move_to_end(key)
+                    while len(self.__cache) > self.max_files:
+                        self.__cache.popitem(last=False)
+
+            # a line break at the very end doesn't start another line (an empty file has no lines, even with a BOM)
+            line_count = len(offsets) - 1 if offsets[-1] == stat.st_size else len(offsets)
+            first = max(start_line, 1) - 1
+            last = min(end_line, line_count)
+            if first >= last:
+                return "", line_count
+            f.seek(offsets[first])
+            end = offsets[last] if last < len(offsets) else stat.st_size
+            data = f.read(end - offsets[first])
+
+        text = data.decode(encoding, errors="replace").replace("\r\n", "\n")
+        return text[:-1] if text.endswith("\n") else text, line_count
+
+
+def _read_umask() -> int:
+    # the umask can only be read by setting it, and it's process wide: done once at import, while nothing else runs,
+    # never from the `write_files` threads where other threads would create files in the meantime with a umask of 0
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# permissions `open(path, "w")` would give a new file, temporary files get 0o600
+_NEW_FILE_MODE = 0o666 & ~_read_umask()
+
+
+def _file_hash(path: str) -> bytes:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def write_atomic(path: str, data: bytes) -> bool:
+    """
+    Writes a file so it's either fully written or not changed at all: the data goes to a temporary file in the
+    same directory that then replaces the file. The permissions of a replaced file are kept, a symlink is
+    followed (the file it points to is replaced, not the link).
+
+    Returns:
+        False when the file already had exactly this content, it's then not touched (its mtime stays the same).
+    """
+    path = os.path.realpath(path)
+    try:
+        current = os.stat(path)
+    except FileNotFoundError:
+        current = None
+    # the hash is only computed when the size already matches
+    if current is not None and current.st_size == len(data) and _file_hash(path) == hashlib.sha256(data).digest():
+        return False
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())  # the data is on disk before the rename makes it visible
+        os.chmod(temporary, stat.S_IMODE(current.st_mode) if current is not None else _NEW_FILE_MODE)
+        os.replace(temporary, path)
+    except BaseException:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        raise
+    return True
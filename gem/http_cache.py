@@ -0,0 +1,227 @@
+"""
+Private HTTP cache for GET requests, saved in a `DiskCache`
+
+Follows the caching headers of the server: fresh responses (`Cache-Control: max-age`, `Expires`) are reused without
+any request (responses without those only if they have `Last-Modified` and a heuristic lifetime is configured), stale ones are revalidated with a conditional GET (`If-None-Match`/`If-Modified-Since`) so an unchanged
+page only costs a bodyless 304 response, and `no-store` responses are never saved.
+
+`read_body` reads a streamed body up to a size cap, without reading binary bodies at all if asked to.
+"""
+import email.utils
+import json
+import time
+from typing import Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .cache import DiskCache, make_key
+
+# the body is saved decoded, these describe the encoded one
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+# headers of a 304 response that replace the saved ones
+_UPDATED_HEADERS = {"cache-control", "expires", "date", "etag", "last-modified", "age"}
+
+
+def parse_cache_control(value: Optional[str]) -> dict[str, Optional[str]]:
+    """`"no-cache, max-age=60"` -> `{"no-cache": None, "max-age": "60"}`"""
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') if argument else None
+    return directives
+
+
+CHUNK_SIZE = 64 * 1024
+# content types (or parts of them) that are text, everything else is treated as binary
+TEXT_CONTENT_TYPES = ("text/", "json", "xml", "javascript", "ecmascript", "x-www-form-urlencoded", "csv", "yaml", "toml", "markdown")
+
+
+def is_text_content_type(content_type: str) -> bool:
+    content_type = content_type.split(";")[0].strip().lower()
+    return any(text_type in content_type for text_type in TEXT_CONTENT_TYPES)
+
+
+def read_body(response: requests.Response, max_bytes: Optional[int] = None, stop_on_binary: bool = False) -> requests.Response:
+    """
+    Reads the body of a response made with `stream=True` (already read ones work too), keeping at most `max_bytes` of it.
+
+    Sets `response.truncated` when only part of the body was read and `response.binary` when it wasn't read because it's
+    binary (by its Content-Type, or a NUL byte at the start if it has none), `response.content` is what was read.
+
+    Args:
+        response: The response.
+        max_bytes: Max amount of (decompressed) bytes to read, None reads everything.
+        stop_on_binary: Whether to skip binary bodies.
+    """
+    content_type = response.headers.get("content-type")
+    binary = stop_on_binary and content_type is not None and not is_text_content_type(content_type)
+    truncated = binary
+    chunks = []
+    size = 0
+
+    if not binary:
+        for chunk in response.iter_content(CHUNK_SIZE):
+            if stop_on_binary and content_type is None and not chunks and b"\0" in chunk[:1024]:
+                binary = truncated = True
+                chunks = []
+                break
+            if max_bytes is not None and size + len(chunk) > max_bytes:
+                chunks.append(chunk[:max_bytes - size])
+                truncated = True
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+
+    if truncated:
+        response.close()  # the rest is never read, the connection can't be reused
+    response._content = b"".join(chunks)
+    response._content_consumed = True
+    response.truncated = truncated
+    response.binary = binary
+    return response
+
+
+def _parse_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpCache:
+    """
+    Args:
+        session: The session used for the requests.
+        cache: Where responses are saved.
+        heuristic_ttl: Max seconds a response with a `Last-Modified` header but no explicit freshness (max-age, Expires)
+            is reused for without revalidation, it gets a tenth of the time since its last modification (RFC 9111 4.2.2).
+            Responses without `Last-Modified` are never reused without asking the server.
+    """
+
+    def __init__(self, session: requests.Session, cache: DiskCache, heuristic_ttl: float = 0) -> None:
+        self.session = session
+        self.cache = cache
+        self.heuristic_ttl = heuristic_ttl
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def get(
+        self, url: str, headers: Optional[dict] = None, max_bytes: Optional[int] = None, stop_on_binary: bool = False, **kwargs
+    ) -> requests.Response:
+        """
+        Same as `session.get`, the returned response has `from_cache` set to True when its body came from the cache.
+        The body is read with `read_body`, only bodies that were read whole are saved.
+        """
+        headers = dict(headers or {})
+        key = make_key("GET", url, headers)
+        entry = self.__load(key)
+
+        if entry and entry[0]["fresh_until"] > time.time():
+            self.hits += 1
+            self.bytes_saved += len(entry[1])
+            return read_body(self.__to_response(*entry), max_bytes, stop_on_binary)
+
+        if entry:
+            meta = entry[0]
+            if meta["headers"].get("etag"):
+                headers["If-None-Match"] = meta["headers"]["etag"]
+            if meta["headers"].get("last-modified"):
+                headers["If-Modified-Since"] = meta["headers"]["last-modified"]
+
+        response = self.session.get(url, headers=headers, stream=True, **kwargs)
+        response.from_cache = False
+
+        if entry and response.status_code == 304:
+            response.close()
+            self.revalidations += 1
+            self.bytes_saved += len(entry[1])
+            meta, body = entry
+            meta["headers"].update(
+                {name.lower(): value for name, value in response.headers.items() if name.lower() in _UPDATED_HEADERS}
+            )
+            meta["fresh_until"] = time.time() + self.freshness_lifetime(meta["headers"])
+            self.__save(key, meta, body)
+            return read_body(self.__to_response(meta, body), max_bytes, stop_on_binary)
+
+        self.misses += 1
+        read_body(response, max_bytes, stop_on_binary)
+        if not response.truncated:
+            self.__store(key, response)
+        return response
+
+    def freshness_lifetime(self, headers) -> float:
+        """Seconds a response stays fresh after it was received."""
+        headers = CaseInsensitiveDict(headers)
+        cache_control = parse_cache_control(headers.get("cache-control"))
+        if "no-cache" in cache_control:
+            return 0
+        age = headers.get("age", "")
+        age = int(age) if age.isdigit() else 0
+
+        if (cache_control.get("max-age") or "").isdigit():
+            return max(int(cache_control["max-age"]) - age, 0)
+
+        expires = _parse_date(headers.get("expires"))
+        if headers.get("expires") is not None:
+            if expires is None:  # invalid dates like "0" mean already expired
+                return 0
+            date = _parse_date(headers.get("date")) or time.time()
+            return max(expires - date - age, 0)
+
+        last_modified = _parse_date(headers.get("last-modified"))
+        if not self.heuristic_ttl or last_modified is None:
+            return 0
+        date = _parse_date(headers.get("date")) or time.time()
+        return max(min((date - last_modified) / 10, self.heuristic_ttl) - age, 0)
+
+    def __store(self, key: str, response: requests.Response) -> None:
+        if response.status_code != 200:
+            return
+        if "no-store" in parse_cache_control(response.headers.get("cache-control")):
+            return
+        if "no-store" in parse_cache_control(response.request.headers.get("cache-control")):
+            return
+
+        lifetime = self.freshness_lifetime(response.headers)
+        has_validators = "etag" in response.headers or "last-modified" in response.headers
+        if lifetime <= 0 and not has_validators:
+            return  # could never be reused
+
+        meta = {
+            "url": response.url,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {name.lower(): value for name, value in response.headers.items() if name.lower() not in _DROPPED_HEADERS},
+            "fresh_until": time.time() + lifetime,
+        }
+        self.__save(key, meta, response.content)
+
+    def __save(self, key: str, meta: dict, body: bytes) -> None:
+        # json never contains a raw NUL so it safely separates the metadata from the body
+        self.cache.set(key, json.dumps(meta).encode() + b"\0" + body)
+
+    def __load(self, key: str) -> Optional[tuple[dict, bytes]]:
+        value = self.cache.get(key)
+        if value is None:
+            return None
+        meta, _, body = value.partition(b"\0")
+        return json.loads(meta), body
+
+    def __to_response(self, meta: dict, body: bytes) -> requests.Response:
+        response = requests.Response()
+        response.status_code = meta["status"]
+        response.reason = meta["reason"]
+        response.url = meta["url"]
+        response.headers = CaseInsensitiveDict(meta["headers"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = body
+        response._content_consumed = True
+        response.from_cache = True
+        return response
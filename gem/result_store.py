@@ -0,0 +1,92 @@
+"""
+Side store for tool outputs that are too big to put in the conversation
+
+The conversation only gets a preview and a handle, the model reads the rest page by page with the
+`read_tool_result` tool instead of every later request carrying the whole output.
+"""
+import os
+import threading
+import uuid
+from typing import Optional
+
+
+class ResultNotFound(Exception):
+    pass
+
+
+class ResultStore:
+    """
+    Args:
+        directory: Where outputs are saved, None keeps them in memory for the running session only.
+    """
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        self.directory = directory
+        self.__results: dict[str, str] = {}
+        self.__sizes: dict[str, int] = {}
+        self.__lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __path(self, handle: str) -> str:
+        return os.path.join(self.directory, f"{handle}.txt")
+
+    def put(self, name: str, content: str) -> str:
+        """Saves an output and returns its handle."""
+        handle = f"{name}-{uuid.uuid4().hex[:12]}"
+        if self.directory:
+            with open(self.__path(handle), "w", encoding="utf-8") as f:
+                f.write(content)
+        else:
+            with self.__lock:
+                self.__results[handle] = content
+        self.__sizes[handle] = len(content)
+        return handle
+
+    def size(self, handle: str) -> int:
+        """Length of a saved output in characters."""
+        if handle in self.__sizes:
+            return self.__sizes[handle]
+        if self.directory and os.path.isfile(self.__path(handle)):
+            with open(self.__path(handle), "r", encoding="utf-8") as f:
+                self.__sizes[handle] = len(f.read())
+            return self.__sizes[handle]
+        raise ResultNotFound(f"No saved tool output with handle: {handle}")
+
+    def get(self, handle: str, offset: int = 0, length: Optional[int] = None) -> str:
+        """
+        Reads part of a saved output.
+
+        Raises:
+            ResultNotFound: If there is no output with that handle.
+        """
+        if not self.directory:
+            with self.__lock:
+                content = self.__results.get(handle)
+            if content is None:
+                raise ResultNotFound(f"No saved tool output with handle: {handle} (outputs are only kept for the running session)")
+            return content[offset:offset + length if length is not None else None]
+
+        if not os.path.isfile(self.__path(handle)):
+            raise ResultNotFound(f"No saved tool output with handle: {handle}")
+        with open(self.__path(handle), "r", encoding="utf-8") as f:
+            # read in text mode so offsets are in characters like the preview, not bytes
+            while offset > 0:
+                skipped = f.read(min(offset, 1024 * 1024))
+                if not skipped:
+                    break
+                offset -= len(skipped)
+            return f.read(length if length is not None else -1)
+
+    def spill(self, name: str, content: str, preview_chars: int) -> str:
+        """
+        Saves an output and returns what goes into the conversation instead: a preview and how to read the rest.
+        """
+        handle = self.put(name, content)
+        preview = content[:preview_chars]
+        return (
+            f"{preview}\n\n"
+            f"[Output too long: showing the first {len(preview)} of {len(content)} characters. "
+            f"The full output is saved with handle '{handle}', use the read_tool_result tool "
+            f"(handle='{handle}', offset={len(preview)}) to read the rest]"
+        )
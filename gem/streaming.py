@@ -0,0 +1,86 @@
+"""
+Helpers for consuming streamed completions from litellm
+"""
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+
+@dataclass
+class StreamStats:
+    """Timing information of a single streamed completion."""
+    time_to_first_token: Optional[float] = None
+    duration: float = 0.0
+    completion_tokens: int = 0
+
+    @property
+    def tokens_per_second(self) -> float:
+        # measured from the first token, the wait before it is already in time_to_first_token
+        generation_time = self.duration - (self.time_to_first_token or 0.0)
+        if generation_time <= 0:
+            return 0.0
+        return self.completion_tokens / generation_time
+
+    def __str__(self) -> str:
+        ttft = f"{self.time_to_first_token:.2f}s" if self.time_to_first_token is not None else "N/A"
+        return f"ttft {ttft} · {self.tokens_per_second:.1f} tok/s · {self.completion_tokens} tokens in {self.duration:.2f}s"
+
+
+def collect_stream(stream: Iterable, on_content: Optional[Callable[[str], None]] = None) -> tuple[list, StreamStats]:
+    """
+    Consumes a litellm completion stream.
+
+    Args:
+        stream: The iterator returned by `litellm.completion(..., stream=True)`.
+        on_content: Called with the full text received so far every time new content arrives.
+
+    Returns:
+        The list of received chunks (to be rebuilt with `litellm.stream_chunk_builder`) and the stream stats.
+    """
+    stats = StreamStats()
+    chunks = []
+    content = ""
+    start = time.perf_counter()
+
+    for chunk in stream:
+        chunks.append(chunk)
+        usage = getattr(chunk, "usage", None)
+        if usage and usage.completion_tokens:
+            stats.completion_tokens = usage.completion_tokens
+
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        # tool call deltas count as tokens too, not only the text
+        if stats.time_to_first_token is None and (delta.content or delta.tool_calls):
+            stats.time_to_first_token = time.perf_counter() - start
+        if delta.content:
+            content += delta.content
+            if on_content:
+                on_content(content)
+
+    stats.duration = time.perf_counter() - start
+    return chunks, stats
+
+
+class LiveMarkdown:
+    """
+    Renderable for `rich.live.Live` showing streamed text as markdown.
+
+    Parsing markdown means re-parsing the whole text, so it's done when Live refreshes (at most its
+    `refresh_per_second`) instead of for every delta, and only if the text changed since the last refresh.
+    """
+
+    def __init__(self, text: str = "") -> None:
+        self.text = text
+        self.__rendered_text: Optional[str] = None
+        self.__markdown = None
+
+    def __rich_console__(self, console, options):
+        from rich.markdown import Markdown
+
+        text = self.text
+        if text != self.__rendered_text:
+            self.__markdown = Markdown(text.strip())
+            self.__rendered_text = text
+        yield self.__markdown
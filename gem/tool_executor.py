@@ -0,0 +1,78 @@
+"""
+Runs the tool calls of a single model turn, concurrently where it is safe to do so
+
+Tools are serialized by default, a tool opts in to concurrent execution with the `parallel_safe` decorator.
+Only tools that don't mutate anything (searching, reading, fetching) should be marked.
+
+Example:
+    ```py
+    @parallel_safe
+    def read_file(filepath: str) -> str:
+        ...
+    ```
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+def parallel_safe(func: Callable) -> Callable:
+    """
+    A decorator to mark a tool as safe to run concurrently with other parallel safe tools.
+    """
+    func.parallel_safe = True
+    return func
+
+
+def is_parallel_safe(func: Callable | None) -> bool:
+    return bool(getattr(func, "parallel_safe", False))
+
+
+class ToolExecutor:
+    """
+    Executes a batch of calls with a bounded thread pool.
+
+    Consecutive parallel safe calls run together in the pool, every other call runs alone on the calling
+    thread and acts as a barrier, so a read issued after a write in the same turn still sees the write.
+    Results are always returned in the original order.
+    """
+
+    def __init__(self, max_workers: int = 4) -> None:
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool") if max_workers > 1 else None
+
+    def run(self, calls: list, execute: Callable[[Any], Any], is_parallel: Callable[[Any], bool]) -> list:
+        """
+        Args:
+            calls: The calls to run.
+            execute: Runs a single call and returns its result, must not raise.
+            is_parallel: Whether a call can run concurrently with others.
+
+        Returns:
+            The results in the same order as `calls`.
+        """
+        results = [None] * len(calls)
+        batch = []
+
+        def flush():
+            if len(batch) == 1 or self._pool is None:
+                for i in batch:
+                    results[i] = execute(calls[i])
+            else:
+                futures = [(i, self._pool.submit(execute, calls[i])) for i in batch]
+                for i, future in futures:
+                    results[i] = future.result()
+            batch.clear()
+
+        for i, call in enumerate(calls):
+            if is_parallel(call):
+                batch.append(i)
+                continue
+            flush()
+            results[i] = execute(call)
+        flush()
+
+        return results
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
@@ -0,0 +1,71 @@
+"""
+Limits and accounting for a single user turn of the agent loop
+
+A turn starts with a user message and keeps calling the model and running tools until the model
+answers without tool calls or one of the limits is reached.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class TurnLimits:
+    """Limits of a single turn, None means no limit."""
+    max_steps: Optional[int] = None
+    timeout: Optional[float] = None
+    token_budget: Optional[int] = None
+
+
+@dataclass
+class TurnReport:
+    """
+    What a single turn cost.
+
+    `stop_reason` is one of "completed", "max_steps", "timeout", "token_budget" or "error".
+    """
+    steps: int = 0
+    llm_time: float = 0.0
+    tool_time: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    stop_reason: str = "completed"
+    started_at: float = field(default_factory=time.perf_counter, repr=False)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def add_step(self, response, llm_time: float) -> None:
+        """Records a single model call."""
+        self.steps += 1
+        self.llm_time += llm_time
+        usage = getattr(response, "usage", None)
+        if usage:
+            self.prompt_tokens += usage.prompt_tokens or 0
+            self.completion_tokens += usage.completion_tokens or 0
+
+    def exceeded(self, limits: TurnLimits) -> Optional[str]:
+        """
+        Checks whether another model call would go over the limits.
+
+        Returns:
+            The stop reason of the exceeded limit or None.
+        """
+        if limits.max_steps is not None and self.steps >= limits.max_steps:
+            return "max_steps"
+        if limits.timeout is not None and self.elapsed >= limits.timeout:
+            return "timeout"
+        if limits.token_budget is not None and self.total_tokens >= limits.token_budget:
+            return "token_budget"
+        return None
+
+    def __str__(self) -> str:
+        return (
+            f"steps: {self.steps}, llm: {self.llm_time:.2f}s, tools: {self.tool_time:.2f}s, "
+            f"tokens: {self.prompt_tokens} prompt + {self.completion_tokens} completion, stopped: {self.stop_reason}"
+        )
@@ -0,0 +1,138 @@
+"""
+Cache of Wikipedia pages, saved in a `DiskCache`
+
+Pages are saved by their resolved title and revision, a revision never changes so the content is never refetched.
+What a requested name resolves to (after redirects, suggestions...) is kept for `ttl` seconds, after that it's resolved
+again with a single API request that doesn't download the page, which is only fetched if it got a new revision.
+
+The backend does the actual requests, anything with these methods works (see `WikipediaBackend`):
+    - `resolve(name) -> (title, revision)`
+    - `fetch(title) -> {"title", "url", "revision", "summary", "content"}`
+    - `search(query) -> list of titles`
+"""
+import json
+from typing import Any, Optional
+
+from .cache import DiskCache, make_key
+
+
+WIKIPEDIA_API_URL = "https://en.wikipedia.org/w/api.php"
+
+
+class WikipediaBackend:
+    """
+    Backend using the `wikipedia` package, page names are resolved with `session`.
+
+    Args:
+        session: `requests.Session` used for the resolve requests.
+        timeout: Passed to every request of `session`.
+        api_url: The MediaWiki API endpoint.
+    """
+
+    def __init__(self, session: Any, timeout: Any = None, api_url: str = WIKIPEDIA_API_URL) -> None:
+        self.session = session
+        self.timeout = timeout
+        self.api_url = api_url
+
+    def resolve(self, name: str) -> tuple[str, int]:
+        """
+        The title and latest revision `name` leads to, in a single API request that follows redirects without
+        downloading the page. Like `wikipedia.page` a name that is not a page is replaced by the search suggestion.
+        """
+        import wikipedia
+        resolved = self.__lookup(name)
+        if resolved is None:
+            results, suggestion = wikipedia.search(name, results=1, suggestion=True)
+            if suggestion or results:
+                resolved = self.__lookup(suggestion or results[0])
+        if resolved is None:
+            raise wikipedia.PageError(name)
+        return resolved
+
+    def __lookup(self, title: str) -> Optional[tuple[str, int]]:
+        params = {
+            "format": "json",
+            "action": "query",
+            "prop": "info|revisions",
+            "rvprop": "ids",
+            "titles": title,
+            "redirects": "",
+        }
+        response = self.session.get(self.api_url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        response = response.json()
+        for page in response.get("query", {}).get("pages", {}).values():
+            if "missing" not in page and "invalid" not in page and page.get("revisions"):
+                return page["title"], page["revisions"][0]["revid"]
+        return None
+
+    def fetch(self, title: str) -> dict:
+        import wikipedia
+        page = wikipedia.page(title, auto_suggest=False)
+        content = page.content  # also loads the revision id
+        return {
+            "title": page.title,
+            "url": page.url,
+            "revision": page.revision_id,
+            "summary": page.summary,
+            "content": content,
+        }
+
+    def search(self, query: str) -> list[str]:
+        import wikipedia
+        return wikipedia.search(query)
+
+
+def normalize_page_name(name: str) -> str:
+    """Page names are not case sensitive and `_` is the same as a space."""
+    return " ".join(name.replace("_", " ").split()).lower()
+
+
+class WikiPageCache:
+    """
+    Args:
+        backend: Does the requests.
+        cache: Where pages are saved, None disables caching.
+        ttl: Seconds a resolved page name and search results are reused for.
+    """
+
+    def __init__(self, backend: Any, cache: Optional[DiskCache], ttl: float = 24 * 60 * 60) -> None:
+        self.backend = backend
+        self.cache = cache
+        self.ttl = ttl
+
+    def page(self, name: str) -> dict:
+        """The page `name` resolves to, see `fetch` of the backend for its keys."""
+        name_key = make_key("wikipedia-name", normalize_page_name(name))
+        resolved = self.__get(name_key)
+        if resolved is None:
+            resolved = self.backend.resolve(name)
+            self.__set(name_key, list(resolved), ttl=self.ttl)
+        title, revision = resolved
+
+        page = self.__get(make_key("wikipedia-page", title, revision))
+        if page is None:
+            page = self.backend.fetch(title)
+            # revisions never change, the page is only removed when the cache gets too big
+            self.__set(make_key("wikipedia-page", page["title"], page["revision"]), page)
+            if (page["title"], page["revision"]) != (title, revision):  # edited in between
+                self.__set(name_key, [page["title"], page["revision"]], ttl=self.ttl)
+        return page
+
+    def search(self, query: str) -> list[str]:
+        key = make_key("wikipedia-search", normalize_page_name(query))
+        results = self.__get(key)
+        if results is None:
+            results = self.backend.search(query)
+            self.__set(key, results, ttl=self.ttl)
+        return results
+
+    def __get(self, key: str) -> Any:
+        if self.cache is None:
+            return None
+        value = self.cache.get(key)
+        return json.loads(value) if value is not None else None
+
+    def __set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        if self.cache is not None:
+            self.cache.set(key, json.dumps(value).encode(), ttl=ttl)
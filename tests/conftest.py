@@ -8,4 +8,39 @@ print("Adding to path:", project_root)
 
 # Add the project root to Python path
 if project_root not in sys.path:
-    sys.path.insert(0, project_root)
\ No newline at end of file
+    sys.path.insert(0, project_root)
+
+# don't let litellm fetch its model list from the network when `assistant` imports it
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+@pytest.fixture
+def http_server():
+    """Starts a local server with the given handler class, `server.url(path)` gives the full url of a path."""
+    servers = []
+
+    def start(handler):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.url = lambda path="/": f"http://127.0.0.1:{server.server_port}{path}"
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+@pytest.fixture
+def assistant_config(tmp_path, monkeypatch):
+    """Config for `Assistant` tests: nothing written outside of tmp_path and no extra model calls."""
+    import config as conf
+    monkeypatch.setattr(conf, "SCHEMA_CACHE_PATH", str(tmp_path / "schemas.json"))
+    monkeypatch.setattr(conf, "CONTEXT_TOKEN_BUDGET", None)
+    monkeypatch.setattr(conf, "COMPLETION_CACHE", False)
+    monkeypatch.setattr(conf, "COMPLETION_CACHE_PATH", str(tmp_path / "completions.sqlite"))
+    return conf
@@ -0,0 +1,63 @@
+"""
+Fake model responses for the tests of `Assistant` and `AsyncAssistant`, the real ones need an API key and a network
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+
+def make_response(content=None, tool_calls=(), usage=None):
+    """
+    A response with the shape of a litellm `ModelResponse`.
+
+    Args:
+        content: The text of the message.
+        tool_calls: (name, arguments) of the tool calls, their ids are "call_0", "call_1"...
+        usage: (prompt tokens, completion tokens), None for providers that don't send it.
+    """
+    message = SimpleNamespace(
+        role="assistant",
+        content=content,
+        tool_calls=[
+            SimpleNamespace(id=f"call_{i}", function=SimpleNamespace(name=name, arguments=json.dumps(args)))
+            for i, (name, args) in enumerate(tool_calls)
+        ] or None,
+    )
+    usage = SimpleNamespace(prompt_tokens=usage[0], completion_tokens=usage[1]) if usage else None
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def scripted(*responses):
+    """Fake `litellm.completion` returning the given responses one after the other, the sent params are in `calls`."""
+    remaining = list(responses)
+    def completion(**params):
+        completion.calls.append(params)
+        return remaining.pop(0)
+    completion.calls = []
+    return completion
+
+
+def scripted_async(*responses):
+    """Same as `scripted` for `litellm.acompletion`."""
+    remaining = list(responses)
+    async def acompletion(**params):
+        await asyncio.sleep(0)
+        return remaining.pop(0)
+    return acompletion
+
+
+def tool_outputs(session) -> list[tuple[str, str]]:
+    """(tool_call_id, content) of the tool messages of a session."""
+    return [
+        (message["tool_call_id"], message["content"])
+        for message in session.messages if isinstance(message, dict) and message["role"] == "tool"
+    ]
+
+
+def tool_call_ids(session) -> list[str]:
+    """Ids of every tool call the model made in a session."""
+    return [
+        tool_call.id
+        for message in session.messages if not isinstance(message, dict)
+        for tool_call in message.tool_calls or []
+    ]
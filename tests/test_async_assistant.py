@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+import assistant
+from assistant import AsyncAssistant
+from gem.tool_executor import parallel_safe
+from tests.llm_fakes import make_response, scripted_async, tool_outputs
+
+@pytest.fixture(autouse=True)
+def config(assistant_config):
+    return assistant_config
+
+def double(x: int) -> int:
+    """
+    Doubles a number.
+
+    Args:
+        x: The number.
+    """
+    return x * 2
+
+def test_tool_round_trip(monkeypatch):
+    monkeypatch.setattr(assistant.litellm, "acompletion", scripted_async(
+        make_response(tool_calls=[("double", {"x": 21}), ("missing", {})]),
+        make_response("It is 42"),
+    ))
+    session = AsyncAssistant("openai/test", tools=[double])
+
+    reply = asyncio.run(session.send_message("double 21"))
+    assert reply.content == "It is 42"
+    assert tool_outputs(session) == [("call_0", "42"), ("call_1", "Function not found with name: missing")]
+    assert session.last_turn_report.steps == 2
+
+def test_tool_outputs_keep_call_order(monkeypatch):
+    events = []
+
+    @parallel_safe
+    async def read(n: int) -> str:
+        """
+        Args:
+            n: Id of the call.
+        """
+        events.append(f"start {n}")
+        await asyncio.sleep(0.05 if n == 1 else 0.01) # the first call finishes last
+        events.append(f"end {n}")
+        return f"read {n}"
+
+    def write(n: int) -> str:
+        """
+        Args:
+            n: Id of the call.
+        """
+        events.append(f"write {n}")
+        return f"write {n}"
+
+    monkeypatch.setattr(assistant.litellm, "acompletion", scripted_async(
+        make_response(tool_calls=[("read", {"n": 1}), ("read", {"n": 2}), ("write", {"n": 3}), ("read", {"n": 4})]),
+        make_response("done"),
+    ))
+    session = AsyncAssistant("openai/test", tools=[read, write])
+    asyncio.run(session.send_message("go"))
+
+    assert [content for _, content in tool_outputs(session)] == ["read 1", "read 2", "write 3", "read 4"]
+    # the parallel safe calls before the write run together, the write waits for them and the next call for it
+    assert events == ["start 1", "start 2", "end 2", "end 1", "write 3", "start 4", "end 4"]
+
+def run_sessions(count: int) -> int:
+    """Runs `count` sessions at once on a new event loop, returns the max amount of concurrent requests."""
+    running = 0
+    max_running = 0
+
+    async def acompletion(**params):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return make_response("hi")
+
+    assistant.litellm.acompletion = acompletion
+    sessions = [AsyncAssistant("openai/test") for _ in range(count)]
+    async def main():
+        await asyncio.gather(*(session.send_message("hi") for session in sessions))
+    asyncio.run(main())
+    return max_running
+
+def test_provider_limit_is_shared(config, monkeypatch):
+    monkeypatch.setattr(assistant.litellm, "acompletion", None)
+    monkeypatch.setattr(config, "ASYNC_PROVIDER_CONCURRENCY", {"default": 2})
+    assert run_sessions(6) == 2
+
+def test_runs_on_separate_event_loops(config, monkeypatch):
+    monkeypatch.setattr(assistant.litellm, "acompletion", None)
+    monkeypatch.setattr(config, "ASYNC_PROVIDER_CONCURRENCY", {"default": 1})
+    # the semaphore of the first loop is contended, it must not be reused by the second one
+    assert run_sessions(3) == 1
+    assert run_sessions(3) == 1
+
+def test_no_idle_executor_and_cache_off_the_loop(config, monkeypatch):
+    import threading
+    from gem.cache import DiskCache
+
+    monkeypatch.setattr(config, "COMPLETION_CACHE", True)
+    monkeypatch.setattr(config, "SEED", 1)
+    monkeypatch.setattr(config, "TEMPERATURE", 0)
+    session = AsyncAssistant("openai/test")
+    assert session.tool_executor is None  # tools run on the shared pool
+
+    threads = []
+    class RecordingCache(DiskCache):
+        def get(self, key):
+            threads.append(threading.current_thread())
+            return super().get(key)
+        def set(self, key, value, ttl=None):
+            threads.append(threading.current_thread())
+            return super().set(key, value, ttl=ttl)
+    session.completion_cache = RecordingCache(":memory:")
+
+    import litellm
+    response = litellm.ModelResponse(model="test", choices=[{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "hi"}}])
+    monkeypatch.setattr(assistant.litellm, "acompletion", scripted_async(response))
+    assert asyncio.run(session.send_message("hi")).content == "hi"
+    assert len(threads) == 2 and threading.main_thread() not in threads
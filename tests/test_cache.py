@@ -0,0 +1,114 @@
+import time
+from gem.cache import DiskCache, make_key
+
+def test_make_key_is_stable():
+    assert make_key({"a": 1, "b": [1, 2]}) == make_key({"b": [1, 2], "a": 1})
+    assert make_key({"a": 1}) != make_key({"a": 2})
+    assert make_key("completion", {"a": 1}) != make_key("http", {"a": 1})
+
+def test_get_set_and_counters(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite"))
+    key = make_key("x")
+    assert cache.get(key) is None
+    cache.set(key, b"value")
+    assert cache.get(key) == b"value"
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert len(cache) == 1 and cache.size == 5
+
+def test_persists_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    DiskCache(path).set("key", b"value")
+    assert DiskCache(path).get("key") == b"value"
+
+def test_ttl():
+    cache = DiskCache(":memory:")
+    cache.set("short", b"1", ttl=0.05)
+    cache.set("long", b"2", ttl=60)
+    time.sleep(0.1)
+    assert cache.get("short") is None
+    assert cache.get("long") == b"2"
+
+def test_lru_eviction():
+    cache = DiskCache(":memory:", max_bytes=30)
+    for key in ("a", "b", "c"):
+        cache.set(key, b"x" * 10)
+        time.sleep(0.01)
+    cache.get("a")  # a is now more recent than b
+    cache.set("d", b"x" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None and cache.get("d") is not None
+    assert cache.size <= 30
+
+def test_value_bigger_than_cache_is_ignored():
+    cache = DiskCache(":memory:", max_bytes=10)
+    cache.set("a", b"x" * 5)
+    cache.set("big", b"x" * 11)
+    assert cache.get("big") is None
+    assert cache.get("a") == b"x" * 5
+
+def search(query: str) -> str:
+    """
+    Searches something.
+
+    Args:
+        query: What to search.
+    """
+    return f"results for {query}"
+
+def model_response(message: dict):
+    import litellm
+    return litellm.ModelResponse(model="test", choices=[{"index": 0, "finish_reason": "stop", "message": message}])
+
+def test_completion_cache_key(assistant_config, monkeypatch):
+    import assistant
+    monkeypatch.setattr(assistant_config, "COMPLETION_CACHE", True)
+    session = assistant.Assistant("openai/test")
+    params = session.get_completion_params()
+
+    assert session.completion_cache_key({**params, "seed": None, "temperature": 0}) is None
+    assert session.completion_cache_key({**params, "seed": 1, "temperature": None}) is None
+    assert session.completion_cache_key({**params, "seed": 1, "temperature": assistant_config.COMPLETION_CACHE_MAX_TEMPERATURE + 0.1}) is None
+    key = session.completion_cache_key({**params, "seed": 1, "temperature": assistant_config.COMPLETION_CACHE_MAX_TEMPERATURE})
+    assert key is not None
+    assert key != session.completion_cache_key({**params, "seed": 2, "temperature": assistant_config.COMPLETION_CACHE_MAX_TEMPERATURE})
+
+    monkeypatch.setattr(assistant_config, "COMPLETION_CACHE", False)
+    assert assistant.Assistant("openai/test").completion_cache_key({**params, "seed": 1, "temperature": 0}) is None
+
+def test_cached_tool_call_response_is_usable(assistant_config, monkeypatch):
+    import assistant
+    from tests.llm_fakes import scripted, tool_outputs
+    monkeypatch.setattr(assistant_config, "COMPLETION_CACHE", True)
+    monkeypatch.setattr(assistant_config, "SEED", 1)
+    monkeypatch.setattr(assistant_config, "TEMPERATURE", 0)
+
+    def responses():
+        return scripted(
+            model_response({"role": "assistant", "content": None, "tool_calls": [
+                {"id": "call_1", "type": "function", "function": {"name": "search", "arguments": '{"query": "cats"}'}},
+            ]}),
+            model_response({"role": "assistant", "content": "Cats are great"}),
+        )
+
+    completion = responses()
+    monkeypatch.setattr(assistant.litellm, "completion", completion)
+    first = assistant.Assistant("openai/test", tools=[search])
+    assert first.send_message("cats?").content == "Cats are great"
+    assert len(completion.calls) == 2
+
+    # a new session sending the same messages gets both responses from the cache, the tool call still runs
+    completion = responses()
+    monkeypatch.setattr(assistant.litellm, "completion", completion)
+    second = assistant.Assistant("openai/test", tools=[search])
+    assert second.send_message("cats?").content == "Cats are great"
+    assert completion.calls == []
+    assert tool_outputs(second) == tool_outputs(first) == [("call_1", "results for cats")]
+    assert second.completion_cache.hits == 2
+
+    # not cached without a seed
+    monkeypatch.setattr(assistant_config, "SEED", None)
+    completion = responses()
+    monkeypatch.setattr(assistant.litellm, "completion", completion)
+    assistant.Assistant("openai/test", tools=[search]).send_message("cats?")
+    assert len(completion.calls) == 2
@@ -0,0 +1,92 @@
+import re
+
+import pytest
+import utility
+from gem.content_search import iter_files, parse_ignore_file, search_file, search_files
+
+@pytest.fixture
+def tree(tmp_path):
+    files = {
+        "main.py": "import os\n\ndef main():\n    print('hello')\n    return 0\n",
+        "README.md": "# Hello\n\nSay hello.\n",
+        "src/app.py": "HELLO = 1\nprint(HELLO)\n",
+        "src/lib/util.py": "def util():\n    pass\n",
+        "build/out.py": "print('hello')\n",
+        "logs/today.log": "hello\n",
+        "logs/keep.log": "hello\n",
+        ".git/config": "hello\n",
+        ".gitignore": "build/\n*.log\n!keep.log\n",
+        "src/.gitignore": "/lib\n",
+    }
+    for path, content in files.items():
+        file = tmp_path / path
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text(content)
+    (tmp_path / "image.png").write_bytes(b"\x89PNG\0\0hello")
+    return tmp_path
+
+def relative(tree, paths):
+    return [str(path)[len(str(tree)) + 1:].replace("\\", "/") for path in paths]
+
+def test_iter_files_follows_ignore_files(tree):
+    assert relative(tree, iter_files(str(tree))) == [
+        ".gitignore", "README.md", "image.png", "main.py", "logs/keep.log", "src/.gitignore", "src/app.py"
+    ]
+    assert relative(tree, iter_files(str(tree), use_ignore_files=False)) == [
+        ".gitignore", "README.md", "image.png", "main.py", "build/out.py", "logs/keep.log", "logs/today.log",
+        "src/.gitignore", "src/app.py", "src/lib/util.py",
+    ]
+
+def test_iter_files_glob(tree):
+    assert relative(tree, iter_files(str(tree), "*.py")) == ["main.py", "src/app.py"]
+    assert relative(tree, iter_files(str(tree), "src/**/*.py", use_ignore_files=False)) == ["src/app.py", "src/lib/util.py"]
+
+def test_parse_ignore_file():
+    rules = parse_ignore_file("# comment\n\nnode_modules/\n/dist\ndocs/*.md\n!important.md\n")
+    assert [(rule.negate, rule.dir_only) for rule in rules] == [(False, True), (False, False), (False, False), (True, False)]
+    assert rules[0].regex.match("a/b/node_modules")
+    assert rules[1].regex.match("dist") and not rules[1].regex.match("a/dist")
+    assert rules[2].regex.match("docs/x.md") and not rules[2].regex.match("docs/sub/x.md")
+
+def test_search_file_context_and_line_numbers(tree):
+    matches = search_file(str(tree / "main.py"), re.compile(rb"print|return"), max_matches=10, context_lines=1)
+    assert matches == [
+        {"line": 4, "text": "    print('hello')", "before": ["def main():"], "after": ["    return 0"]},
+        {"line": 5, "text": "    return 0", "before": ["    print('hello')"], "after": []},
+    ]
+    assert search_file(str(tree / "main.py"), re.compile(rb"^import"), 10, context_lines=2) == [
+        {"line": 1, "text": "import os", "before": [], "after": ["", "def main():"]}
+    ]
+
+def test_search_file_skips_binary_and_cuts_long_lines(tree):
+    assert search_file(str(tree / "image.png"), re.compile(rb"hello"), 10) == []
+    (tree / "min.js").write_text("x" * 1000 + "needle\n")
+    [match] = search_file(str(tree / "min.js"), re.compile(rb"needle"), 10, max_line_length=20)
+    assert match["text"] == "x" * 20 + "..."
+
+def test_search_files_stops_at_max_matches(tree):
+    regex = re.compile(rb"hello", re.IGNORECASE)
+    matches, searched, truncated = search_files(str(tree), regex, max_workers=2)
+    assert [(match["path"], match["line"]) for match in matches] == [
+        (str(tree / "README.md"), 1), (str(tree / "README.md"), 3), (str(tree / "main.py"), 4),
+        (str(tree / "logs/keep.log"), 1), (str(tree / "src/app.py"), 1), (str(tree / "src/app.py"), 2),
+    ]
+    assert (searched, truncated) == (7, False)
+
+    matches, searched, truncated = search_files(str(tree), regex, max_matches=3, max_workers=2)
+    assert len(matches) == 3 and truncated
+    assert searched == 4  # .gitignore, README.md, image.png then main.py
+
+def test_search_file_contents_tool(tree):
+    result = utility.search_file_contents("HELLO", str(tree), glob="*.py", context_lines=0)
+    assert result == {
+        "matches": [
+            {"path": str(tree / "src/app.py"), "line": 1, "text": "HELLO = 1", "before": [], "after": []},
+            {"path": str(tree / "src/app.py"), "line": 2, "text": "print(HELLO)", "before": [], "after": []},
+        ],
+        "files_searched": 2,
+        "truncated": False,
+    }
+    assert len(utility.search_file_contents("hello", str(tree), ignore_case=True)["matches"]) == 6
+    assert utility.search_file_contents("(", str(tree)).startswith("Error: Invalid pattern")
+    assert utility.search_file_contents("x", str(tree / "missing")).startswith("Error: Directory")
@@ -0,0 +1,72 @@
+import time
+from gem.context import ContextManager
+
+def count_words(message):
+    return len((message.get("content") or "").split())
+
+def make_history(tool_output_words=300):
+    big = " ".join(["word"] * tool_output_words)
+    return [
+        {"role": "system", "content": "system prompt"},
+        {"role": "user", "content": "first question"},
+        {"tool_call_id": "call_1", "role": "tool", "name": "read_file", "content": big},
+        {"role": "assistant", "content": "first answer"},
+        {"role": "user", "content": "second question"},
+        {"tool_call_id": "call_2", "role": "tool", "name": "read_file", "content": big},
+        {"role": "assistant", "content": "second answer"},
+    ]
+
+def test_under_budget_is_untouched():
+    context = ContextManager("test", token_budget=10_000, token_counter=count_words)
+    messages = make_history()
+    assert context.build(messages) is messages
+
+def test_old_tool_outputs_are_elided():
+    context = ContextManager("test", token_budget=400, keep_recent_turns=1, preview_chars=20, token_counter=count_words)
+    messages = make_history()
+    original = [dict(message) for message in messages]
+
+    built = context.build(messages)
+
+    assert messages == original # history is never modified
+    assert built[0] == messages[0]
+    assert built[2]["content"].startswith("word word")
+    assert "removed to save context" in built[2]["content"]
+    assert built[2]["tool_call_id"] == "call_1"
+    assert built[5] == messages[5] # recent turn is kept verbatim
+    assert sum(map(count_words, built)) <= 400
+
+def test_recent_turns_are_never_elided():
+    context = ContextManager("test", token_budget=10, keep_recent_turns=2, token_counter=count_words)
+    messages = make_history()
+    assert context.build(messages) == messages
+
+def test_summaries_replace_previews():
+    def summarize(name, content):
+        return f"{name} returned a lot of words"
+
+    context = ContextManager("test", token_budget=400, keep_recent_turns=1, summarize=summarize, token_counter=count_words)
+    messages = make_history()
+
+    first = context.build(messages)
+    assert "removed to save context" in first[2]["content"] # not ready yet, doesn't block
+
+    for _ in range(500):
+        second = context.build(messages)
+        if "removed to save context" not in second[2]["content"]:
+            break
+        time.sleep(0.01)
+    assert second[2]["content"] == "[Summary of an earlier tool output]\nread_file returned a lot of words"
+
+def test_token_counts_are_cached():
+    calls = []
+
+    def counter(message):
+        calls.append(message)
+        return count_words(message)
+
+    context = ContextManager("test", token_budget=10_000, token_counter=counter)
+    messages = make_history()
+    context.build(messages)
+    context.build(messages)
+    assert len(calls) == len(messages)
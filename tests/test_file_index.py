@@ -0,0 +1,130 @@
+import glob
+import os
+
+import pytest
+import config as conf
+import utility
+from gem.file_index import FileIndex, glob_to_regex
+
+PATHS = [
+    "a.txt", "b.md", "archive.tar.gz", ".env",
+    "src/main.py", "src/test_main.py", "src/lib/util.py", "src/lib/[x].py",
+    "docs/guide.md", "docs/img/logo.png", ".git/HEAD", ".git/hooks/pre-commit.py",
+]
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "tree"
+    for path in PATHS:
+        file = root / path
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text("x")
+    return root
+
+@pytest.fixture
+def index(tmp_path):
+    # refresh_interval=0 checks for changes on every search
+    return FileIndex(str(tmp_path / "files.sqlite"), max_workers=4, refresh_interval=0)
+
+@pytest.mark.parametrize("pattern", [
+    "**", "**/*.py", "**/*.md", "src/**/*.py", "**/lib/*", "**/test_*.py", "**/*.gz", "**/[ab].*", "**/[!a]*.txt", "*/*.py",
+])
+@pytest.mark.parametrize("include_hidden", [False, True])
+def test_find_matches_glob(tree, index, pattern, include_hidden):
+    expected = sorted(
+        path for path in glob.glob(os.path.join(str(tree), pattern), recursive=True, include_hidden=include_hidden)
+        if path != str(tree) + os.sep  # "**" also matches the directory itself
+    )
+    assert index.find(str(tree), pattern, include_hidden=include_hidden) == expected
+
+def test_glob_to_regex():
+    assert glob_to_regex("**/*.py").match("a.py")
+    assert glob_to_regex("**/*.py").match("x/y/a.py")
+    assert not glob_to_regex("*.py").match("x/a.py")
+    assert glob_to_regex("src/[!m]*.py").match("src/test.py")
+    assert not glob_to_regex("src/[!m]*.py").match("src/main.py")
+    assert glob_to_regex("[x].py").match("x.py")
+    assert glob_to_regex("a[.py").match("a[.py")
+
+def test_find_name_contains_and_limit(tree, index):
+    assert index.find(str(tree), "**", name_contains="MAIN") == [str(tree / "src/main.py"), str(tree / "src/test_main.py")]
+    assert index.find(str(tree), "**/*.py", limit=1) == [str(tree / "src/lib/[x].py")]
+
+def test_find_subdirectory_uses_parent_index(tree, index):
+    index.find(str(tree), "**")
+    assert index.find(str(tree / "src"), "**/*.py") == [
+        str(tree / "src/lib/[x].py"), str(tree / "src/lib/util.py"), str(tree / "src/main.py"), str(tree / "src/test_main.py")
+    ]
+
+def test_refresh_sees_changes(tree, index):
+    assert len(index.find(str(tree), "**/*.py")) == 4
+    (tree / "src/new.py").write_text("x")
+    (tree / "src/lib/util.py").unlink()
+    (tree / "pkg/sub").mkdir(parents=True)
+    (tree / "pkg/sub/mod.py").write_text("x")
+    os.rename(tree / "docs", tree / "documentation")
+
+    assert index.find(str(tree), "**/*.py") == sorted(str(tree / path) for path in [
+        "pkg/sub/mod.py", "src/lib/[x].py", "src/main.py", "src/new.py", "src/test_main.py"
+    ])
+    assert index.find(str(tree), "**/*.md") == [str(tree / "b.md"), str(tree / "documentation/guide.md")]
+
+def test_refresh_only_lists_changed_directories(tree, index):
+    index.find(str(tree), "**")
+    assert index.refresh(str(tree)) == 0
+    (tree / "src/lib/other.py").write_text("x")
+    assert index.refresh(str(tree)) == 1
+
+def test_mark_dirty_sees_changes_in_the_same_mtime_tick(tree, index):
+    index.find(str(tree), "**")
+    mtime = os.stat(tree / "src").st_mtime_ns
+    (tree / "src/new/deep").mkdir(parents=True)
+    (tree / "src/new/deep/mod.py").write_text("x")
+    os.utime(tree / "src", ns=(mtime, mtime))
+    assert str(tree / "src/new/deep/mod.py") not in index.find(str(tree), "**/*.py")
+
+    index.mark_dirty([str(tree / "src/new/deep/mod.py")])
+    assert str(tree / "src/new/deep/mod.py") in index.find(str(tree), "**/*.py")
+
+def test_search_in_subdirectory_only_checks_its_part(tree, index, monkeypatch):
+    index.find(str(tree), "**")
+    (tree / "docs/new.md").write_text("x")
+    (tree / "src/new").mkdir()
+    (tree / "src/new/mod.py").write_text("x")
+
+    checked = []
+    stat = os.stat
+    monkeypatch.setattr(os, "stat", lambda path, *args, **kwargs: checked.append(path) or stat(path, *args, **kwargs))
+    assert index.find(str(tree / "src/new"), "**/*.py") == [str(tree / "src/new/mod.py")]
+    # src/new wasn't indexed yet, it's found through its parent, the rest of the tree (docs...) is not checked
+    assert {os.path.relpath(path, tree) for path in checked} == {".", "src", "src/new"}
+    assert str(tree / "docs/new.md") in index.find(str(tree), "**/*.md")
+
+def test_index_is_persistent(tree, tmp_path):
+    FileIndex(str(tmp_path / "files.sqlite")).find(str(tree), "**")
+    (tree / "later.py").write_text("x")
+    # within the refresh interval the saved index is used as it is
+    assert FileIndex(str(tmp_path / "files.sqlite"), refresh_interval=60).find(str(tree), "**/*.py", include_hidden=True) == sorted(
+        str(tree / path) for path in [".git/hooks/pre-commit.py", "src/lib/[x].py", "src/lib/util.py", "src/main.py", "src/test_main.py"]
+    )
+
+def test_find_files_tool(tree, tmp_path, monkeypatch):
+    monkeypatch.setattr(conf, "FILE_INDEX_PATH", str(tmp_path / "tool.sqlite"))
+    monkeypatch.setattr(utility, "_file_index", None)
+    assert utility.find_files("**/*.md", str(tree), recursive=True) == [str(tree / "b.md"), str(tree / "docs/guide.md")]
+    assert utility.find_files("*", str(tree), name_contains=".TXT") == [str(tree / "a.txt")]
+    assert utility.find_files("**/*.rs", str(tree), recursive=True) == "No files found matching the criteria."
+
+def test_find_files_tool_sees_written_files(tree, tmp_path, monkeypatch):
+    monkeypatch.setattr(conf, "FILE_INDEX_PATH", str(tmp_path / "tool.sqlite"))
+    monkeypatch.setattr(utility, "_file_index", None)
+    assert utility.find_files("**/*.rs", str(tree), recursive=True) == "No files found matching the criteria."
+    utility.write_files([utility.FileData(file_path=str(tree / "src/lib/new.rs"), content="fn main() {}")])
+    assert utility.find_files("**/*.rs", str(tree), recursive=True) == [str(tree / "src/lib/new.rs")]
+    utility.rename_file(str(tree / "src/lib/new.rs"), "renamed.rs")
+    assert utility.find_files("**/*.rs", str(tree), recursive=True) == [str(tree / "src/lib/renamed.rs")]
+
+def test_find_files_tool_bad_pattern(tree, tmp_path, monkeypatch):
+    monkeypatch.setattr(conf, "FILE_INDEX_PATH", str(tmp_path / "tool.sqlite"))
+    monkeypatch.setattr(utility, "_file_index", None)
+    assert utility.find_files("**/[z-a].py", str(tree), recursive=True).startswith("Error: Invalid pattern '**/[z-a].py'")
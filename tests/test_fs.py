@@ -0,0 +1,317 @@
+import os
+
+import pytest
+import config as conf
+import utility
+import gem.fs
+from gem.fs import DirectorySizer, LineIndex, read_window, walk, walk_key, write_atomic
+from gem.utils import format_size
+
+@pytest.fixture
+def tree(tmp_path):
+    # tree/
+    #   a.txt  b.txt
+    #   src/ main.py  lib/ util.py
+    #   node_modules/ pkg/ index.js
+    #   .git/ HEAD
+    for path in ["a.txt", "b.txt", "src/main.py", "src/lib/util.py", "node_modules/pkg/index.js", ".git/HEAD"]:
+        file = tmp_path / path
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text("x" * 10)
+    return tmp_path
+
+def relative(tree, entries):
+    return [os.path.relpath(entry.path, tree).replace(os.sep, "/") for entry, _ in entries]
+
+def test_walk_order_matches_os_walk(tree):
+    expected = []
+    for dirpath, dirnames, filenames in os.walk(tree):
+        dirnames.sort()
+        expected += [os.path.join(dirpath, name) for name in dirnames + sorted(filenames)]
+    assert [entry.path for entry, _ in walk(str(tree))] == expected
+
+def test_walk_exclude_and_depth(tree):
+    entries = list(walk(str(tree), exclude=[".git", "node_modules"]))
+    assert relative(tree, entries) == ["src", "a.txt", "b.txt", "src/lib", "src/main.py", "src/lib/util.py"]
+    assert [depth for _, depth in entries] == [0, 0, 0, 1, 1, 2]
+
+    assert relative(tree, walk(str(tree), max_depth=1, exclude=[".*", "node_*"], dirs=False)) == ["a.txt", "b.txt", "src/main.py"]
+
+def test_list_dir_pagination(tree, monkeypatch):
+    monkeypatch.setattr(conf, "LIST_DIR_EXCLUDE", [".git", "node_modules"])
+    first = utility.list_dir(str(tree), recursive=True, files_only=True, dirs_only=False, max_items=2)
+    assert [item["name"] for item in first["items"]] == ["a.txt", "b.txt"]
+    assert first["items"][0]["size"] == format_size(10)
+    assert first["next_cursor"] == "b.txt"
+
+    second = utility.list_dir(str(tree), recursive=True, files_only=True, dirs_only=False, max_items=2, cursor=first["next_cursor"])
+    assert [item["name"] for item in second["items"]] == ["main.py", "util.py"]
+    assert second["next_cursor"] is None
+
+def test_list_dir_cursor_survives_changes(tree):
+    first = utility.list_dir(str(tree), recursive=True, files_only=False, dirs_only=False, max_items=3)
+    assert [item["name"] for item in first["items"]] == ["src", "a.txt", "b.txt"]
+    # an entry before the cursor is removed and one after it is added
+    (tree / "a.txt").unlink()
+    (tree / "src" / "new.py").write_text("x")
+    second = utility.list_dir(str(tree), recursive=True, files_only=False, dirs_only=False, max_items=3, cursor=first["next_cursor"])
+    assert [item["name"] for item in second["items"]] == ["lib", "main.py", "new.py"]
+    assert second["next_cursor"] == "src/new.py"
+
+def test_walk_after(tree, monkeypatch):
+    everything = [(entry.path, entry.is_dir()) for entry, _ in walk(str(tree))]
+    for index, (path, is_dir) in enumerate(everything):
+        key = walk_key(os.path.relpath(path, tree), is_dir)
+        assert [(entry.path, entry.is_dir()) for entry, _ in walk(str(tree), after=key)] == everything[index + 1:]
+
+    # directories that only have entries before the cursor are not read
+    scanned = []
+    scandir = os.scandir
+    monkeypatch.setattr(gem.fs.os, "scandir", lambda path: scanned.append(os.path.relpath(path, tree)) or scandir(path))
+    assert relative(tree, walk(str(tree), after="src/lib/")) == ["src/main.py", "src/lib/util.py"]
+    assert scanned == [".", "src", "src/lib"]  # not .git or node_modules
+
+def test_list_dir_not_recursive(tree):
+    # the default exclude only applies to recursive listings
+    result = utility.list_dir(str(tree), recursive=False, files_only=False, dirs_only=True)
+    assert [item["name"] for item in result["items"]] == [".git", "node_modules", "src"]
+    assert all(item["is_dir"] and item["size"] == "N/A" for item in result["items"])
+    result = utility.list_dir(str(tree), recursive=False, files_only=False, dirs_only=True, exclude=["node_*"])
+    assert [item["name"] for item in result["items"]] == [".git", "src"]
+
+def test_list_dir_missing_directory(tmp_path):
+    assert utility.list_dir(str(tmp_path / "missing"), False, False, False).startswith("Error listing directory")
+
+def os_walk_size(path):
+    files = [os.path.join(dirpath, name) for dirpath, _, names in os.walk(path) for name in names]
+    return sum(os.path.getsize(file) for file in files), len(files)
+
+def test_directory_sizes(tree):
+    (tree / "src" / "big.bin").write_bytes(b"x" * 1000)
+    sizer = DirectorySizer(max_workers=4)
+    sizes = sizer.sizes([str(tree), str(tree / "src"), str(tree / "missing")])
+
+    assert sizes[str(tree)] == os_walk_size(tree) == (1060, 7)
+    assert sizes[str(tree / "src")] == os_walk_size(tree / "src")
+    assert sizes[str(tree / "missing")] == (0, 0)
+    # src is inside tree so it wasn't walked twice: tree, src, lib, node_modules, pkg, .git (+ the missing one)
+    assert sizer.misses == 6
+
+def test_directory_sizes_only_rescan_changed_directories(tree):
+    sizer = DirectorySizer(max_workers=4)
+    sizer.sizes([str(tree)])
+    sizer.hits = sizer.misses = 0
+
+    assert sizer.sizes([str(tree)])[str(tree)] == (60, 6)
+    assert (sizer.hits, sizer.misses) == (6, 0)
+
+    (tree / "src" / "lib" / "new.py").write_text("x" * 40)
+    assert sizer.sizes([str(tree)])[str(tree)] == (100, 7)
+    assert sizer.misses == 1
+
+def test_directory_sizes_sibling_prefix(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a-b").mkdir()
+    (tmp_path / "a" / "f").write_text("x")
+    (tmp_path / "a-b" / "f").write_text("xx")
+    sizes = DirectorySizer().sizes([str(tmp_path / "a"), str(tmp_path / "a-b")])
+    assert sizes == {str(tmp_path / "a"): (1, 1), str(tmp_path / "a-b"): (2, 1)}
+
+def test_get_multiple_directory_size(tree):
+    result = utility.get_multiple_directory_size([str(tree / "src"), str(tree)])
+    assert [item["FileCount"] for item in result] == [2, 6]
+
+
+def test_read_window_modes(tmp_path):
+    file = tmp_path / "log.txt"
+    file.write_text("".join(f"line {i}\n" for i in range(1000)))
+    size = file.stat().st_size
+
+    head = read_window(str(file), "head", max_bytes=14)
+    assert (head.text, head.start, head.end, head.size, head.truncated) == ("line 0\nline 1\n", 0, 14, size, True)
+    tail = read_window(str(file), "tail", max_bytes=9)
+    assert (tail.text, tail.start, tail.end) == ("line 999\n", size - 9, size)
+    assert read_window(str(file), "range", start=7, end=14).text == "line 1\n"
+    assert read_window(str(file), "range", start=7, end=10**9, max_bytes=3).text == "lin"
+
+    whole = read_window(str(file))
+    assert not whole.truncated and whole.text == file.read_text()
+    with pytest.raises(ValueError):
+        read_window(str(file), "middle")
+
+def test_read_window_large_file_uses_mmap(tmp_path, monkeypatch):
+    monkeypatch.setattr(gem.fs, "MMAP_MIN_SIZE", 10)
+    file = tmp_path / "big.txt"
+    file.write_text("a" * 100 + "end")
+    assert read_window(str(file), "tail", max_bytes=3).text == "end"
+    assert read_window(str(file), "head", max_bytes=3).text == "aaa"
+
+def test_read_window_never_cuts_characters(tmp_path):
+    file = tmp_path / "utf8.txt"
+    file.write_text("ééé", encoding="utf-8")  # 2 bytes each
+    assert read_window(str(file), "head", max_bytes=3).text == "é"
+    assert read_window(str(file), "range", start=1, end=6).text == "éé"
+    assert read_window(str(file), "tail", max_bytes=3).text == "é"
+
+def test_read_window_encodings(tmp_path):
+    utf16 = tmp_path / "utf16.txt"
+    utf16.write_bytes("hello wörld".encode("utf-16"))  # with a BOM
+    window = read_window(str(utf16))
+    assert (window.text, window.encoding, window.truncated) == ("hello wörld", "utf-16-le", False)
+    assert read_window(str(utf16), "tail", max_bytes=11).text == "wörld"
+
+    latin1 = tmp_path / "latin1.txt"
+    latin1.write_bytes("Café au lait, crème brûlée et pâtisserie française. ".encode("cp1252") * 20)
+    window = read_window(str(latin1), max_bytes=52)
+    # single byte encodings are guessed, which of the close ones is picked doesn't matter here
+    assert window.encoding != "utf-8" and window.text.startswith("Café au lait") and window.text.endswith("française. ")
+
+    binary = tmp_path / "image.png"
+    binary.write_bytes(b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR")
+    assert read_window(str(binary)).encoding is None
+
+def test_read_file_tool(tmp_path, monkeypatch):
+    monkeypatch.setattr(conf, "READ_FILE_MAX_BYTES", 10)
+    file = tmp_path / "notes.txt"
+    file.write_text("0123456789abcdefghij")
+
+    assert utility.read_file(str(file)) == (
+        "0123456789\n[Truncated: showing bytes 0-10 of 20 (20.00 Bytes), read other parts with mode=\"head\", \"tail\" or \"range\" (start/end)]"
+    )
+    assert utility.read_file(str(file), mode="tail").endswith("]\nabcdefghij")
+    # max_bytes can't go over the configured limit
+    assert utility.read_file(str(file), mode="range", start=5, max_bytes=100).startswith("56789abcde\n")
+
+    (tmp_path / "small.txt").write_text("hi")
+    assert utility.read_file(str(tmp_path / "small.txt")) == "hi"
+    (tmp_path / "data.bin").write_bytes(b"\0\1\2")
+    assert "binary file" in utility.read_file(str(tmp_path / "data.bin"))
+    assert utility.read_file(str(tmp_path / "missing.txt")).startswith("Error reading file:")
+
+    assert utility.read_file(str(file), max_bytes=0) == "Error reading file: max_bytes must be more than 0, got 0"
+    assert utility.read_file(str(file), max_bytes=-5).startswith("Error reading file: max_bytes")
+    assert utility.read_file(str(file), mode="range", start=-1).startswith("Error reading file: start and end")
+    assert utility.read_file(str(file), mode="range", start=8, end=3).startswith("Error reading file: end (3)")
+
+
+def test_line_index_reads_ranges(tmp_path):
+    file = tmp_path / "lines.txt"
+    file.write_bytes(b"one\ntwo\r\n\nfour\nfive")
+    index = LineIndex()
+    assert index.read_lines(str(file), 1, 2) == ("one\ntwo", 5)
+    assert index.read_lines(str(file), 3, 4) == ("\nfour", 5)
+    assert index.read_lines(str(file), 4, 100) == ("four\nfive", 5)
+    assert index.read_lines(str(file), 6, 7) == ("", 5)
+    assert (index.hits, index.misses) == (3, 1)
+
+    (tmp_path / "newline.txt").write_text("a\nb\n")
+    assert index.read_lines(str(tmp_path / "newline.txt"), 2, 2) == ("b", 2)
+    (tmp_path / "empty.txt").write_text("")
+    assert index.read_lines(str(tmp_path / "empty.txt"), 1, 1) == ("", 0)
+
+def test_line_index_detects_encoding(tmp_path):
+    index = LineIndex()
+    latin = "Grüße aus Köln, das Café am Ufer\nhat schöne Bäume und süße Äpfel.\nEnde."
+    (tmp_path / "latin.txt").write_bytes(latin.encode("latin-1"))
+    assert index.read_lines(str(tmp_path / "latin.txt"), 2, 3) == ("hat schöne Bäume und süße Äpfel.\nEnde.", 3)
+
+    # "\u0a41\u0100" is 41 0a 00 01 in utf-16-le, the 0a 00 in it is not a line break
+    text = "first \u0a41\u0100\r\nsecond\nthird"
+    (tmp_path / "utf16.txt").write_bytes(text.encode("utf-16"))  # with a BOM
+    assert index.read_lines(str(tmp_path / "utf16.txt"), 1, 3) == (text.replace("\r\n", "\n"), 3)
+    assert index.read_lines(str(tmp_path / "utf16.txt"), 2, 2) == ("second", 3)
+
+    (tmp_path / "bom.txt").write_bytes(b"\xef\xbb\xbfone\ntwo\n")
+    assert index.read_lines(str(tmp_path / "bom.txt"), 1, 1) == ("one", 2)
+
+def test_line_index_sees_changes_and_drops_old_files(tmp_path):
+    file = tmp_path / "lines.txt"
+    file.write_text("a\nb\n")
+    index = LineIndex(max_files=1)
+    index.read_lines(str(file), 1, 1)
+    file.write_text("a\nb\nc\nd\n")
+    assert index.read_lines(str(file), 3, 4) == ("c\nd", 4)
+    assert index.misses == 2
+
+    (tmp_path / "other.txt").write_text("x")
+    index.read_lines(str(tmp_path / "other.txt"), 1, 1)
+    index.read_lines(str(file), 1, 1)
+    assert index.misses == 4
+
+def test_read_file_at_specific_line_range(tmp_path):
+    file = tmp_path / "code.py"
+    file.write_text("def f():\n\n    return 1\n")
+    # lines keep their own line breaks, blank lines are not doubled
+    assert utility.read_file_at_specific_line_range(str(file), 1, 3) == "def f():\n\n    return 1"
+    assert utility.read_file_at_specific_line_range(str(file), 3, 3) == "    return 1"
+    assert utility.read_file_at_specific_line_range(str(file), 4, 5).startswith("Error: Start line (4) is out of range")
+    assert utility.read_file_at_specific_line_range(str(file), 2, 1).startswith("Error: Start line (2) cannot be greater")
+    assert utility.read_file_at_specific_line_range(str(tmp_path / "missing"), 1, 1).startswith("File not found")
+
+
+def test_write_atomic(tmp_path):
+    file = tmp_path / "a" / "b" / "file.txt"
+    assert write_atomic(str(file), b"hello")
+    assert file.read_bytes() == b"hello"
+
+    os.utime(file, ns=(1_000_000_000, 1_000_000_000))
+    assert not write_atomic(str(file), b"hello")  # unchanged, not touched
+    assert file.stat().st_mtime_ns == 1_000_000_000
+    assert write_atomic(str(file), b"world")  # same size, other content
+    assert file.read_bytes() == b"world"
+    assert os.listdir(file.parent) == ["file.txt"]  # no temporary file left
+
+@pytest.mark.skipif(os.name == "nt", reason="posix permissions and symlinks")
+def test_write_atomic_keeps_mode_and_follows_symlinks(tmp_path, monkeypatch):
+    script = tmp_path / "run.sh"
+    script.write_text("echo 1")
+    script.chmod(0o755)
+    link = tmp_path / "link.sh"
+    link.symlink_to(script)
+
+    assert write_atomic(str(link), b"echo 2")
+    assert link.is_symlink() and script.read_text() == "echo 2"
+    assert script.stat().st_mode & 0o777 == 0o755
+
+    umask = os.umask(0)
+    os.umask(umask)
+    new = tmp_path / "new.txt"
+    # the umask is process wide, it must not be changed while writing (from the write_files threads)
+    monkeypatch.setattr(gem.fs.os, "umask", lambda mask: pytest.fail("umask changed while writing"))
+    write_atomic(str(new), b"x")
+    assert new.stat().st_mode & 0o777 == 0o666 & ~umask
+
+def test_write_atomic_failure_leaves_file(tmp_path, monkeypatch):
+    file = tmp_path / "file.txt"
+    file.write_text("old")
+    def replace(source, destination):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", replace)
+    with pytest.raises(OSError):
+        write_atomic(str(file), b"new content")
+    assert file.read_text() == "old"
+    assert os.listdir(tmp_path) == ["file.txt"]
+
+def test_write_files_tool(tmp_path, monkeypatch):
+    monkeypatch.setattr(conf, "WRITE_FILES_WORKERS", 4)
+    (tmp_path / "same.txt").write_text("same")
+    (tmp_path / "dir").mkdir()
+    files = [
+        utility.FileData(file_path=str(tmp_path / "new" / f"{i}.txt"), content=f"file {i}") for i in range(10)
+    ] + [
+        utility.FileData(file_path=str(tmp_path / "same.txt"), content="same"),
+        utility.FileData(file_path=str(tmp_path / "dir"), content="not a file"),
+        utility.FileData(file_path=str(tmp_path / "twice.txt"), content="first"),
+        utility.FileData(file_path=str(tmp_path / "twice.txt"), content="second"),
+    ]
+    results = utility.write_files(files)
+
+    assert list(results) == [file.file_path for file in files[:-1]]
+    assert all(results[str(tmp_path / "new" / f"{i}.txt")]["status"] == "written" for i in range(10))
+    assert (tmp_path / "new" / "9.txt").read_text() == "file 9"
+    same = results[str(tmp_path / "same.txt")]
+    assert (same["status"], same["bytes"]) == ("unchanged", 4) and same["seconds"] >= 0
+    assert results[str(tmp_path / "dir")]["status"] == "error" and "error" in results[str(tmp_path / "dir")]
+    assert (tmp_path / "twice.txt").read_text() == "second"
+    assert utility.write_files([]) == {}
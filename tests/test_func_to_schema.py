@@ -131,3 +131,99 @@ def test_unsupportd_type_hints():
     with pytest.warns(UserWarning, match="Unsupported type hint: typing.Callable. Treating as Any."):
         _ = function_to_json_schema(test_func)
 
+
+def test_argument_adapter_coerces_types():
+    from func_to_schema import ArgumentAdapter
+
+    class FileData(BaseModel):
+        file_path: str
+        content: str
+
+    def write_files(files_data: list[FileData], overwrite: bool = True, count: int = 1, label: str = ""):
+        pass
+
+    adapter = ArgumentAdapter(write_files)
+    args = adapter.validate_json('{"files_data": [{"file_path": "a.txt", "content": "hi"}], "count": "3", "label": 2024}')
+
+    assert args["files_data"] == [FileData(file_path="a.txt", content="hi")]
+    assert args["count"] == 3
+    assert args["label"] == "2024" # models often send numbers for string params (ids, years...)
+    assert "overwrite" not in args # defaults are left to the function
+    assert adapter.validate_json({"files_data": []}) == {"files_data": []}
+
+def test_argument_adapter_errors():
+    from func_to_schema import ArgumentAdapter, ToolArgumentError
+
+    def read_file(filepath: str, limit: int = 10):
+        pass
+
+    adapter = ArgumentAdapter(read_file)
+
+    with pytest.raises(ToolArgumentError, match="filepath: Field required"):
+        adapter.validate_json('{"limit": 5}')
+    with pytest.raises(ToolArgumentError, match="limit: Input should be a valid integer"):
+        adapter.validate_json('{"filepath": "a.txt", "limit": "many"}')
+    with pytest.raises(ToolArgumentError, match="path: Extra inputs are not permitted"):
+        adapter.validate_json('{"filepath": "a.txt", "path": "b.txt"}')
+    with pytest.raises(ToolArgumentError, match="Invalid arguments for read_file"):
+        adapter.validate_json('{"filepath": ')
+
+def test_argument_adapter_untyped_and_empty():
+    from func_to_schema import ArgumentAdapter
+
+    def untyped(value, *args, **kwargs):
+        pass
+
+    def no_params():
+        pass
+
+    assert ArgumentAdapter(untyped).validate_json('{"value": [1, "a"]}') == {"value": [1, "a"]}
+    assert ArgumentAdapter(no_params).validate_json("") == {}
+
+def test_schema_cache(tmp_path):
+    import json
+    from func_to_schema import SchemaCache
+
+    class Item(BaseModel):
+        name: str
+
+    def add_items(items: list[Item], count: int = 1):
+        """
+        Adds items.
+
+        Args:
+            items: The items to add
+        """
+        pass
+
+    path = tmp_path / "schemas.json"
+    cold = SchemaCache(str(path))
+    schema = cold.function_to_json_schema(add_items)
+    assert schema == json.loads(json.dumps(function_to_json_schema(add_items)))
+    assert (cold.hits, cold.misses) == (0, 1)
+    cold.save()
+
+    warm = SchemaCache(str(path))
+    assert warm.function_to_json_schema(add_items) == schema
+    assert (warm.hits, warm.misses) == (1, 0)
+
+    # any change to the docstring (or source) regenerates the schema
+    add_items.__doc__ = "Adds items, now with a new description."
+    changed = warm.function_to_json_schema(add_items)
+    assert warm.misses == 1
+    assert changed["function"]["description"] == "Adds items, now with a new description."
+
+def test_schema_cache_corrupted_file(tmp_path):
+    from func_to_schema import SchemaCache
+
+    path = tmp_path / "schemas.json"
+    path.write_text("{not json")
+
+    def ping():
+        """Ping."""
+        pass
+
+    cache = SchemaCache(str(path))
+    assert cache.function_to_json_schema(ping)["function"]["name"] == "ping"
+    cache.save()
+    assert SchemaCache(str(path)).function_to_json_schema(ping)["function"]["name"] == "ping"
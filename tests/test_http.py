@@ -0,0 +1,169 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+import config as conf
+import utility
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.client_address[1]))
+        if self.path == "/flaky" and self.server.failures > 0:
+            self.server.failures -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server(http_server):
+    server = http_server(Handler)
+    server.requests = []
+    server.failures = 0
+    return server
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(conf, "HTTP_RETRY_BACKOFF", 0)
+    monkeypatch.setattr(utility, "_http_session", None)
+    return utility.get_http_session()
+
+def test_session_is_shared(session):
+    assert utility.get_http_session() is session
+
+def test_connections_are_reused(server, session):
+    url = server.url()
+    for _ in range(3):
+        assert session.get(url, timeout=utility.HTTP_TIMEOUT).text == "ok"
+
+    client_ports = {port for _, port in server.requests}
+    assert len(server.requests) == 3 and len(client_ports) == 1
+
+def test_retries_server_errors(server, session):
+    server.failures = 2
+    response = session.get(server.url("/flaky"), timeout=utility.HTTP_TIMEOUT)
+    assert response.status_code == 200
+    assert len(server.requests) == 3
+
+def test_gives_up_after_retries(server, session):
+    server.failures = conf.HTTP_RETRIES + 1
+    response = session.get(server.url("/flaky"), timeout=utility.HTTP_TIMEOUT)
+    assert response.status_code == 503
+    assert len(server.requests) == conf.HTTP_RETRIES + 1
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/big":
+            content_type, body, status = "text/plain", b"x" * 5000, 200
+        elif self.path == "/zip":
+            content_type, body, status = "application/zip", b"PK\3\4" + b"\0" * 5000, 200
+        else:
+            content_type, body, status = "application/json", b'{"error": "not found"}', 404
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def api_server(http_server, session, monkeypatch):
+    monkeypatch.setattr(conf, "HTTP_CACHE_PATH", None)
+    monkeypatch.setattr(conf, "HTTP_MAX_RESPONSE_BYTES", 1000)
+    return http_server(ApiHandler)
+
+def test_http_get_request_caps_body(api_server):
+    result = utility.http_get_request(api_server.url("/big"))
+    assert result["status"] == 200
+    assert result["truncated"] and result["content_length"] == 5000
+    assert result["body"].startswith("x" * 1000) and "x" * 1001 not in result["body"]
+
+def test_http_get_request_skips_binary(api_server):
+    result = utility.http_get_request(api_server.url("/zip"))
+    assert "Binary content (application/zip" in result["body"]
+
+def test_http_get_request_returns_error_status(api_server):
+    result = utility.http_get_request(api_server.url("/missing"))
+    assert result["status"] == 404
+    assert result["body"] == '{"error": "not found"}' and not result["truncated"]
+
+class SlowHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.2
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.active += 1
+            self.server.max_active = max(self.server.max_active, self.server.active)
+        time.sleep(self.delay)
+        with self.server.lock:
+            self.server.active -= 1
+
+        if self.path == "/missing":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = f"<html><body><h1>Page {self.path}</h1><script>var x;</script></body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def slow_servers(http_server, session, monkeypatch):
+    monkeypatch.setattr(conf, "HTTP_CACHE_PATH", None)
+    monkeypatch.setattr(conf, "FETCH_URLS_MAX_CONCURRENCY", 8)
+    monkeypatch.setattr(conf, "FETCH_URLS_PER_HOST", 2)
+    servers = [http_server(SlowHandler) for _ in range(3)]
+    for server in servers:
+        server.lock = threading.Lock()
+        server.active = server.max_active = 0
+    return servers
+
+def test_fetch_urls_per_host_limit(slow_servers):
+    server = slow_servers[0]
+    start = time.perf_counter()
+    results = utility.fetch_urls([server.url(f"/{i}") for i in range(6)])
+    elapsed = time.perf_counter() - start
+
+    assert [result["url"] for result in results] == [server.url(f"/{i}") for i in range(6)]
+    assert results[3]["content"] == "Page /3"
+    assert server.max_active == 2
+    assert elapsed >= 3 * SlowHandler.delay
+
+def test_fetch_urls_hosts_run_concurrently(slow_servers):
+    urls = [server.url(f"/{i}") for server in slow_servers for i in range(2)]
+    start = time.perf_counter()
+    results = utility.fetch_urls(urls)
+    elapsed = time.perf_counter() - start
+
+    assert all("content" in result and result["seconds"] >= SlowHandler.delay for result in results)
+    assert elapsed < 3 * SlowHandler.delay # one after another it would take 6 * delay
+
+def test_fetch_urls_reports_errors(slow_servers):
+    server = slow_servers[0]
+    results = utility.fetch_urls([server.url("/missing"), server.url("/ok"), "http://127.0.0.1:1/"])
+
+    assert "404" in results[0]["error"]
+    assert results[1]["content"] == "Page /ok"
+    assert "error" in results[2]
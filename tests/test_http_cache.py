@@ -0,0 +1,174 @@
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+import requests
+from gem.cache import DiskCache
+from gem.http_cache import HttpCache, is_text_content_type, parse_cache_control, read_body
+
+BODY = b"x" * 10_000
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # path -> extra response headers
+    routes = {
+        "/etag": {"ETag": '"v1"', "Cache-Control": "no-cache"},
+        "/last-modified": {"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"},
+        "/max-age": {"Cache-Control": "max-age=60"},
+        "/no-store": {"Cache-Control": "no-store", "ETag": '"v1"'},
+        "/plain": {},
+    }
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        headers = self.routes[self.path]
+        if ("If-None-Match" in self.headers and self.headers["If-None-Match"] == headers.get("ETag")) or (
+            "If-Modified-Since" in self.headers and self.headers["If-Modified-Since"] == headers.get("Last-Modified")
+        ):
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(BODY)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server(http_server):
+    server = http_server(Handler)
+    server.requests = []
+    return server
+
+@pytest.fixture
+def cache():
+    return HttpCache(requests.Session(), DiskCache(":memory:"))
+
+def test_etag_revalidation(server, cache):
+    first = cache.get(server.url("/etag"))
+    second = cache.get(server.url("/etag"))
+
+    assert first.content == second.content == BODY
+    assert second.from_cache and second.status_code == 200
+    assert server.requests[1][1]["If-None-Match"] == '"v1"'
+    assert (cache.misses, cache.revalidations, cache.hits) == (1, 1, 0)
+    assert cache.bytes_saved == len(BODY)
+
+def test_last_modified_revalidation(server, cache):
+    cache.get(server.url("/last-modified"))
+    response = cache.get(server.url("/last-modified"))
+
+    assert response.from_cache and response.text == BODY.decode()
+    assert server.requests[1][1]["If-Modified-Since"] == "Wed, 21 Oct 2015 07:28:00 GMT"
+
+def test_fresh_response_is_not_requested_again(server, cache):
+    cache.get(server.url("/max-age"))
+    response = cache.get(server.url("/max-age"))
+
+    assert response.from_cache and response.content == BODY
+    assert len(server.requests) == 1 and cache.hits == 1
+
+def test_no_store_is_not_cached(server, cache):
+    cache.get(server.url("/no-store"))
+    response = cache.get(server.url("/no-store"))
+
+    assert not response.from_cache
+    assert "If-None-Match" not in server.requests[1][1]
+    assert len(cache.cache) == 0
+
+def test_no_caching_headers_are_not_cached(server):
+    cache = HttpCache(requests.Session(), DiskCache(":memory:"), heuristic_ttl=60)
+    cache.get(server.url("/plain"))
+    assert not cache.get(server.url("/plain")).from_cache
+    assert len(cache.cache) == 0  # no way to reuse or revalidate it
+
+def test_heuristic_ttl(server):
+    cache = HttpCache(requests.Session(), DiskCache(":memory:"), heuristic_ttl=60)
+    cache.get(server.url("/last-modified"))
+    assert cache.get(server.url("/last-modified")).from_cache
+    assert len(server.requests) == 1 and cache.hits == 1
+
+    assert cache.freshness_lifetime({"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT", "Date": "Wed, 21 Oct 2015 07:38:00 GMT"}) == 60
+    assert cache.freshness_lifetime({"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT", "Date": "Wed, 21 Oct 2015 07:28:50 GMT"}) == 5
+    assert HttpCache(requests.Session(), DiskCache(":memory:")).freshness_lifetime({"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0
+
+def test_size_cap(server):
+    cache = HttpCache(requests.Session(), DiskCache(":memory:", max_bytes=len(BODY) + 1000))
+    cache.get(server.url("/max-age"))
+    cache.get(server.url("/etag"))
+    assert len(cache.cache) == 1
+    assert cache.cache.size <= len(BODY) + 1000
+
+def test_parse_cache_control():
+    assert parse_cache_control('No-Cache, max-age=60, private="x"') == {"no-cache": None, "max-age": "60", "private": "x"}
+    assert parse_cache_control(None) == {}
+
+class BodyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # path -> (content type, body)
+    routes = {
+        "/text": ("text/plain; charset=utf-8", b"a" * 300_000),
+        "/json": ("application/json", b'{"a": 1}'),
+        "/image": ("image/png", b"\x89PNG" + b"\0" * 300_000),
+        "/untyped-binary": (None, b"\0\1\2" * 1000),
+    }
+
+    def do_GET(self):
+        content_type, body = self.routes[self.path]
+        self.send_response(200)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "max-age=60")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def body_server(http_server):
+    return http_server(BodyHandler)
+
+def stream(url):
+    return requests.get(url, stream=True)
+
+def test_read_body_cap(body_server):
+    response = read_body(stream(body_server.url("/text")), max_bytes=1000)
+    assert response.content == b"a" * 1000
+    assert response.truncated and not response.binary
+
+    response = read_body(stream(body_server.url("/text")))
+    assert len(response.content) == 300_000 and not response.truncated
+    assert response.text == "a" * 300_000
+
+def test_read_body_skips_binary(body_server):
+    response = read_body(stream(body_server.url("/image")), stop_on_binary=True)
+    assert response.binary and response.truncated and response.content == b""
+
+    response = read_body(stream(body_server.url("/untyped-binary")), stop_on_binary=True)
+    assert response.binary and response.content == b""
+
+    response = read_body(stream(body_server.url("/json")), stop_on_binary=True)
+    assert not response.binary and response.json() == {"a": 1}
+
+def test_truncated_responses_are_not_cached(body_server):
+    cache = HttpCache(requests.Session(), DiskCache(":memory:"))
+    response = cache.get(body_server.url("/text"), max_bytes=1000)
+    assert response.truncated and len(cache.cache) == 0
+
+    cache.get(body_server.url("/json"), max_bytes=1000)
+    assert cache.get(body_server.url("/json"), max_bytes=1000).from_cache
+
+def test_is_text_content_type():
+    assert is_text_content_type("text/html; charset=utf-8")
+    assert is_text_content_type("application/vnd.api+json")
+    assert not is_text_content_type("application/octet-stream")
+    assert not is_text_content_type("image/png")
@@ -0,0 +1,75 @@
+import json
+import threading
+import time
+
+import pytest
+import config as conf
+
+LOCATION = "Location: City: Paris, Country: France, Continent: Europe, Timezone: Europe/Paris, Currency: € (EUR)"
+
+@pytest.fixture
+def cache_path(tmp_path, monkeypatch):
+    path = tmp_path / "cache" / "location.json"
+    monkeypatch.setattr(conf, "LOCATION_CACHE_PATH", str(path))
+    return path
+
+@pytest.fixture
+def threads(monkeypatch):
+    """The threads started by `get_location_info`."""
+    started = []
+    class RecordedThread(threading.Thread):
+        def start(self):
+            started.append(self)
+            super().start()
+    monkeypatch.setattr(conf.threading, "Thread", RecordedThread)
+    return started
+
+def write_cache(path, location_info, age):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"location_info": location_info, "fetched_at": time.time() - age}))
+
+def test_missing_cache_does_not_wait(cache_path, threads, monkeypatch):
+    release = threading.Event()
+    def fetch_location_info():
+        release.wait(5)
+        return LOCATION
+    monkeypatch.setattr(conf, "fetch_location_info", fetch_location_info)
+
+    assert conf.get_location_info() == "Location: Unknown"
+    assert not cache_path.exists()
+    release.set()
+    [thread] = threads
+    thread.join(5)
+    assert json.loads(cache_path.read_text())["location_info"] == LOCATION
+    assert [path.name for path in cache_path.parent.iterdir()] == ["location.json"]  # no temp file left
+
+def test_fresh_cache_is_used_as_is(cache_path, threads, monkeypatch):
+    monkeypatch.setattr(conf, "fetch_location_info", lambda: pytest.fail("fresh cache refreshed"))
+    write_cache(cache_path, LOCATION, age=60)
+    assert conf.get_location_info() == LOCATION
+    assert threads == []
+
+def test_stale_cache_is_refreshed_without_caching_failures(cache_path, threads, monkeypatch):
+    stale = LOCATION.replace("Paris", "Lyon")
+    write_cache(cache_path, stale, age=conf.LOCATION_CACHE_TTL + 60)
+
+    monkeypatch.setattr(conf, "fetch_location_info", lambda: "Location: Could not retrieve location information. Error: timeout")
+    assert conf.get_location_info() == stale
+    threads[-1].join(5)
+    assert json.loads(cache_path.read_text())["location_info"] == stale
+
+    monkeypatch.setattr(conf, "fetch_location_info", lambda: LOCATION)
+    assert conf.get_location_info() == stale  # the refreshed value is for the next start
+    threads[-1].join(5)
+    assert len(threads) == 2
+    assert conf.get_location_info() == LOCATION
+    assert len(threads) == 2
+
+@pytest.mark.parametrize("content", ["[]", "null", '"Paris"', "not json"])
+def test_invalid_cache_is_a_miss(cache_path, threads, monkeypatch, content):
+    monkeypatch.setattr(conf, "fetch_location_info", lambda: LOCATION)
+    cache_path.parent.mkdir(parents=True)
+    cache_path.write_text(content)
+    assert conf.get_location_info() == "Location: Unknown"
+    threads[-1].join(5)
+    assert conf.get_location_info() == LOCATION
@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+
+import praw
+import pytest
+import requests
+import config as conf
+import utility
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "reddit")
+
+# (method, path) -> fixture with the recorded response
+ROUTES = {
+    ("POST", "/api/v1/access_token"): "access_token.json",
+    ("GET", "/api/info/"): "info.json",
+    ("GET", "/r/python/search/"): "search.json",
+    ("GET", "/comments/abc123/"): "comments_abc123.json",
+    ("POST", "/api/morechildren/"): "morechildren.json",
+}
+
+class ReplaySession:
+    """Stand-in for the `requests.Session` praw uses, answers with the fixtures and records the requests."""
+
+    def __init__(self):
+        self.headers = {}
+        self.requests = []
+
+    def request(self, method, url, params=None, data=None, **kwargs):
+        path = "/" + url.split("/", 3)[3]
+        self.requests.append((method.upper(), path, params))
+        with open(os.path.join(FIXTURES, ROUTES[(method.upper(), path)]), encoding="utf-8") as f:
+            body = json.load(f)
+
+        if path == "/api/info/":  # only the requested submissions, like reddit does
+            ids = params["id"].split(",")
+            body["data"]["children"] = [child for child in body["data"]["children"] if child["data"]["name"] in ids]
+
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers["content-type"] = "application/json"
+        response._content = json.dumps(body).encode()
+        return response
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def session(monkeypatch):
+    session = ReplaySession()
+    reddit = praw.Reddit(client_id="id", client_secret="secret", user_agent="gem-assist tests", requestor_kwargs={"session": session})
+    monkeypatch.setattr(utility, "get_reddit", lambda: reddit)
+    monkeypatch.setattr(conf, "MAX_REDDIT_POST_COMMENTS", -1)
+    monkeypatch.setattr(conf, "REDDIT_REPLACE_MORE_LIMIT", 4)
+    return session
+
+def api_requests(session):
+    return [(method, path) for method, path, _ in session.requests if path != "/api/v1/access_token"]
+
+def test_get_reddit_posts_is_one_request(session):
+    posts = utility.get_reddit_posts(["abc123", "t3_def456", "missing"])
+
+    assert [post["submission_id"] for post in posts] == ["abc123", "def456"]
+    assert posts[0]["subreddit_name"] == "Python" and posts[0]["num_comments"] == 7
+    assert posts[1]["text"] == "https://example.com/project"
+    assert api_requests(session) == [("GET", "/api/info/")]
+    assert session.requests[-1][2]["id"] == "t3_abc123,t3_def456,t3_missing"
+
+def test_get_reddit_post(session):
+    assert utility.get_reddit_post("abc123")["title"] == "Is the GIL going away?"
+    assert utility.get_reddit_post("missing") == "Submission not found/Invalid ID"
+    assert api_requests(session) == [("GET", "/api/info/")] * 2
+
+def test_reddit_search_reads_listing_only(session):
+    results = utility.reddit_search("python", "top", "gil")
+
+    assert [result["submission_id"] for result in results] == ["abc123", "def456"]
+    assert results[0]["score"] == 420
+    assert api_requests(session) == [("GET", "/r/python/search/")]
+
+def test_comments_sorted_by_score(session):
+    comments = utility.reddit_submission_comments("abc123")
+
+    assert [comment["score"] for comment in comments] == [100, 50, 40, 10, 5, 1, -3]
+    assert comments[2]["depth"] == 2
+    assert comments[3]["author"] == "[deleted]"
+    assert api_requests(session) == [("GET", "/comments/abc123/"), ("POST", "/api/morechildren/")]
+
+def test_comments_replace_more_budget(session, monkeypatch):
+    monkeypatch.setattr(conf, "REDDIT_REPLACE_MORE_LIMIT", 0)
+    comments = utility.reddit_submission_comments("abc123")
+
+    assert [comment["score"] for comment in comments] == [50, 40, 10, 5, -3]
+    assert api_requests(session) == [("GET", "/comments/abc123/")]
+
+def test_comments_filters(session):
+    assert [c["score"] for c in utility.reddit_submission_comments("abc123", max_depth=0)] == [100, 50, 10, 1, -3]
+    # a skipped comment hides its replies too
+    assert [c["score"] for c in utility.reddit_submission_comments("abc123", min_score=10)] == [100, 50, 10]
+
+def test_reddit_client_per_thread(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    monkeypatch.setattr(utility, "_reddit_clients", threading.local())
+    monkeypatch.setenv("REDDIT_ID", "id")
+    monkeypatch.setenv("REDDIT_SECRET", "secret")
+    client = utility.get_reddit()
+    assert utility.get_reddit() is client
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        other = pool.submit(utility.get_reddit).result()
+    assert other is not client  # praw.Reddit is not thread safe
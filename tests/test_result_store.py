@@ -0,0 +1,69 @@
+import pytest
+from gem.result_store import ResultStore, ResultNotFound
+
+@pytest.fixture(params=["memory", "disk"])
+def store(request, tmp_path):
+    return ResultStore(str(tmp_path) if request.param == "disk" else None)
+
+def test_put_and_get(store):
+    content = "".join(str(i % 10) for i in range(10_000)) + "ünïcödé"
+    handle = store.put("read_file", content)
+
+    assert handle.startswith("read_file-")
+    assert store.size(handle) == len(content)
+    assert store.get(handle) == content
+    assert store.get(handle, 10, 5) == content[10:15]
+    assert store.get(handle, len(content) - 7, 100) == "ünïcödé" # offsets are characters
+    assert store.get(handle, len(content) + 10, 5) == ""
+
+def test_missing_handle(store):
+    with pytest.raises(ResultNotFound):
+        store.get("read_file-missing")
+    with pytest.raises(ResultNotFound):
+        store.size("read_file-missing")
+
+def test_spill(store):
+    content = "a" * 100 + "b" * 900
+    message = store.spill("list_dir", content, preview_chars=100)
+
+    assert message.startswith("a" * 100 + "\n")
+    assert "b" not in message.split("\n")[0]
+    assert "showing the first 100 of 1000 characters" in message
+    handle = message.split("handle '")[1].split("'")[0]
+    assert store.get(handle, 100) == "b" * 900
+
+def test_assistant_spills_long_tool_outputs(assistant_config, tmp_path, monkeypatch):
+    import re
+    import assistant
+    import utility
+
+    store = ResultStore(str(tmp_path / "results"))
+    monkeypatch.setattr(assistant, "RESULT_STORE", store)
+    monkeypatch.setattr(utility, "RESULT_STORE", store)
+    monkeypatch.setattr(assistant_config, "TOOL_RESULT_MAX_CHARS", 1000)
+    monkeypatch.setattr(assistant_config, "TOOL_RESULT_PREVIEW_CHARS", 100)
+    monkeypatch.setattr(assistant_config, "TOOL_RESULT_MAX_CHARS_PER_TOOL", {"read_file": 5000, "get_website_text_content": None})
+    session = assistant.Assistant("openai/test")
+    content = "".join(str(i % 10) for i in range(3000))
+
+    session.add_toolcall_output("call_0", "list_dir", content[:1000])  # at the threshold
+    session.add_toolcall_output("call_1", "read_file", content)  # under its own threshold
+    session.add_toolcall_output("call_2", "get_website_text_content", content * 10)  # never cut short
+    assert [message["content"] for message in session.messages] == [content[:1000], content, content * 10]
+
+    session.add_toolcall_output("call_3", "list_dir", content)
+    spilled = session.messages[-1]["content"]
+    assert spilled.startswith(content[:100] + "\n\n[Output too long: showing the first 100 of 3000 characters")
+    handle = re.search(r"handle='([^']+)'", spilled).group(1)
+
+    # the model pages the rest back with read_tool_result
+    rest = ""
+    offset = 100
+    while True:
+        page = utility.read_tool_result(handle, offset, 1000)
+        text, _, footer = page.rpartition("\n\n")
+        rest += text
+        if "end of output" in footer:
+            break
+        offset = int(re.search(r"offset=(\d+)", footer).group(1))
+    assert content[:100] + rest == content
@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+import config as conf
+import utility
+
+class FakeBackend:
+    """Search backend returning two results per query, one of them shared by every query."""
+
+    def __init__(self, delay=0.0, failing=()):
+        self.delay = delay
+        self.failing = failing
+        self.queries = []
+        self.lock = threading.Lock()
+
+    def __call__(self, query, max_results):
+        with self.lock:
+            self.queries.append(query)
+        time.sleep(self.delay)
+        if query in self.failing:
+            raise RuntimeError("rate limited")
+        slug = query.replace(" ", "-")
+        return [
+            {"title": query, "href": f"https://example.com/{slug}", "body": "..."},
+            {"title": "Shared", "href": "https://example.com/shared", "body": "..."},
+        ][:max_results]
+
+@pytest.fixture
+def backend(monkeypatch, tmp_path):
+    backend = FakeBackend()
+    monkeypatch.setattr(utility, "SEARCH_BACKEND", backend)
+    monkeypatch.setattr(utility, "_search_cache", None)
+    monkeypatch.setattr(conf, "DUCKDUCKGO_CACHE_PATH", str(tmp_path / "search.sqlite"))
+    monkeypatch.setattr(conf, "DUCKDUCKGO_CACHE_TTL", 60)
+    return backend
+
+def test_search_is_cached_by_normalized_query(backend):
+    first = utility.duckduckgo_search_tool("Python  GIL")
+    second = utility.duckduckgo_search_tool("python gil ")
+    assert first == second
+    assert backend.queries == ["Python  GIL"]
+
+def test_cache_disabled(backend, monkeypatch):
+    monkeypatch.setattr(conf, "DUCKDUCKGO_CACHE_TTL", None)
+    utility.duckduckgo_search_tool("a")
+    utility.duckduckgo_search_tool("a")
+    assert backend.queries == ["a", "a"]
+
+def test_search_many_dedupes_results(backend):
+    result = utility.duckduckgo_search_many(["a", "b", "A"])
+
+    urls = [item["href"] for item in result["results"]]
+    assert urls == ["https://example.com/a", "https://example.com/shared", "https://example.com/b"]
+    assert result["results"][1]["queries"] == ["a", "b"]
+    assert sorted(backend.queries) == ["a", "b"]
+    assert result["errors"] == {}
+
+def test_search_many_runs_concurrently(backend, monkeypatch):
+    monkeypatch.setattr(conf, "DUCKDUCKGO_MAX_CONCURRENT_SEARCHES", 4)
+    backend.delay = 0.2
+    start = time.perf_counter()
+    utility.duckduckgo_search_many(["a", "b", "c", "d"])
+    assert time.perf_counter() - start < 0.6
+
+def test_search_many_partial_errors(backend):
+    backend.failing = ("b",)
+    result = utility.duckduckgo_search_many(["a", "b"])
+    assert result["errors"] == {"b": "rate limited"}
+    assert len(result["results"]) == 2
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# only imported the first time a tool that needs them is called
+HEAVY_TOOL_MODULES = {"praw", "duckduckgo_search", "wikipedia", "pypdl", "bs4", "psutil", "thefuzz"}
+
+# cumulative import time of `utility` in microseconds, it was ~0.9s before the tool dependencies were made lazy
+UTILITY_IMPORT_BUDGET = 600_000
+
+def import_times(module: str) -> dict[str, int]:
+    """Cumulative import time in microseconds of every module loaded by `import module`, from `python -X importtime`."""
+    env = {key: value for key, value in os.environ.items() if key not in ("REDDIT_ID", "REDDIT_SECRET")}
+    env["LITELLM_LOCAL_MODEL_COST_MAP"] = "True" # don't let litellm fetch its model list from the network
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+def test_assistant_startup_budget():
+    times = import_times("assistant")
+
+    loaded = sorted(name for name in times if name.split(".")[0] in HEAVY_TOOL_MODULES)
+    assert loaded == [], f"heavy tool dependencies imported at startup: {loaded}"
+    assert times["utility"] < UTILITY_IMPORT_BUDGET, f"importing utility took {times['utility'] / 1000:.0f}ms"
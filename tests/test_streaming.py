@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+from gem.streaming import StreamStats, collect_stream
+
+def make_chunk(content=None, tool_calls=None, usage=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=usage)
+
+def test_collect_stream_content():
+    chunks = [make_chunk("Hel"), make_chunk("lo "), make_chunk("world")]
+    received = []
+
+    collected, stats = collect_stream(iter(chunks), received.append)
+
+    assert collected == chunks
+    assert received == ["Hel", "Hello ", "Hello world"] # always the full text so far
+    assert stats.time_to_first_token is not None
+    assert stats.duration >= stats.time_to_first_token
+
+def test_collect_stream_tool_calls_only():
+    chunks = [make_chunk(tool_calls=[SimpleNamespace(index=0)]), make_chunk()]
+    received = []
+
+    _, stats = collect_stream(iter(chunks), received.append)
+
+    assert received == []
+    assert stats.time_to_first_token is not None
+
+def test_collect_stream_usage():
+    chunks = [make_chunk("Hi"), SimpleNamespace(choices=[], usage=SimpleNamespace(completion_tokens=7))]
+    _, stats = collect_stream(iter(chunks))
+    assert stats.completion_tokens == 7
+
+def test_tokens_per_second():
+    stats = StreamStats(time_to_first_token=0.5, duration=2.5, completion_tokens=40)
+    assert stats.tokens_per_second == 20.0
+    assert StreamStats().tokens_per_second == 0.0
+
+def test_live_markdown_parses_on_render_only(monkeypatch):
+    import rich.markdown
+    from rich.console import Console
+    from gem.streaming import LiveMarkdown
+
+    parsed = []
+    original = rich.markdown.Markdown.__init__
+    def counting_init(self, markup, *args, **kwargs):
+        parsed.append(markup)
+        original(self, markup, *args, **kwargs)
+    monkeypatch.setattr(rich.markdown.Markdown, "__init__", counting_init)
+
+    markdown = LiveMarkdown()
+    for delta in ["# Ti", "tle\n", "some ", "**bold**"]:
+        markdown.text += delta
+    assert parsed == []
+
+    console = Console(record=True, width=40)
+    console.print(markdown)
+    console.print(markdown)  # unchanged text isn't parsed again
+    assert parsed == ["# Title\nsome **bold**"]
+    assert "bold" in console.export_text()
+
+def search(query: str) -> str:
+    """
+    Searches something.
+
+    Args:
+        query: What to search.
+    """
+    return f"results for {query}"
+
+def test_assistant_streams_tool_calls_and_text(assistant_config, monkeypatch):
+    import assistant
+    from litellm.types.utils import ChatCompletionDeltaToolCall, Delta, Function, ModelResponseStream, StreamingChoices
+    from tests.llm_fakes import tool_outputs
+
+    def stream_chunk(**delta):
+        return ModelResponseStream(id="c1", model="gpt-4o-mini", choices=[StreamingChoices(index=0, delta=Delta(**delta))])
+
+    def tool_call(index, id=None, name=None, arguments=""):
+        return ChatCompletionDeltaToolCall(index=index, id=id, type="function" if id else None, function=Function(name=name, arguments=arguments))
+
+    streams = [
+        # the arguments of the first call are split over three chunks, the second call starts in between
+        [
+            stream_chunk(role="assistant", tool_calls=[tool_call(0, "call_1", "search", '{"que')]),
+            stream_chunk(tool_calls=[tool_call(0, arguments='ry": "ca')]),
+            stream_chunk(tool_calls=[tool_call(1, "call_2", "search", '{"query": "dogs"}')]),
+            stream_chunk(tool_calls=[tool_call(0, arguments='ts"}')]),
+        ],
+        [stream_chunk(role="assistant", content="Cats "), stream_chunk(content="and "), stream_chunk(content="dogs.")],
+    ]
+    def completion(stream=False, **params):
+        assert stream
+        return iter(streams.pop(0))
+    monkeypatch.setattr(assistant.litellm, "completion", completion)
+    monkeypatch.setattr(assistant_config, "STREAM_REFRESH_PER_SECOND", 1000)
+
+    session = assistant.Assistant("openai/gpt-4o-mini", tools=[search], stream=True)
+    reply = session.send_message("cats and dogs?")
+
+    assert reply.content == "Cats and dogs."
+    assert tool_outputs(session) == [("call_1", "results for cats"), ("call_2", "results for dogs")]
+    assert session.last_turn_report.steps == 2 and session.last_turn_report.completion_tokens > 0
+    stats = session.last_stream_stats
+    assert stats.time_to_first_token is not None and stats.completion_tokens > 0
@@ -0,0 +1,56 @@
+import threading
+import time
+from gem.tool_executor import ToolExecutor, parallel_safe, is_parallel_safe
+
+def test_parallel_safe_decorator():
+    @parallel_safe
+    def read_tool():
+        pass
+
+    def write_tool():
+        pass
+
+    assert is_parallel_safe(read_tool)
+    assert not is_parallel_safe(write_tool)
+    assert not is_parallel_safe(None) # unknown tools are serialized
+
+def test_results_keep_original_order():
+    executor = ToolExecutor(max_workers=4)
+    calls = [("read", 0.05), ("read", 0.0), ("write", 0.0), ("read", 0.02), ("read", 0.0)]
+
+    def execute(call):
+        time.sleep(call[1])
+        return call
+
+    results = executor.run(calls, execute, lambda call: call[0] == "read")
+    assert results == calls
+
+def test_parallel_calls_run_concurrently():
+    executor = ToolExecutor(max_workers=4)
+    calls = list(range(4))
+
+    start = time.perf_counter()
+    executor.run(calls, lambda call: time.sleep(0.2), lambda call: True)
+    assert time.perf_counter() - start < 0.6
+
+def test_serial_calls_are_barriers():
+    executor = ToolExecutor(max_workers=4)
+    events = []
+    lock = threading.Lock()
+    calls = ["read1", "read2", "write", "read3"]
+
+    def execute(call):
+        time.sleep(0.05 if call == "read1" else 0)
+        with lock:
+            events.append(call)
+
+    executor.run(calls, execute, lambda call: call.startswith("read"))
+    # every read issued before the write finished before it, reads after it started after it
+    assert events.index("write") == 2
+    assert events[-1] == "read3"
+
+def test_single_worker_runs_serially():
+    executor = ToolExecutor(max_workers=1)
+    threads = set()
+    executor.run([1, 2, 3], lambda call: threads.add(threading.get_ident()), lambda call: True)
+    assert threads == {threading.get_ident()}
@@ -0,0 +1,115 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+import assistant
+from gem.turn import TurnLimits, TurnReport
+from tests.llm_fakes import scripted, tool_call_ids, tool_outputs
+from tests import llm_fakes
+
+def make_response(prompt_tokens, completion_tokens):
+    return SimpleNamespace(usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens))
+
+def test_add_step():
+    report = TurnReport()
+    report.add_step(make_response(100, 20), 0.5)
+    report.add_step(make_response(150, 30), 0.25)
+    report.add_step(SimpleNamespace(usage=None), 0.25) # providers without usage
+
+    assert report.steps == 3
+    assert report.llm_time == 1.0
+    assert report.prompt_tokens == 250
+    assert report.completion_tokens == 50
+    assert report.total_tokens == 300
+
+def test_no_limits():
+    report = TurnReport(steps=1000, prompt_tokens=10**9)
+    assert report.exceeded(TurnLimits()) is None
+
+def test_max_steps():
+    limits = TurnLimits(max_steps=2)
+    report = TurnReport(steps=1)
+    assert report.exceeded(limits) is None
+    report.steps = 2
+    assert report.exceeded(limits) == "max_steps"
+
+def test_timeout():
+    report = TurnReport()
+    report.started_at -= 10
+    assert report.exceeded(TurnLimits(timeout=5)) == "timeout"
+    assert report.exceeded(TurnLimits(timeout=60)) is None
+
+def test_token_budget():
+    report = TurnReport(prompt_tokens=900, completion_tokens=100)
+    assert report.exceeded(TurnLimits(token_budget=1000)) == "token_budget"
+    assert report.exceeded(TurnLimits(token_budget=1001)) is None
+
+def search(query: str) -> str:
+    """
+    Searches something.
+
+    Args:
+        query: What to search.
+    """
+    return f"results for {query}"
+
+def slow_search(query: str) -> str:
+    """
+    Searches something slowly.
+
+    Args:
+        query: What to search.
+    """
+    time.sleep(0.05)
+    return f"results for {query}"
+
+def endless(tools=("search",), usage=None):
+    """Responses asking for two tool calls, forever."""
+    return scripted(*[llm_fakes.make_response(tool_calls=[(name, {"query": "x"}) for name in tools * 2], usage=usage) for _ in range(10)])
+
+def run_turn(monkeypatch, completion, limits, tools=(search,)):
+    monkeypatch.setattr(assistant.litellm, "completion", completion)
+    session = assistant.Assistant("openai/test", tools=list(tools), limits=limits)
+    session.send_message("go")
+    return session
+
+@pytest.mark.usefixtures("assistant_config")
+def test_assistant_max_steps(monkeypatch):
+    completion = endless()
+    session = run_turn(monkeypatch, completion, TurnLimits(max_steps=2))
+
+    assert len(completion.calls) == 2
+    assert session.last_turn_report.stop_reason == "max_steps"
+    outputs = tool_outputs(session)
+    # every tool call has an output, the ones of the last step were not run
+    assert [tool_call_id for tool_call_id, _ in outputs] == tool_call_ids(session)
+    assert [content for _, content in outputs] == ["results for x"] * 2 + ["Not executed, the turn was stopped: max_steps"] * 2
+
+@pytest.mark.usefixtures("assistant_config")
+def test_assistant_timeout(monkeypatch):
+    completion = endless(tools=("slow_search",))
+    session = run_turn(monkeypatch, completion, TurnLimits(timeout=0.01), tools=(slow_search,))
+
+    assert len(completion.calls) == 2  # the first tool calls took longer than the whole turn can
+    assert session.last_turn_report.stop_reason == "timeout"
+    assert [tool_call_id for tool_call_id, _ in tool_outputs(session)] == tool_call_ids(session)
+    assert tool_outputs(session)[-1][1] == "Not executed, the turn was stopped: timeout"
+
+@pytest.mark.usefixtures("assistant_config")
+def test_assistant_token_budget(monkeypatch):
+    completion = endless(usage=(400, 100))
+    session = run_turn(monkeypatch, completion, TurnLimits(token_budget=1000))
+
+    assert len(completion.calls) == 2
+    assert session.last_turn_report.stop_reason == "token_budget"
+    assert session.last_turn_report.total_tokens == 1000
+    assert [tool_call_id for tool_call_id, _ in tool_outputs(session)] == tool_call_ids(session)
+
+@pytest.mark.usefixtures("assistant_config")
+def test_assistant_turn_completes(monkeypatch):
+    completion = scripted(llm_fakes.make_response(tool_calls=[("search", {"query": "x"})]), llm_fakes.make_response("found it"))
+    session = run_turn(monkeypatch, completion, TurnLimits(max_steps=2))
+
+    assert session.messages[-1].content == "found it"
+    assert session.last_turn_report.stop_reason == "completed"
+    assert tool_outputs(session) == [("call_0", "results for x")]
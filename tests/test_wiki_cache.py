@@ -0,0 +1,147 @@
+import threading
+import time
+
+import pytest
+import config as conf
+import utility
+from gem.cache import DiskCache
+from gem.wiki_cache import WikiPageCache
+
+class FakeBackend:
+    """Backend with in memory pages, `Python` redirects to `Python (programming language)`."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.revisions = {"Python (programming language)": 1, "Rust": 7}
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __record(self, *call):
+        with self.lock:
+            self.calls.append(call)
+        time.sleep(self.delay)
+
+    def __title(self, name):
+        name = name.replace("_", " ")
+        name = {"python": "Python (programming language)"}.get(name.lower(), name)
+        for title in self.revisions:
+            if title.lower() == name.lower():
+                return title
+        raise LookupError(f'Page id "{name}" does not match any pages')
+
+    def resolve(self, name):
+        self.__record("resolve", name)
+        title = self.__title(name)
+        return title, self.revisions[title]
+
+    def fetch(self, title):
+        self.__record("fetch", title)
+        revision = self.revisions[title]
+        return {
+            "title": title,
+            "url": f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}",
+            "revision": revision,
+            "summary": f"{title} summary r{revision}",
+            "content": f"{title} content r{revision}",
+        }
+
+    def search(self, query):
+        self.__record("search", query)
+        return [title for title in self.revisions if query.lower() in title.lower()]
+
+def test_pages_are_cached_by_title_and_revision():
+    backend = FakeBackend()
+    cache = WikiPageCache(backend, DiskCache(":memory:"), ttl=60)
+
+    assert cache.page("Python")["summary"] == "Python (programming language) summary r1"
+    assert cache.page("python")["title"] == "Python (programming language)"
+    assert cache.page("python (programming_language)")["revision"] == 1
+    assert [call[0] for call in backend.calls] == ["resolve", "fetch", "resolve"]  # the last name resolved to a cached page
+
+def test_expired_name_only_refetches_new_revisions():
+    backend = FakeBackend()
+    cache = WikiPageCache(backend, DiskCache(":memory:"), ttl=0.05)
+    cache.page("Rust")
+
+    time.sleep(0.1)
+    cache.page("Rust")
+    assert [call[0] for call in backend.calls] == ["resolve", "fetch", "resolve"]
+
+    time.sleep(0.1)
+    backend.revisions["Rust"] = 8
+    assert cache.page("Rust")["content"] == "Rust content r8"
+    assert [call[0] for call in backend.calls][-2:] == ["resolve", "fetch"]
+
+def test_search_is_cached():
+    backend = FakeBackend()
+    cache = WikiPageCache(backend, DiskCache(":memory:"), ttl=60)
+    assert cache.search("rust") == cache.search("Rust ") == ["Rust"]
+    assert len(backend.calls) == 1
+
+def test_no_cache():
+    backend = FakeBackend()
+    cache = WikiPageCache(backend, None)
+    cache.page("Rust")
+    cache.page("Rust")
+    assert len(backend.calls) == 4
+
+@pytest.fixture
+def backend(monkeypatch, tmp_path):
+    backend = FakeBackend()
+    cache = WikiPageCache(backend, DiskCache(str(tmp_path / "wikipedia.sqlite")), ttl=conf.WIKIPEDIA_CACHE_TTL)
+    monkeypatch.setattr(utility, "_wikipedia_cache", cache)
+    monkeypatch.setattr(conf, "WIKIPEDIA_MAX_CONCURRENT_REQUESTS", 4)
+    return backend
+
+def test_get_wikipedia_summaries_partial_results(backend):
+    result = utility.get_wikipedia_summaries(["Python", "https://en.wikipedia.org/wiki/Rust", "Nope"])
+
+    assert result["summaries"]["Python"]["summary"] == "Python (programming language) summary r1"
+    assert result["summaries"]["https://en.wikipedia.org/wiki/Rust"]["title"] == "Rust"
+    assert list(result["errors"]) == ["Nope"]
+
+def test_get_wikipedia_summaries_is_concurrent(backend):
+    backend.delay = 0.1
+    start = time.perf_counter()
+    utility.get_wikipedia_summaries(["Python", "Rust"])
+    assert time.perf_counter() - start < 0.35  # two requests per page, 0.4s one page after another
+
+def test_wikipedia_tools_share_the_cache(backend):
+    utility.get_wikipedia_summary("Rust")
+    assert utility.get_full_wikipedia_page("rust").endswith("Rust content r7")
+    assert [call[0] for call in backend.calls] == ["resolve", "fetch"]
+
+def test_wikipedia_backend_resolve_is_one_request(monkeypatch):
+    import json
+    import requests
+    import wikipedia
+    from gem.wiki_cache import WIKIPEDIA_API_URL, WikipediaBackend
+
+    class Session:
+        def __init__(self):
+            self.requests = []
+
+        def get(self, url, params, timeout):
+            assert url == WIKIPEDIA_API_URL and timeout == 5
+            self.requests.append(params["titles"])
+            if params["titles"] != "Python":
+                body = {"query": {"pages": {"-1": {"title": params["titles"], "missing": ""}}}}
+            else:
+                body = {"query": {
+                    "redirects": [{"from": "Python", "to": "Python (programming language)"}],
+                    "pages": {"23862": {"title": "Python (programming language)", "revisions": [{"revid": 5, "parentid": 4}]}},
+                }}
+            response = requests.Response()
+            response.status_code = 200
+            response._content = json.dumps(body).encode()
+            return response
+
+    session = Session()
+    backend = WikipediaBackend(session, timeout=5)
+    monkeypatch.setattr(wikipedia, "search", lambda query, results, suggestion: (["Python"] if query == "Pyhton" else [], None))
+
+    assert backend.resolve("Python") == ("Python (programming language)", 5)
+    assert session.requests == ["Python"]
+    assert backend.resolve("Pyhton") == ("Python (programming language)", 5)  # through the search suggestion
+    with pytest.raises(wikipedia.PageError):
+        backend.resolve("Nothing like it")
@@ -7,22 +7,19 @@ import webbrowser
 import shutil
 import zipfile
 
+import sqlite3
+import threading
 import requests
-from bs4 import BeautifulSoup
-import psutil
-import thefuzz.process
 import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 
-import praw
-from praw.reddit import Comment
-import duckduckgo_search
+# Heavy tool dependencies (praw, duckduckgo_search, wikipedia, pypdl, bs4, psutil, thefuzz) are imported
+# inside the tools that use them, so they are only loaded the first time one of those tools is called
 from dotenv import load_dotenv
 import colorama
 from colorama import Fore, Style
 from pydantic import BaseModel, Field
-from pypdl import Pypdl
-import thefuzz
-import wikipedia
 
 from rich.console import Console
 from rich.live import Live
@@ -34,6 +31,14 @@ import time
 import config as conf
 from gem import seconds_to_hms, bytes_to_mb, format_size
 from gem.inspection import inspect_script, get_func_source_code
+from gem.tool_executor import parallel_safe
+from gem.result_store import ResultStore, ResultNotFound
+from gem.cache import DiskCache, make_key
+from gem.http_cache import HttpCache, read_body
+from gem.wiki_cache import WikiPageCache, WikipediaBackend
+from gem.fs import DirectorySizer, LineIndex, read_window, walk, walk_key, write_atomic
+from gem.file_index import FileIndex
+from gem.content_search import search_files
 
 load_dotenv()
 
@@ -42,12 +47,131 @@ DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.
 # Initialize colorama
 colorama.init(autoreset=True)
 
-# init reddit
-reddit = praw.Reddit(
-    client_id=os.getenv("REDDIT_ID"),
-    client_secret=os.getenv("REDDIT_SECRET"),
-    user_agent="PersonalBot/1.0",
-)
+# big tool outputs are saved here instead of the conversation, see `read_tool_result`
+RESULT_STORE = ResultStore(conf.TOOL_RESULT_STORE_DIR)
+
+# directory sizes are cached per directory for the whole session, see `gem.fs.DirectorySizer`
+DIRECTORY_SIZER = DirectorySizer(conf.DIRECTORY_SIZE_WORKERS)
+
+# line offsets of recently read files, see `gem.fs.LineIndex`
+LINE_INDEX = LineIndex(conf.LINE_INDEX_MAX_FILES)
+
+# index of the paths of searched directories, created on first use by `get_file_index`
+_file_index = None
+_file_index_lock = threading.Lock()
+
+def get_file_index() -> FileIndex | None:
+    """Returns the file index (None if disabled in the config), creating it the first time."""
+    global _file_index
+    if conf.FILE_INDEX_PATH is None:
+        return None
+    with _file_index_lock:
+        if _file_index is None:
+            _file_index = FileIndex(conf.FILE_INDEX_PATH, conf.FILE_INDEX_WORKERS, conf.FILE_INDEX_REFRESH_INTERVAL)
+    return _file_index
+
+def mark_file_index_dirty(paths: list[str], recursive: bool = False):
+    """Tells the file index (if it's used) that tools changed these paths, see `FileIndex.mark_dirty`."""
+    if _file_index is not None:
+        _file_index.mark_dirty(paths, recursive)
+
+# reddit clients, one per thread since `praw.Reddit` is not thread safe and the reddit tools run
+# concurrently on the tool executor threads, created on first use by `get_reddit`
+_reddit_clients = threading.local()
+
+def get_reddit():
+    """Returns the reddit client of the calling thread, creating it the first time."""
+    reddit = getattr(_reddit_clients, "reddit", None)
+    if reddit is None:
+        import praw
+        reddit = praw.Reddit(
+            client_id=os.getenv("REDDIT_ID"),
+            client_secret=os.getenv("REDDIT_SECRET"),
+            user_agent="PersonalBot/1.0",
+        )
+        _reddit_clients.reddit = reddit
+    return reddit
+
+# shared http session, created on first use by `get_http_session`
+_http_session = None
+_http_session_lock = threading.Lock()
+HTTP_TIMEOUT = (conf.HTTP_CONNECT_TIMEOUT, conf.HTTP_READ_TIMEOUT)
+
+def get_http_session() -> requests.Session:
+    """
+    Returns the http session shared by the web tools, creating it the first time.
+    It keeps connections alive between requests to the same host and retries failed requests with backoff.
+    It has no default timeout, pass `timeout=HTTP_TIMEOUT` to every request.
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            retry = Retry(
+                total=conf.HTTP_RETRIES,
+                backoff_factor=conf.HTTP_RETRY_BACKOFF,
+                status_forcelist=(500, 502, 503, 504),
+                raise_on_status=False, # the last response is returned and handled by `raise_for_status`
+            )
+            adapter = HTTPAdapter(pool_connections=conf.HTTP_POOL_SIZE, pool_maxsize=conf.HTTP_POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = DEFAULT_USER_AGENT
+            _http_session = session
+    return _http_session
+
+# cache of GET responses, created on first use by `get_http_cache`
+_http_cache = None
+
+def get_http_cache() -> HttpCache | None:
+    """Returns the http cache shared by the web tools (None if disabled in the config), creating it the first time."""
+    global _http_cache
+    if conf.HTTP_CACHE_PATH is None:
+        return None
+    session = get_http_session()
+    with _http_session_lock:
+        if _http_cache is None:
+            _http_cache = HttpCache(
+                session,
+                DiskCache(conf.HTTP_CACHE_PATH, max_bytes=conf.HTTP_CACHE_MAX_BYTES),
+                heuristic_ttl=conf.HTTP_CACHE_HEURISTIC_TTL,
+            )
+    return _http_cache
+
+def http_get(url: str, headers: dict | None = None, max_bytes: int | None = None, stop_on_binary: bool = False) -> requests.Response:
+    """GET request through the shared session and http cache, the body is read with `gem.http_cache.read_body`."""
+    cache = get_http_cache()
+    if cache is None:
+        response = get_http_session().get(url, headers=headers, timeout=HTTP_TIMEOUT, stream=True)
+        response.from_cache = False
+        return read_body(response, max_bytes, stop_on_binary)
+    return cache.get(url, headers=headers, max_bytes=max_bytes, stop_on_binary=stop_on_binary, timeout=HTTP_TIMEOUT)
+
+def http_response_to_dict(response: requests.Response) -> dict:
+    """What the http tools return, the body is only decoded if it's text."""
+    content_length = response.headers.get("Content-Length")
+    if not response.truncated:
+        content_length = len(response.content)
+    elif content_length is not None and content_length.isdigit():
+        content_length = int(content_length)
+
+    if response.binary:
+        content_type = response.headers.get("Content-Type", "unknown type")
+        body = f"[Binary content ({content_type}, {format_size(content_length)}) not shown]"
+    else:
+        body = response.content.decode(response.encoding or "utf-8", errors="replace")
+        if response.truncated:
+            body += f"\n[... response cut short after {len(response.content)} bytes ...]"
+
+    return {
+        "status": response.status_code,
+        "headers": dict(response.headers),
+        "content_length": content_length,
+        "truncated": response.truncated,
+        "body": body,
+    }
 
 def tool_message_print(msg: str, args: list[tuple[str, str]] = None):
     """
@@ -76,6 +200,52 @@ def tool_report_print(msg: str, value: str, is_error: bool = False):
     full_msasage = f"{Fore.CYAN}  ├─{Style.RESET_ALL} {msg} {value_color}{value}"
     print(full_msasage)
 
+# one duckduckgo client per thread, reused between searches
+_ddgs = threading.local()
+
+def duckduckgo_text_search(query: str, max_results: int) -> list[dict]:
+    """The default `SEARCH_BACKEND`, searches duckduckgo."""
+    if not hasattr(_ddgs, "client"):
+        import duckduckgo_search
+        _ddgs.client = duckduckgo_search.DDGS(timeout=conf.DUCKDUCKGO_TIMEOUT)
+    return _ddgs.client.text(query, max_results=max_results)
+
+# function used by the search tools, takes a query and the max amount of results and returns
+# a list of results (dicts with "title", "href" and "body"), can be replaced for example in tests
+SEARCH_BACKEND = duckduckgo_text_search
+
+# cache of search results, created on first use by `get_search_cache`
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+def get_search_cache() -> DiskCache | None:
+    """Returns the search results cache (None if disabled in the config), creating it the first time."""
+    global _search_cache
+    if conf.DUCKDUCKGO_CACHE_TTL is None:
+        return None
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = DiskCache(conf.DUCKDUCKGO_CACHE_PATH)
+    return _search_cache
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+def search(query: str) -> list[dict]:
+    """Searches with `SEARCH_BACKEND`, results are cached by normalized query for `DUCKDUCKGO_CACHE_TTL` seconds."""
+    cache = get_search_cache()
+    key = make_key("search", normalize_query(query), conf.MAX_DUCKDUCKGO_SEARCH_RESULTS)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return json.loads(cached)
+
+    results = SEARCH_BACKEND(query, conf.MAX_DUCKDUCKGO_SEARCH_RESULTS)
+    if cache is not None:
+        cache.set(key, json.dumps(results).encode(), ttl=conf.DUCKDUCKGO_CACHE_TTL)
+    return results
+
+@parallel_safe
 def duckduckgo_search_tool(query: str) -> list:
     """
     Searches DuckDuckGo for the given query and returns a list of results.
@@ -88,14 +258,60 @@ def duckduckgo_search_tool(query: str) -> list:
     """
     tool_message_print("duckduckgo_search_tool", [("query", query)])
     try:
-        
-        ddgs = duckduckgo_search.DDGS(timeout=conf.DUCKDUCKGO_TIMEOUT)
-        results = ddgs.text(query, max_results=conf.MAX_DUCKDUCKGO_SEARCH_RESULTS)
-        return results
+        return search(query)
     except Exception as e:
         tool_report_print("Error during DuckDuckGo search:", str(e), is_error=True)
         return f"Error during DuckDuckGo search: {e}"
 
+@parallel_safe
+def duckduckgo_search_many(queries: list[str]) -> dict:
+    """
+    Searches DuckDuckGo for multiple queries at the same time, use this instead of calling `duckduckgo_search_tool` multiple times.
+    Results found by more than one query are only returned once.
+
+    Args:
+        queries: The search queries.
+
+    Returns:
+        dict: The results (each with the queries that found it) and the error of every query that failed.
+    """
+    tool_message_print("duckduckgo_search_many", [("queries", ", ".join(queries))])
+    # queries that only differ by case or spacing are searched once
+    unique_queries = {}
+    for query in queries:
+        unique_queries.setdefault(normalize_query(query), query)
+    unique_queries = list(unique_queries.values())
+
+    def run(query: str) -> list[dict] | Exception:
+        try:
+            return search(query)
+        except Exception as e:
+            return e
+
+    if not unique_queries:
+        return {"results": [], "errors": {}}
+    with ThreadPoolExecutor(max_workers=min(conf.DUCKDUCKGO_MAX_CONCURRENT_SEARCHES, len(unique_queries)), thread_name_prefix="search") as pool:
+        outcomes = list(pool.map(run, unique_queries))
+
+    results: dict[str, dict] = {}
+    errors = {}
+    for query, outcome in zip(unique_queries, outcomes):
+        if isinstance(outcome, Exception):
+            errors[query] = str(outcome)
+            continue
+        for result in outcome:
+            url = result.get("href") or result.get("url") or result.get("title")
+            if url in results:
+                results[url]["queries"].append(query)
+            else:
+                results[url] = {**result, "queries": [query]}
+
+    for query, error in errors.items():
+        tool_report_print(f"Error searching '{query}':", error, is_error=True)
+    tool_report_print("Status:", f"Found {len(results)} unique results for {len(unique_queries)} queries")
+    return {"results": list(results.values()), "errors": errors}
+
+@parallel_safe
 def get_current_directory() -> str:
     """
     Get the current working directory.
@@ -110,20 +326,36 @@ def get_current_directory() -> str:
         tool_report_print("Error getting current directory:", str(e), is_error=True)
         return f"Error getting current directory: {e}"
 
-def list_dir(path: str, recursive: bool, files_only: bool, dirs_only: bool) -> list:
+@parallel_safe
+def list_dir(
+    path: str,
+    recursive: bool,
+    files_only: bool,
+    dirs_only: bool,
+    max_depth: int | None = None,
+    max_items: int | None = None,
+    exclude: list[str] | None = None,
+    cursor: str | None = None,
+) -> dict:
     """
     Returns a list of contents of a directory. It can handle listing files, directories, or both,
     and can do so recursively or not.
+    Big listings are split in pages, if `next_cursor` is not null call again with `cursor=next_cursor` to get the next items.
 
     Args:
         path: The path to the directory.
         recursive: Whether to list contents recursively. If True, it will traverse subdirectories.
         files_only: Whether to list only files. If True, directories are ignored.
         dirs_only: Whether to list only directories. If True, files are ignored.
+        max_depth: When recursive, how deep to go (0 only lists the directory itself), default no limit.
+        max_items: Max amount of items to return, default 500.
+        exclude: Glob patterns of names to skip (with their contents), pass [] to list everything. Default [".git", "node_modules"] when recursive, nothing otherwise.
+        cursor: The `next_cursor` of the previous call to continue a listing, null to start.
 
     Returns:
-        list: A list of dictionaries containing information about each item in the directory.
-            Each dictionary has the keys:
+        dict: 'items' is a list of dictionaries containing information about each item in the directory,
+            'next_cursor' is the cursor of the next page or null if everything was listed.
+            Each item dictionary has the keys:
             - 'name': The name of the file or directory.
             - 'path': The full path to the file or directory.
             - 'is_dir': A boolean indicating if the item is a directory.
@@ -132,39 +364,46 @@ def list_dir(path: str, recursive: bool, files_only: bool, dirs_only: bool) -> l
             Note that it can have different behavior based on given arguments, for example if you only need files, set `files_only=True` and ignore `dirs_only` and `recursive` arguments, they won't have any effect.
     """
     tool_message_print("list_dir", [("path", path), ("recursive", str(recursive)), 
-                                   ("files_only", str(files_only)), ("dirs_only", str(dirs_only))])
-    items = []
+                                   ("files_only", str(files_only)), ("dirs_only", str(dirs_only)), ("cursor", str(cursor))])
+    if not os.path.isdir(path):
+        tool_report_print("Error listing directory:", f"Not a directory: {path}", is_error=True)
+        return f"Error listing directory: Not a directory: {path}"
+
+    max_items = max(conf.LIST_DIR_MAX_ITEMS if max_items is None else max_items, 1)
+    entries = walk(
+        path,
+        max_depth=max_depth if recursive else 0,
+        exclude=(conf.LIST_DIR_EXCLUDE if recursive else []) if exclude is None else exclude,
+        files=not dirs_only,
+        dirs=not files_only,
+        after=cursor or None,
+    )
 
-    def add_item(item_path):
-        item_info = {
-            'name': os.path.basename(item_path),
-            'path': item_path,
-            'is_dir': os.path.isdir(item_path),
-            'size': format_size(os.path.getsize(item_path)) if os.path.isfile(item_path) else 'N/A'
-        }
-        items.append(item_info)
-
-    if recursive:
-        for dirpath, dirnames, filenames in os.walk(path):
-            if not files_only:
-                for dirname in dirnames:
-                    add_item(os.path.join(dirpath, dirname))
-            if not dirs_only:
-                for filename in filenames:
-                    add_item(os.path.join(dirpath, filename))
-    else:
-        with os.scandir(path) as it:
-            for entry in it:
-                if files_only and entry.is_file():
-                    add_item(entry.path)
-                elif dirs_only and entry.is_dir():
-                    add_item(entry.path)
-                elif not files_only and not dirs_only:
-                    add_item(entry.path)
+    items = []
+    next_cursor = None
+    for entry, _ in entries:
+        if len(items) == max_items:
+            # the last returned entry, the next page starts after it even if the tree changed in between
+            last = items[-1]
+            next_cursor = walk_key(os.path.relpath(last['path'], path), last['is_dir'])
+            break
+        is_dir = entry.is_dir()
+        size = 'N/A'
+        if not is_dir:
+            try:
+                size = format_size(entry.stat().st_size) # cached by the DirEntry
+            except OSError: # broken symlink
+                pass
+        items.append({
+            'name': entry.name,
+            'path': entry.path,
+            'is_dir': is_dir,
+            'size': size
+        })
 
-    return items
+    return {"items": items, "next_cursor": next_cursor}
 
-    
+@parallel_safe
 def get_drives() -> list[dict]:
     """
     Get a list of drives on the system.
@@ -184,28 +423,33 @@ def get_drives() -> list[dict]:
     os_type = platform.system()
 
     if os_type == "Windows":
+        import pythoncom
         from wmi import WMI
-        c = WMI()
-        for drive in c.Win32_LogicalDisk():
-            drive_type_map = {
-                0: "Unknown",
-                1: "No Root Directory",
-                2: "Removable",
-                3: "Fixed",
-                4: "Network",
-                5: "Compact Disc",
-                6: "RAM Disk"
-            }
-            drives.append({
-                'OsType': "Windows",
-                'Drive': drive.DeviceID,
-                'Type': drive_type_map.get(drive.DriveType, "Unknown"),
-                'FileSystem': drive.FileSystem if drive.FileSystem else 'N/A',
-                'FreeSpace': format_size(drive.FreeSpace) if drive.FreeSpace else 'N/A',
-                'TotalSize': format_size(drive.Size) if drive.Size else 'N/A'
-            })
+        drive_type_map = {
+            0: "Unknown",
+            1: "No Root Directory",
+            2: "Removable",
+            3: "Fixed",
+            4: "Network",
+            5: "Compact Disc",
+            6: "RAM Disk"
+        }
+        # COM has to be initialized on every thread using WMI, this tool runs on the tool executor threads
+        pythoncom.CoInitialize()
+        try:
+            for drive in WMI().Win32_LogicalDisk():
+                drives.append({
+                    'OsType': "Windows",
+                    'Drive': drive.DeviceID,
+                    'Type': drive_type_map.get(drive.DriveType, "Unknown"),
+                    'FileSystem': drive.FileSystem if drive.FileSystem else 'N/A',
+                    'FreeSpace': format_size(drive.FreeSpace) if drive.FreeSpace else 'N/A',
+                    'TotalSize': format_size(drive.Size) if drive.Size else 'N/A'
+                })
+        finally:
+            pythoncom.CoUninitialize()
     elif os_type == "Linux" or os_type == "Darwin": 
-        import shutil
+        import psutil
         for partition in psutil.disk_partitions():
             try:
                 disk_usage = shutil.disk_usage(partition.mountpoint)
@@ -226,6 +470,7 @@ def get_drives() -> list[dict]:
     return drives
 
 
+@parallel_safe
 def get_directory_size(path: str) -> dict:
     """Get the size of the specified directory.
 
@@ -239,15 +484,7 @@ def get_directory_size(path: str) -> dict:
         - 'FileCount': The number of files in the directory.
     """
     tool_message_print("get_directory_size", [("path", path)])
-    total_size = 0
-    file_count = 0
-
-    for dirpath, _, filenames in os.walk(path):
-        for f in filenames:
-            fp = os.path.join(dirpath, f)
-            if os.path.isfile(fp):
-                total_size += os.path.getsize(fp)
-                file_count += 1
+    total_size, file_count = DIRECTORY_SIZER.sizes([path])[path]
 
     return {
         'TotalSize': format_size(total_size),
@@ -255,6 +492,7 @@ def get_directory_size(path: str) -> dict:
     }
 
 
+@parallel_safe
 def get_multiple_directory_size(paths: list[str]) -> list[dict]:
     """Get the size of multiple directories.
 
@@ -266,27 +504,48 @@ def get_multiple_directory_size(paths: list[str]) -> list[dict]:
         each item is the same as `get_directory_size`
     """
     tool_message_print("get_multiple_directory_size", [("paths", str(paths))])
-    return [get_directory_size(path) for path in paths]
+    # one walk for every path, paths inside other paths are not walked twice
+    sizes = DIRECTORY_SIZER.sizes(paths)
+    return [{'TotalSize': format_size(sizes[path][0]), 'FileCount': sizes[path][1]} for path in paths]
 
 
-def read_file(filepath: str) -> str:
+@parallel_safe
+def read_file(filepath: str, mode: str = "head", start: int | None = None, end: int | None = None, max_bytes: int | None = None) -> str:
     """
-    Read content from a single file, in utf-8 encoding only.
+    Read content from a single file. Big files are cut short, the output then ends (or starts for "tail") with a note
+    giving the read byte range and the size of the file, read other parts with the "tail" and "range" modes.
+    The encoding is detected, binary files are not read.
 
     Args:
       filepath: The path to the file.
+      mode: "head" reads from the start (default), "tail" reads the end (e.g. of a log), "range" reads from byte `start` to byte `end`.
+      start: First byte to read with mode="range" (default 0).
+      end: Byte after the last one to read with mode="range" (default the end of the file).
+      max_bytes: Max amount of bytes to read, can't be more than the configured limit (100 KB by default).
 
     Returns:
         str: The content of the file as a string.
     """
-    tool_message_print("read_file", [("filepath", filepath)])
+    tool_message_print("read_file", [("filepath", filepath), ("mode", mode), ("start", str(start)), ("end", str(end)),
+                                     ("max_bytes", str(max_bytes))])
+    limit = conf.READ_FILE_MAX_BYTES if max_bytes is None else min(max_bytes, conf.READ_FILE_MAX_BYTES)
     try:
-        with open(filepath, 'r', encoding="utf-8") as f:
-            return f.read()
+        window = read_window(filepath, mode, start, end, limit)
     except Exception as e:
         tool_report_print("Error reading file:", str(e), is_error=True)
         return f"Error reading file: {e}"
 
+    if window.encoding is None:
+        tool_report_print("Error reading file:", f"{filepath} is a binary file", is_error=True)
+        return f"Error reading file: '{filepath}' is a binary file ({format_size(window.size)}), it can't be read as text."
+    if not window.truncated:
+        return window.text
+
+    tool_report_print("Status:", f"Read bytes {window.start}-{window.end} of {window.size}")
+    note = f"[Truncated: showing bytes {window.start}-{window.end} of {window.size} ({format_size(window.size)}), " \
+           f"read other parts with mode=\"head\", \"tail\" or \"range\" (start/end)]"
+    return f"{note}\n{window.text}" if mode == "tail" else f"{window.text}\n{note}"
+
 def create_directory(paths: list[str]) -> bool:
     """
     Create single or multiple directories.
@@ -303,11 +562,13 @@ def create_directory(paths: list[str]) -> bool:
         for path in paths:
             os.makedirs(path, exist_ok=True)
             tool_report_print("Created ✅:", path)
+        mark_file_index_dirty(paths)
         return success
     except Exception as e:
         tool_report_print("Error creating directory:", str(e), is_error=True)
         return False
 
+@parallel_safe
 def get_file_metadata(filepath: str) -> dict:
     """
     Get metadata of a file.
@@ -344,32 +605,46 @@ class FileData(BaseModel):
 def write_files(files_data: list[FileData]) -> dict:
     """
     Write content to multiple files, supports nested directory file creation.
+    Each file is replaced in one step (never left half written), files that already have the given content are not rewritten.
     
     Args:
       files_data: A list of FileData objects containing file paths and content.
 
     Returns:
-      dict: A dictionary with file paths as keys and success status as values.
+      dict: A dictionary with file paths as keys and, as values, a dict with "status" ("written", "unchanged" or "error"),
+      "bytes" (size of the content), "seconds" (time taken) and "error" (only for errors).
     """
     tool_message_print("write_files", [("count", str(len(files_data)))])
-    results = {}
-    
-    for file_data in files_data:
+
+    # like writing them one after the other, the last content given for a path wins
+    contents = {file_data.file_path: file_data.content for file_data in files_data}
+
+    def write(file_path: str, content: str) -> dict:
+        start = time.perf_counter()
+        # same line endings as a file opened with open(..., "w")
+        data = content.replace("\n", os.linesep).encode("utf-8")
         try:
-            nested_dirs = os.path.dirname(file_data.file_path)
-            if nested_dirs:
-                os.makedirs(nested_dirs, exist_ok=True)
-
-            with open(file_data.file_path, 'w', encoding="utf-8") as f:
-                f.write(file_data.content)
-            tool_report_print("Created ✅:", file_data.file_path)
-            results[file_data.file_path] = True
+            written = write_atomic(file_path, data)
         except Exception as e:
-            tool_report_print("❌", file_data.file_path, is_error=True)
-            tool_report_print("Error writing file:", str(e), is_error=True)
-            results[file_data.file_path] = False
+            return {"status": "error", "bytes": len(data), "seconds": round(time.perf_counter() - start, 3), "error": str(e)}
+        return {"status": "written" if written else "unchanged", "bytes": len(data), "seconds": round(time.perf_counter() - start, 3)}
+
+    if not contents:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(conf.WRITE_FILES_WORKERS, len(contents)), thread_name_prefix="write-files") as pool:
+        results = dict(zip(contents, pool.map(write, contents, contents.values())))
+    mark_file_index_dirty([file_path for file_path, result in results.items() if result["status"] == "written"])
+
+    for file_path, result in results.items():
+        if result["status"] == "error":
+            tool_report_print("❌", file_path, is_error=True)
+            tool_report_print("Error writing file:", result["error"], is_error=True)
+        elif result["status"] == "written":
+            tool_report_print("Created ✅:", file_path)
+        else:
+            tool_report_print("Unchanged:", file_path)
 
-    success_count = sum(1 for success in results.values() if success)
+    success_count = sum(1 for result in results.values() if result["status"] != "error")
     total_count = len(results)
     
     tool_report_print("Summary:", f"Wrote {success_count}/{total_count} files successfully")
@@ -390,7 +665,8 @@ def copy_file(src_filepath: str, dest_filepath: str) -> bool:
     """
     tool_message_print("copy_file", [("src_filepath", src_filepath), ("dest_filepath", dest_filepath)])
     try:
-        shutil.copy2(src_filepath, dest_filepath) 
+        copied = shutil.copy2(src_filepath, dest_filepath)
+        mark_file_index_dirty([copied])
         tool_report_print("Status:", "File copied successfully")
         return True
     except Exception as e:
@@ -410,7 +686,8 @@ def move_file(src_filepath: str, dest_filepath: str) -> bool:
     """
     tool_message_print("move_file", [("src_filepath", src_filepath), ("dest_filepath", dest_filepath)])
     try:
-        shutil.move(src_filepath, dest_filepath)
+        moved = shutil.move(src_filepath, dest_filepath)
+        mark_file_index_dirty([src_filepath, moved])
         tool_report_print("Status:", "File moved successfully")
         return True
     except Exception as e:
@@ -433,6 +710,7 @@ def rename_file(filepath: str, new_filename: str) -> bool:
     new_filepath = os.path.join(directory, new_filename)
     try:
         os.rename(filepath, new_filepath)
+        mark_file_index_dirty([filepath, new_filepath])
         tool_report_print("Status:", "File renamed successfully")
         return True
     except Exception as e:
@@ -455,6 +733,7 @@ def rename_directory(path: str, new_dirname: str) -> bool:
     new_path = os.path.join(parent_dir, new_dirname)
     try:
         os.rename(path, new_path)
+        mark_file_index_dirty([path, new_path])
         tool_report_print("Status:", "Directory renamed successfully")
         return True
     except Exception as e:
@@ -462,6 +741,7 @@ def rename_directory(path: str, new_dirname: str) -> bool:
         return False
     
 
+@parallel_safe
 def evaluate_math_expression(expression: str) -> str:
     """
     Evaluate a mathematical expression.
@@ -480,6 +760,7 @@ def evaluate_math_expression(expression: str) -> str:
         tool_report_print("Error evaluating math expression:", str(e), is_error=True)
         return f"Error evaluating math expression: {e}"
 
+@parallel_safe
 def get_current_datetime() -> str:
     """
     Get the current time and date.
@@ -532,12 +813,12 @@ def run_shell_command(command: str, blocking: bool, print_output: bool = False)
     if blocking:
         return _run_command()
     else:
-        import threading
         thread = threading.Thread(target=_run_command)
         thread.daemon = True  # Thread will exit when main program exits
         thread.start()
         return None
 
+@parallel_safe
 def get_system_info() -> str:
     """
     Get basic system information.
@@ -573,6 +854,7 @@ def open_url(url: str) -> bool:
         tool_report_print("Error opening URL:", str(e), is_error=True)
         return False
     
+@parallel_safe
 def get_website_text_content(url: str) -> str:
     """
     Fetch and return the text content of a webpage/article in nicely formatted markdown for easy readability.
@@ -587,11 +869,12 @@ def get_website_text_content(url: str) -> str:
     tool_message_print("get_website_text_content", [("url", url)])
     try:
         base = "https://md.dhr.wtf/?url="
-        response = requests.get(base+url, headers={'User-Agent': DEFAULT_USER_AGENT})
+        response = http_get(base+url, headers={'User-Agent': DEFAULT_USER_AGENT})
         response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(response.content, 'lxml')
         text_content = soup.get_text(separator='\n', strip=True) 
-        tool_report_print("Status:", "Webpage content fetched successfully")
+        tool_report_print("Status:", "Webpage content fetched successfully" + (" (from cache)" if response.from_cache else ""))
         return text_content
     except requests.exceptions.RequestException as e:
         tool_report_print("Error fetching webpage content:", str(e), is_error=True)
@@ -600,15 +883,68 @@ def get_website_text_content(url: str) -> str:
         tool_report_print("Error processing webpage content:", str(e), is_error=True)
         return f"Error processing webpage content: {e}"
     
-def http_get_request(url: str, headers_json: str = "") -> str:
+def html_to_text(response: requests.Response) -> str:
+    """Text content of an html response, other text responses are returned as they are."""
+    if "html" not in response.headers.get("Content-Type", "html"):
+        return response.content.decode(response.encoding or "utf-8", errors="replace")
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(response.content, 'lxml')
+    return soup.get_text(separator='\n', strip=True)
+
+@parallel_safe
+def fetch_urls(urls: list[str]) -> list[dict]:
+    """
+    Fetch multiple webpages at the same time and return their text content.
+    Use this instead of calling `get_website_text_content` once per page when you need more than one page.
+
+    Args:
+        urls: The URLs of the webpages.
+
+    Returns: For every URL (in the same order) its text content or an error, and how many seconds it took.
     """
-    Send an HTTP GET request to a URL and return the response as a string. Can be used for interacting with REST API's
+    tool_message_print("fetch_urls", [("urls", ", ".join(urls))])
+    host_semaphores: dict[str, threading.Semaphore] = {}
+    host_semaphores_lock = threading.Lock()
+
+    def fetch(url: str) -> dict:
+        host = urlparse(url).netloc
+        with host_semaphores_lock:
+            semaphore = host_semaphores.setdefault(host, threading.Semaphore(conf.FETCH_URLS_PER_HOST))
+        with semaphore:
+            start = time.perf_counter()
+            try:
+                response = http_get(url, max_bytes=conf.HTTP_MAX_RESPONSE_BYTES, stop_on_binary=True)
+                response.raise_for_status()
+                if response.binary:
+                    raise ValueError(f"Binary content ({response.headers.get('Content-Type')}), not a webpage")
+                content = html_to_text(response)
+                if response.truncated:
+                    content += "\n[... page cut short ...]"
+                return {"url": url, "content": content, "seconds": round(time.perf_counter() - start, 3)}
+            except Exception as e:
+                return {"url": url, "error": str(e), "seconds": round(time.perf_counter() - start, 3)}
+
+    if not urls:
+        return []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(conf.FETCH_URLS_MAX_CONCURRENCY, len(urls)), thread_name_prefix="fetch-urls") as pool:
+        results = list(pool.map(fetch, urls))
+
+    failed = sum("error" in result for result in results)
+    tool_report_print("Status:", f"Fetched {len(results) - failed}/{len(results)} pages in {time.perf_counter() - start:.2f}s", is_error=failed == len(results))
+    return results
+
+@parallel_safe
+def http_get_request(url: str, headers_json: str = "") -> dict:
+    """
+    Send an HTTP GET request to a URL and return the response. Can be used for interacting with REST API's
+    Long responses are cut short and binary ones (images, archives...) are not shown, check `truncated` and `content_length`.
 
     Args:
         url: The URL to send the request to.
         headers_json: A JSON string of headers to include in the request.
 
-    Returns: The response from the server as a string, or an error message.
+    Returns: The status code, headers, content length and body of the response, or an error message.
     """
     tool_message_print("http_get_request", [("url", url)])
     try:
@@ -622,11 +958,10 @@ def http_get_request(url: str, headers_json: str = "") -> str:
 
         if "User-Agent" not in headers:
             headers["User-Agent"] = DEFAULT_USER_AGENT
-            
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        tool_report_print("Status:", "HTTP GET request sent successfully")
-        return response.text
+
+        response = http_get(url, headers=headers, max_bytes=conf.HTTP_MAX_RESPONSE_BYTES, stop_on_binary=True)
+        tool_report_print("Status:", f"HTTP GET request sent, status {response.status_code}" + (" (from cache)" if response.from_cache else ""))
+        return http_response_to_dict(response)
     except requests.exceptions.RequestException as e:
         tool_report_print("Error sending HTTP GET request:", str(e), is_error=True)
         return f"Error sending HTTP GET request: {e}"
@@ -634,16 +969,17 @@ def http_get_request(url: str, headers_json: str = "") -> str:
         tool_report_print("Error processing HTTP GET request:", str(e), is_error=True)
         return f"Error processing HTTP GET request: {e}"
 
-def http_post_request(url: str, data_json: str, headers_json: str = "") -> str:
+def http_post_request(url: str, data_json: str, headers_json: str = "") -> dict:
     """
-    Send an HTTP POST request to a URL with the given data and return the response as a string. Can be used for interacting with REST API's
+    Send an HTTP POST request to a URL with the given data and return the response. Can be used for interacting with REST API's
+    Long responses are cut short and binary ones (images, archives...) are not shown, check `truncated` and `content_length`.
 
     Args:
       url: The URL to send the request to.
       data: A dictionary containing the data to send in the request body.
       headers_json: A JSON string containing the headers to send in the request.
 
-    Returns: The response from the server as a string, or an error message.
+    Returns: The status code, headers, content length and body of the response, or an error message.
     """
     tool_message_print("http_post_request", [("url", url), ("data", data_json)])
     try:
@@ -659,10 +995,10 @@ def http_post_request(url: str, data_json: str, headers_json: str = "") -> str:
             headers["User-Agent"] = DEFAULT_USER_AGENT
 
         data = json.loads(data_json)
-        response = requests.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        tool_report_print("Status:", "HTTP POST request sent successfully")
-        return response.text
+        response = get_http_session().post(url, json=data, headers=headers, timeout=HTTP_TIMEOUT, stream=True)
+        read_body(response, conf.HTTP_MAX_RESPONSE_BYTES, stop_on_binary=True)
+        tool_report_print("Status:", f"HTTP POST request sent, status {response.status_code}")
+        return http_response_to_dict(response)
     except requests.exceptions.RequestException as e:
         tool_report_print("Error sending HTTP POST request:", str(e), is_error=True)
         return f"Error sending HTTP POST request: {e}"
@@ -670,7 +1006,7 @@ def http_post_request(url: str, data_json: str, headers_json: str = "") -> str:
         tool_report_print("Error processing HTTP POST request:", str(e), is_error=True)
         return f"Error processing HTTP POST request: {e}"
 
-def progress_function(dl: Pypdl):
+def progress_function(dl: "Pypdl"):
     """
     Prints the progress of the download using Rich library for in-place updates. (not used by AI)
 
@@ -712,7 +1048,7 @@ def resolve_filename_from_url(url: str) -> str | None:
     
     try:
         # filename from the Content-Disposition header
-        response = requests.head(url, allow_redirects=True)
+        response = get_http_session().head(url, allow_redirects=True, timeout=HTTP_TIMEOUT)
         response.raise_for_status()  
         content_disposition = response.headers.get("Content-Disposition")
         if content_disposition:
@@ -794,6 +1130,7 @@ def download_file_from_url(url: str, download_path: str | None) -> str:
             
         tool_message_print("download_file_from_url", [("url", url), ("final_path", final_path)])
         
+        from pypdl import Pypdl
         dl = Pypdl()
         dl.start(url, final_path, display=False, block=False)
         progress_function(dl)
@@ -818,6 +1155,7 @@ def write_note(message: str):
     with open("ai-log.txt", "a+") as f:
         f.write(message +"\n")
 
+@parallel_safe
 def read_note() -> str:
     """
     Read the previously saved notes, (assistant only)
@@ -847,6 +1185,7 @@ def zip_archive_files(file_name: str, files: list[str]) -> str:
             for file in files:
                 # Add file to zip with just its basename to avoid including full path
                 zipf.write(file, arcname=os.path.basename(file))
+        mark_file_index_dirty([file_name])
         tool_report_print("Status:", "Files zipped successfully")
         return file_name
     except Exception as e:
@@ -876,6 +1215,7 @@ def zip_extract_files(zip_file: str, extract_path: str | None) -> list[str]:
             zipf.extractall(path=extract_path)
             # Get list of all extracted files
             extracted_files = [os.path.join(extract_path, filename) for filename in zipf.namelist()]
+        mark_file_index_dirty([extract_path], recursive=True)
         
         tool_report_print("Status:", f"Files extracted successfully to {extract_path}")
         return extracted_files
@@ -883,6 +1223,7 @@ def zip_extract_files(zip_file: str, extract_path: str | None) -> list[str]:
         tool_report_print("Error extracting zip file:", str(e), is_error=True)
         return f"Error extracting zip file: {e}"
 
+@parallel_safe
 def get_environment_variable(key: str) -> str:
     """
     Retrieve the value of an environment variable.
@@ -903,6 +1244,7 @@ def get_environment_variable(key: str) -> str:
         return f"Error retrieving environment variable {e}"
 
 
+@parallel_safe
 def reddit_search(subreddit: str, sorting: str, query: str | None =None) -> dict:
     """
     Search inside `all` or specific subreddit in reddit to get information.
@@ -928,34 +1270,48 @@ def reddit_search(subreddit: str, sorting: str, query: str | None =None) -> dict
     subs = []
     max_results = conf.MAX_REDDIT_SEARCH_RESULTS
     if query:
-        subs = reddit.subreddit(subreddit).search(query, limit=max_results, sort=sorting)
+        subs = get_reddit().subreddit(subreddit).search(query, limit=max_results, sort=sorting)
     else:
         match sorting:
             case "new":
-                subs = reddit.subreddit(subreddit).new(limit=max_results)
+                subs = get_reddit().subreddit(subreddit).new(limit=max_results)
             case "hot":
-                subs = reddit.subreddit(subreddit).hot(limit=max_results)
+                subs = get_reddit().subreddit(subreddit).hot(limit=max_results)
             case "top":
-                subs = reddit.subreddit(subreddit).top(limit=max_results)
+                subs = get_reddit().subreddit(subreddit).top(limit=max_results)
             case _:
-                subs = reddit.subreddit(subreddit).top(limit=max_results)
+                subs = get_reddit().subreddit(subreddit).top(limit=max_results)
 
     for s in subs:
-        sub_id = "N/A"
-        if s.name:
-            sub_id = s.name.replace("t3_", "")
-        results.append({
-            "submission_id": sub_id,
-            "title": s.title or "N/A",
-            "text": (s.selftext if s.is_self else s.url) or "N/A",
-            "num_comments": s.num_comments,
-            "subreddit_name": s.subreddit.display_name or "N/A",
-            "upvote_ratio": s.upvote_ratio or "N/A"
-        })
+        results.append(submission_to_dict(s))
 
     tool_report_print("Fetched:", f"{len(results)} reddit results.")
     return results
 
+def submission_to_dict(s) -> dict:
+    """
+    What the reddit tools return for a submission.
+    Only reads attributes that come with listings and `reddit.info`, so it never makes praw fetch the submission again.
+    """
+    return {
+        "submission_id": s.id,
+        "title": s.title or "N/A",
+        "text": (s.selftext if s.is_self else s.url) or "N/A",
+        "num_comments": s.num_comments,
+        "score": s.score,
+        "subreddit_name": s.subreddit.display_name or "N/A",
+        "upvote_ratio": s.upvote_ratio or "N/A"
+    }
+
+def fetch_reddit_submissions(submission_ids: list[str]) -> list:
+    """
+    Loads submissions with `reddit.info`, 100 per request, instead of one request per submission.
+    Missing submissions are left out.
+    """
+    fullnames = [id if id.startswith("t3_") else f"t3_{id}" for id in submission_ids]
+    return list(get_reddit().info(fullnames=fullnames))
+
+@parallel_safe
 def get_reddit_post(submission_id: str) -> dict:
     """Get contents like text title, number of comments subreddit name of a specific 
     reddit post.
@@ -970,81 +1326,179 @@ def get_reddit_post(submission_id: str) -> dict:
     tool_message_print("get_reddit_post", [("submission_id", submission_id)])
 
     try:
-        s = reddit.submission(submission_id)
-        if not s:
+        submissions = fetch_reddit_submissions([submission_id])
+        if not submissions:
             return "Submission not found/Invalid ID"
-
-        sub_id = "N/A"
-        if s.name:
-            sub_id = s.name.replace("t3_", "")
-
-        result = {
-            "submission_id": sub_id,
-            "title": s.title or "N/A",
-            "text": (s.selftext if s.is_self else s.url) or "N/A",
-            "num_comments": s.num_comments,
-            "subreddit_name": s.subreddit.display_name or "N/A",
-            "upvote_ratio": s.upvote_ratio or "N/A"
-        }
+        result = submission_to_dict(submissions[0])
     except Exception as e:
         tool_report_print("Error getting reddit post:", str(e), is_error=True)
         return f"Error getting reddit post: {e}"
         
     return result
 
-def reddit_submission_comments(submission_url: str) -> dict: 
+@parallel_safe
+def get_reddit_posts(submission_ids: list[str]) -> list[dict]:
+    """Get contents like text title, number of comments subreddit name of multiple reddit posts at once.
+    Use this instead of calling `get_reddit_post` multiple times. This does not include comments.
+
+    Args:
+        submission_ids: the submission ids of the reddit posts
+
+    Returns: A list of JSON data of the reddit posts, posts that were not found are left out
     """
-    Get a compiled list of comments of a specific reddit post
+    tool_message_print("get_reddit_posts", [("submission_ids", ", ".join(submission_ids))])
+
+    try:
+        results = [submission_to_dict(s) for s in fetch_reddit_submissions(submission_ids)]
+    except Exception as e:
+        tool_report_print("Error getting reddit posts:", str(e), is_error=True)
+        return f"Error getting reddit posts: {e}"
+
+    tool_report_print("Fetched:", f"{len(results)}/{len(submission_ids)} reddit posts.")
+    return results
+
+@parallel_safe
+def reddit_submission_comments(submission_url: str, max_depth: int | None = None, min_score: int | None = None) -> dict: 
+    """
+    Get a compiled list of comments of a specific reddit post, highest score first
     For finding solutions for a problem, solutions are usually in the comments, so this will be helpful for that
     (Might not include all comments)
 
     Args:
-        submission_url: the submission url of the reddit post
-
+        submission_url: the submission url or id of the reddit post
+        max_depth: skip replies nested deeper than this, 0 only returns top level comments (default no limit)
+        min_score: skip comments (and their replies) with a lower score (default no limit)
 
-    Returns: A JSON data of the comments including authors name and the body of the reddit post
+    Returns: A JSON data of the comments including authors name, score, depth and the body
     """
-    tool_message_print("reddit_submission_comments", [("submission_url", submission_url)])
+    tool_message_print("reddit_submission_comments", [("submission_url", submission_url), ("max_depth", max_depth), ("min_score", min_score)])
+
+    from praw.models import MoreComments
 
-    submission = reddit.submission(submission_url)
-    if not submission:
-        return "Submission not found/Invalid ID"
+    max_depth = conf.REDDIT_MAX_COMMENT_DEPTH if max_depth is None else max_depth
+    min_score = conf.REDDIT_MIN_COMMENT_SCORE if min_score is None else min_score
+
+    try:
+        if submission_url.startswith("http"):
+            submission = get_reddit().submission(url=submission_url)
+        else:
+            submission = get_reddit().submission(submission_url)
+        # every followed "load more comments" link is one more request
+        submission.comments.replace_more(limit=conf.REDDIT_REPLACE_MORE_LIMIT)
+    except Exception as e:
+        tool_report_print("Error getting reddit comments:", str(e), is_error=True)
+        return f"Error getting reddit comments: {e}"
 
     results = []
-    comments = submission.comments.list() if conf.MAX_REDDIT_POST_COMMENTS == -1 else submission.comments.list()[:conf.MAX_REDDIT_POST_COMMENTS]
-    for com in comments:
-        if isinstance(com, Comment):
-            results.append({
-                "author": com.author.name or "N/A",
-                "body": com.body or "N/A"
-            })
-    
+    stack = [(comment, 0) for comment in submission.comments]
+    while stack:
+        com, depth = stack.pop()
+        if isinstance(com, MoreComments):  # left over once the limit is reached
+            continue
+        if min_score is not None and com.score < min_score:
+            continue
+        results.append({
+            "author": com.author.name if com.author else "[deleted]",
+            "score": com.score,
+            "depth": depth,
+            "body": com.body or "N/A"
+        })
+        if max_depth is None or depth < max_depth:
+            stack.extend((reply, depth + 1) for reply in com.replies)
+
+    results.sort(key=lambda comment: comment["score"], reverse=True)
+    if conf.MAX_REDDIT_POST_COMMENTS != -1:
+        results = results[:conf.MAX_REDDIT_POST_COMMENTS]
+
     print(f"{Fore.CYAN}  ├─Fetched {len(results)} reddit comments.")
     return results
 
-def find_files(pattern: str, directory: str = ".", recursive: bool = False, include_hidden: bool = False) -> list[str]:
+@parallel_safe
+def search_file_contents(
+    pattern: str,
+    directory: str = ".",
+    glob: str | None = None,
+    max_matches: int | None = None,
+    context_lines: int | None = None,
+    ignore_case: bool = False,
+) -> dict:
+    """
+    Searches the contents of the files in a directory (recursively) for a regex, like `grep -rn`.
+    Returns only the matching lines with a few lines around them, use it to find where something is before reading files.
+    Binary files and files ignored by .gitignore/.ignore files are skipped.
+
+    Args:
+        pattern: The regex to search for (Python syntax), matched line by line.
+        directory: The directory to search in (defaults to the current directory).
+        glob: Only search files matching this glob, e.g. "*.py", or "src/**/*.ts" for a path relative to the directory.
+        max_matches: Max amount of matching lines to return, the search stops once reached (default 100).
+        context_lines: Amount of lines to show before and after each match (default 2).
+        ignore_case: Whether the search is case insensitive.
+
+    Returns:
+        dict: "matches" (list of {"path", "line", "text", "before", "after"}, with "line" starting at 1),
+        "files_searched" and "truncated" (True when max_matches was reached and other matches may exist).
+    """
+    tool_message_print("search_file_contents", [("pattern", pattern), ("directory", directory), ("glob", str(glob)),
+                                                ("max_matches", str(max_matches)), ("ignore_case", str(ignore_case))])
+    if not os.path.isdir(directory):
+        tool_report_print("Error:", f"Directory '{directory}' not found.", is_error=True)
+        return f"Error: Directory '{directory}' not found."
+    try:
+        regex = re.compile(pattern.encode(), re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+    except re.error as e:
+        tool_report_print("Error:", f"Invalid pattern: {e}", is_error=True)
+        return f"Error: Invalid pattern: {e}"
+
+    matches, files_searched, truncated = search_files(
+        directory,
+        regex,
+        glob=glob,
+        max_matches=max_matches or conf.SEARCH_MAX_MATCHES,
+        context_lines=conf.SEARCH_CONTEXT_LINES if context_lines is None else context_lines,
+        max_workers=conf.SEARCH_WORKERS,
+        max_bytes=conf.SEARCH_MAX_FILE_BYTES,
+        max_line_length=conf.SEARCH_MAX_LINE_LENGTH,
+    )
+    tool_report_print("Status:", f"Found {len(matches)} matching lines in {files_searched} searched files"
+                      + (" (stopped at max_matches)" if truncated else ""))
+    return {"matches": matches, "files_searched": files_searched, "truncated": truncated}
+
+@parallel_safe
+def find_files(
+    pattern: str, directory: str = ".", recursive: bool = False, include_hidden: bool = False, name_contains: str | None = None
+) -> list[str]:
     """
     Searches for files (using glob) matching a given pattern within a specified directory.
 
     Args:
-        pattern: The glob pattern to match (e.g., "*.txt", "data_*.csv").
+        pattern: The glob pattern to match (e.g., "*.txt", "data_*.csv", "**/*.py" with recursive).
         directory: The directory to search in (defaults to the current directory).
-        recursive: Whether to search recursively in subdirectories (default is False).
+        recursive: Whether `**` in the pattern matches any amount of subdirectories (default is False).
         include_hidden: Whether to include hidden files (default is False).
+        name_contains: Only return paths whose file name contains this text (case insensitive).
 
     Returns:
         A list of file paths that match the pattern.  Returns an empty list if no matches are found.
         Returns an appropriate error message if the directory does not exist or is not accessible.
     """
     tool_message_print("find_files", [("pattern", pattern), ("directory", directory), 
-                                      ("recursive", str(recursive)), ("include_hidden", str(include_hidden))])
+                                      ("recursive", str(recursive)), ("include_hidden", str(include_hidden)),
+                                      ("name_contains", str(name_contains))])
     try:
         if not os.path.isdir(directory):
             tool_report_print("Error:", f"Directory '{directory}' not found.", is_error=True)
             return f"Error: Directory '{directory}' not found."  # Clear error message
 
-        full_pattern = os.path.join(directory, pattern)  # Combine directory and pattern
-        matches = glob.glob(full_pattern, recursive=recursive, include_hidden=include_hidden)
+        file_index = get_file_index()
+        if recursive and "**" in pattern and file_index is not None:
+            # walking the whole tree is what makes recursive searches slow, the index is searched instead
+            matches = file_index.find(directory, pattern, include_hidden=include_hidden, name_contains=name_contains)
+        else:
+            full_pattern = os.path.join(directory, pattern)  # Combine directory and pattern
+            matches = glob.glob(full_pattern, recursive=recursive, include_hidden=include_hidden)
+            if name_contains:
+                matches = [match for match in matches if name_contains.lower() in os.path.basename(match).lower()]
 
         # Check if the list is empty and return a message.
         if not matches:
@@ -1054,10 +1508,34 @@ def find_files(pattern: str, directory: str = ".", recursive: bool = False, incl
         tool_report_print("Status:", f"Found {len(matches)} matching files")
         return matches  # Return the list of matching file paths
 
-    except OSError as e:
+    except re.error as e:
+        tool_report_print("Error:", f"Invalid pattern: {e}", is_error=True)
+        return f"Error: Invalid pattern '{pattern}': {e}"
+    except (OSError, sqlite3.Error) as e:
         tool_report_print("Error:", str(e), is_error=True)
         return f"Error: {e}"  # Return the system error message
 
+# cache of wikipedia pages, created on first use by `get_wikipedia_cache`
+_wikipedia_cache = None
+_wikipedia_cache_lock = threading.Lock()
+
+def get_wikipedia_cache() -> WikiPageCache:
+    """Returns the wikipedia page cache, creating it the first time."""
+    global _wikipedia_cache
+    with _wikipedia_cache_lock:
+        if _wikipedia_cache is None:
+            backend = WikipediaBackend(get_http_session(), timeout=HTTP_TIMEOUT)
+            cache = DiskCache(conf.WIKIPEDIA_CACHE_PATH) if conf.WIKIPEDIA_CACHE_PATH else None
+            _wikipedia_cache = WikiPageCache(backend, cache, ttl=conf.WIKIPEDIA_CACHE_TTL)
+    return _wikipedia_cache
+
+def wikipedia_page_name(page: str) -> str:
+    """The page name of a wikipedia url, other names are returned as they are."""
+    if page.startswith("http") and "wiki/" in page:
+        return page.split("wiki/")[1]
+    return page
+
+@parallel_safe
 def get_wikipedia_summary(page: str) -> str:
     """
     Get a quick summery of a specific Wikipedia page, page must be a valid page name (not case sensitive)
@@ -1069,13 +1547,48 @@ def get_wikipedia_summary(page: str) -> str:
     """
     tool_message_print("get_wikipedia_summary", [("page", page)])
     try:
-        if page.startswith("https"):
-            page = page.split("wiki/")[1]
-        return wikipedia.summary(page)
+        return get_wikipedia_cache().page(wikipedia_page_name(page))["summary"]
     except Exception as e:
         tool_report_print("Error getting Wikipedia summary:", str(e), is_error=True)
         return f"Error getting Wikipedia summary: {e}"
 
+@parallel_safe
+def get_wikipedia_summaries(pages: list[str]) -> dict:
+    """
+    Get quick summeries of multiple Wikipedia pages at the same time, use this instead of calling `get_wikipedia_summary` multiple times.
+
+    Args:
+        pages: the page names of the Wikipedia pages (can be urls too)
+
+    Returns: The title, url and summary of every page that was found and the error of every page that wasn't
+    """
+    tool_message_print("get_wikipedia_summaries", [("pages", ", ".join(pages))])
+    cache = get_wikipedia_cache()
+
+    def fetch(page: str) -> dict | Exception:
+        try:
+            return cache.page(wikipedia_page_name(page))
+        except Exception as e:
+            return e
+
+    if not pages:
+        return {"summaries": {}, "errors": {}}
+    unique_pages = list(dict.fromkeys(pages))
+    with ThreadPoolExecutor(max_workers=min(conf.WIKIPEDIA_MAX_CONCURRENT_REQUESTS, len(unique_pages)), thread_name_prefix="wikipedia") as pool:
+        outcomes = list(pool.map(fetch, unique_pages))
+
+    summaries = {}
+    errors = {}
+    for page, outcome in zip(unique_pages, outcomes):
+        if isinstance(outcome, Exception):
+            errors[page] = str(outcome)
+            tool_report_print(f"Error getting Wikipedia summary of '{page}':", str(outcome), is_error=True)
+        else:
+            summaries[page] = {"title": outcome["title"], "url": outcome["url"], "summary": outcome["summary"]}
+    tool_report_print("Status:", f"Got {len(summaries)}/{len(unique_pages)} summaries", is_error=not summaries)
+    return {"summaries": summaries, "errors": errors}
+
+@parallel_safe
 def search_wikipedia(query: str) -> list:
     """
     Search Wikipedia for a given query and return a list of search results, which can be used to get summery or full page conent
@@ -1087,11 +1600,12 @@ def search_wikipedia(query: str) -> list:
     """
     tool_message_print("search_wikipedia", [("query", query)])
     try:
-        return wikipedia.search(query)
+        return get_wikipedia_cache().search(query)
     except Exception as e:
         tool_report_print("Error searching Wikipedia:", str(e), is_error=True)
         return f"Error searching Wikipedia: {e}"
 
+@parallel_safe
 def get_full_wikipedia_page(page: str) -> str:
     """
     Get the full content of a Wikipedia page, page must be a valid page name (not case sensitive)
@@ -1104,10 +1618,8 @@ def get_full_wikipedia_page(page: str) -> str:
     """
     tool_message_print("get_full_wikipedia_page", [("page", page)])
     try:
-        if page.startswith("https"):
-            page = page.split("wiki/")[1]
-        page = wikipedia.page(page)
-        content = f"Title: {page.title}\nUrl:{page.url}\n{page.content}"
+        page = get_wikipedia_cache().page(wikipedia_page_name(page))
+        content = f"Title: {page['title']}\nUrl:{page['url']}\n{page['content']}"
         return content
     except Exception as e:
         tool_report_print("Error getting Wikipedia page:", str(e), is_error=True)
@@ -1115,6 +1627,7 @@ def get_full_wikipedia_page(page: str) -> str:
 
 # This is to help the assistant possibly fixing it hellucinating some functions
 # Not sure if it works or not though
+@parallel_safe
 def find_tools(query: str) -> list[str]:
     """
     Allows the assistant to find tools that fuzzy matchs a given query. 
@@ -1128,6 +1641,7 @@ def find_tools(query: str) -> list[str]:
     """
     tool_message_print("find_tools", [("query", query)])
     # TOOLS variable is defined later
+    import thefuzz.process
     tools = [tool.__name__ for tool in TOOLS]
     best_matchs = thefuzz.process.extractBests(query, tools) # [(tool_name, score), ...]
     return [
@@ -1136,6 +1650,7 @@ def find_tools(query: str) -> list[str]:
         if match[1] > 60 # only return tools with a score above 60
     ]
 
+@parallel_safe
 def read_file_at_specific_line_range(file_path: str, start_line: int, end_line: int) -> str:
     """
     Read a range of lines from a file (inclusive).
@@ -1153,9 +1668,8 @@ def read_file_at_specific_line_range(file_path: str, start_line: int, end_line:
     """
     tool_message_print("read_file_at_specific_line_range", [("file_path", file_path), ("start_line", start_line), ("end_line", end_line)])
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            lines = file.readlines()
-        num_lines = len(lines)
+        # only the requested lines are read, the offsets of the lines are cached for the next ranges
+        text, num_lines = LINE_INDEX.read_lines(file_path, start_line, end_line)
 
         if start_line < 1 or start_line > num_lines:
             return f"Error: Start line ({start_line}) is out of range (File has {num_lines} lines)."
@@ -1163,16 +1677,45 @@ def read_file_at_specific_line_range(file_path: str, start_line: int, end_line:
         if start_line > end_line:
              return f"Error: Start line ({start_line}) cannot be greater than end line ({end_line})."
 
-       
-        selected_lines = lines[start_line - 1:end_line]
-        return "\n".join(selected_lines).strip() 
+        return text
     except FileNotFoundError:
         return f"File not found: {file_path}"
     except Exception as e:
         tool_report_print("Error reading file:", str(e), is_error=True)
         return f"Error reading file: {e}"
 
+@parallel_safe
+def read_tool_result(handle: str, offset: int = 0, length: int = 10000) -> str:
+    """
+    Read part of a tool output that was too long to be returned at once.
+    When an output is cut short it tells you its handle and where to continue reading from.
+
+    Args:
+        handle: The handle of the saved output.
+        offset: The character to start reading from (default 0).
+        length: The amount of characters to read (default 10000).
+
+    Returns: The requested part of the output followed by how much of it is left, or an error message.
+    """
+    tool_message_print("read_tool_result", [("handle", handle), ("offset", offset), ("length", length)])
+    try:
+        length = max(1, min(length, conf.TOOL_RESULT_MAX_CHARS))
+        offset = max(0, offset)
+        part = RESULT_STORE.get(handle, offset, length)
+        total = RESULT_STORE.size(handle)
+        end = offset + len(part)
+        if end < total:
+            return f"{part}\n\n[Showing characters {offset}-{end} of {total}, continue with offset={end}]"
+        return f"{part}\n\n[Showing characters {offset}-{end} of {total}, end of output]"
+    except ResultNotFound as e:
+        tool_report_print("Error:", str(e), is_error=True)
+        return f"Error: {e}"
+    except Exception as e:
+        tool_report_print("Error reading tool result:", str(e), is_error=True)
+        return f"Error reading tool result: {e}"
+
 # Python script inspection
+@parallel_safe
 def inspect_python_script(filepath: str) -> list[str]:
     """
     Parses a Python file and returns details about
@@ -1197,6 +1740,7 @@ def inspect_python_script(filepath: str) -> list[str]:
         tool_report_print("Error getting function details:", str(e), is_error=True)
         return []
     
+@parallel_safe
 def get_python_function_source_code(filepath: str, function_name: str) -> str:
     """
     Returns the source code of a specific function.
@@ -1223,8 +1767,10 @@ def get_python_function_source_code(filepath: str, function_name: str) -> str:
 
 TOOLS = [
     duckduckgo_search_tool,
+    duckduckgo_search_many,
     reddit_search,
     get_reddit_post,
+    get_reddit_posts,
     reddit_submission_comments,
     write_note,
     read_note,
@@ -1237,12 +1783,15 @@ TOOLS = [
     get_file_metadata,
     write_files,
     read_file_at_specific_line_range,
+    read_tool_result,
     copy_file,
     move_file,
     rename_file,
     rename_directory,
     find_files,
+    search_file_contents,
     get_website_text_content,
+    fetch_urls,
     http_get_request,
     http_post_request,
     open_url,
@@ -1256,6 +1805,7 @@ TOOLS = [
     zip_extract_files,
     get_environment_variable,
     get_wikipedia_summary,
+    get_wikipedia_summaries,
     search_wikipedia,
     get_full_wikipedia_page,
     find_tools,